@@ -1,10 +1,11 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException, Depends
+from fastapi import FastAPI, File, Form, UploadFile, HTTPException, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
-from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from pydantic import BaseModel, TypeAdapter
+from typing import List, Optional, Dict, Any, Literal
 import uvicorn
 import os
+import time
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -15,27 +16,60 @@ from services.resume_parser import ResumeParser
 from services.job_analyzer import JobAnalyzer
 from services.ai_service import AIService
 from services.keyword_extractor import KeywordExtractor
+from services.llm_cache import llm_cache, llm_cache_bypass
+from services.single_flight import single_flight_stats
+from services.llm_streaming import sse_response
+from services.chat_sessions import chat_sessions
+from services.llm_providers import provider_stats
+from services.resilience import request_deadline, resilience_stats
+from services.tailoring_jobs import tailoring_jobs
+from services.job_ranker import JobRanker
+from services.resume_index import resume_index
+from services.usage_ledger import usage_ledger, usage_context, current_user
+from services.llm_gateway import llm_gateway, llm_priority, BACKGROUND
+from services.model_router import model_router
+from services.speculative_tailoring import speculative_tailoring
+from services.resume_store import resume_store
+from services.resume_history import resume_history
+from services.idempotency import IdempotencyMiddleware, idempotency_store
+from services.tailoring_pipeline import TailoringPipeline, PipelineRun
+from services.cancellation import until_disconnected, cancellation_stats, ClientDisconnectedError, CLIENT_CLOSED_REQUEST
 from models.schemas import (
     JobPostingRequest,
     ResumeAnalysisResponse,
     TailoringSuggestionsResponse,
-    KeywordExtractionResponse
+    KeywordExtractionResponse,
+    SectionsOptimizationRequest,
+    SectionsOptimizationResponse,
+    QuickTailoringResponse,
+    TailoringJobResponse,
+    RankJobsRequest,
+    RankJobsResponse,
+    ResumeVersionRequest,
+    ModelFeedbackRequest
 )
 
 
 
 from routes_job import router as job_router
 from routes_google import router as google_router
-from routes_llm import router as llm_router
+from routes_llm import router as legacy_llm_router
+from routes.llm_routes import router as llm_router
 from routes_docs import router as docs_router
 from routes.onboarding import router as onboarding_router
+from routes.recruiter import router as recruiter_router
 
 app = FastAPI(
     title="Resume Tailor API",
     description="AI-powered resume tailoring and job analysis API",
-    version="1.0.0"
+    version="1.0.0",
+    dependencies=[Depends(llm_cache_bypass), Depends(request_deadline), Depends(usage_context)]
 )
 
+# Retried POSTs with an Idempotency-Key share one execution; added first so
+# replayed responses still pass through CORS
+app.add_middleware(IdempotencyMiddleware)
+
 # CORS middleware for Chrome extension and webapp
 app.add_middleware(
     CORSMiddleware,
@@ -53,14 +87,54 @@ app.add_middleware(
 # Register routers
 app.include_router(job_router)
 app.include_router(google_router)
+app.include_router(legacy_llm_router)
 app.include_router(llm_router)
 app.include_router(docs_router)
 app.include_router(onboarding_router)
+app.include_router(recruiter_router)
 # Initialize services
 resume_parser = ResumeParser()
 job_analyzer = JobAnalyzer()
 ai_service = AIService()
 keyword_extractor = KeywordExtractor()
+job_ranker = JobRanker(job_analyzer)
+tailoring_pipeline = TailoringPipeline(resume_parser, job_analyzer, ai_service)
+
+def job_request_form(job_request: str = Form(...)) -> JobPostingRequest:
+    """Read a JobPostingRequest sent as a JSON form field next to a file upload"""
+    try:
+        return JobPostingRequest.model_validate_json(job_request)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"Invalid job_request: {str(e)}")
+
+def job_requests_form(job_requests: str = Form(...)) -> List[JobPostingRequest]:
+    """Read a JSON list of JobPostingRequests sent as a form field next to a file upload"""
+    try:
+        jobs = TypeAdapter(List[JobPostingRequest]).validate_json(job_requests)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"Invalid job_requests: {str(e)}")
+    max_jobs = int(os.getenv('BATCH_MAX_JOBS', '25'))
+    if not jobs or len(jobs) > max_jobs:
+        raise HTTPException(status_code=422, detail=f"job_requests must hold between 1 and {max_jobs} jobs")
+    return jobs
+
+async def resume_form(
+    resume_file: Optional[UploadFile] = File(None),
+    resume_id: Optional[str] = Form(None)
+) -> PipelineRun:
+    """Resume for a tailoring request: an uploaded file, or the id of one stored via /api/resumes"""
+    if resume_id:
+        return PipelineRun(b"", "", {}, resume=stored_resume(resume_id).resume)
+    if resume_file is None:
+        raise HTTPException(status_code=422, detail="Send resume_file or resume_id")
+    return PipelineRun(await resume_file.read(), resume_file.filename, {})
+
+def stored_resume(resume_id: str):
+    """The caller's stored resume (user from X-User-Id), or 404"""
+    stored = resume_store.get(current_user(), resume_id)
+    if stored is None:
+        raise HTTPException(status_code=404, detail="Resume not found")
+    return stored
 
 @app.get("/")
 async def root():
@@ -80,8 +154,64 @@ async def health_check():
         }
     }
 
+@app.get("/api/metrics")
+async def get_metrics():
+    """Runtime metrics for caching and LLM usage"""
+    return {
+        "llm_cache": llm_cache.stats(),
+        "single_flight": single_flight_stats(),
+        "chat_sessions": chat_sessions.stats(),
+        "llm_providers": provider_stats(),
+        "circuit_breakers": resilience_stats(),
+        "tailoring_jobs": tailoring_jobs.stats(),
+        "resume_index": resume_index.stats(),
+        "llm_usage": usage_ledger.stats(),
+        "llm_gateway": llm_gateway.stats(),
+        "model_routing": model_router.stats(),
+        "speculative_tailoring": speculative_tailoring.stats(),
+        "client_disconnects": cancellation_stats(),
+        "tailoring_pipeline": tailoring_pipeline.stats(),
+        "resume_store": resume_store.stats(),
+        "resume_history": resume_history.stats(),
+        "idempotency": idempotency_store.stats()
+    }
+
+@app.post("/api/model-routing/feedback")
+async def model_routing_feedback(request: ModelFeedbackRequest):
+    """Record a quality rating for a routed model's output"""
+    try:
+        model_router.feedback(request.task, request.model, request.rating)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"status": "success"}
+
+@app.get("/api/usage")
+async def get_usage(
+    group_by: str = "endpoint,model",
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    endpoint: Optional[str] = None,
+    user: Optional[str] = None,
+    model: Optional[str] = None
+):
+    """LLM token usage and cost from the ledger
+    
+    group_by is a comma-separated subset of endpoint, user_id, model, provider,
+    source; since/until are Unix timestamps.
+    """
+    try:
+        rows = usage_ledger.query(
+            [column.strip() for column in group_by.split(",") if column.strip()],
+            since=since,
+            until=until,
+            filters={"endpoint": endpoint, "user_id": user, "model": model}
+        )
+        return {"group_by": group_by, "rows": rows}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Usage query failed: {str(e)}")
+
 @app.post("/api/parse-resume", response_model=Dict[str, Any])
-async def parse_resume(file: UploadFile = File(...)):
+async def parse_resume(http_request: Request, file: UploadFile = File(...)):
     """Parse uploaded resume file (PDF, DOCX)"""
     try:
         if not file.filename.lower().endswith(('.pdf', '.docx', '.doc')):
@@ -90,21 +220,112 @@ async def parse_resume(file: UploadFile = File(...)):
         # Read file content
         content = await file.read()
         
-        # Parse resume
-        parsed_data = await resume_parser.parse_resume(content, file.filename)
+        # Parse resume (dropped if the client goes away first)
+        parsed_data = await until_disconnected(http_request, resume_parser.parse_resume(content, file.filename))
         
         return {
             "success": True,
             "data": parsed_data,
             "filename": file.filename
         }
+    except ClientDisconnectedError as e:
+        raise HTTPException(status_code=CLIENT_CLOSED_REQUEST, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Resume parsing failed: {str(e)}")
 
+@app.post("/api/resumes")
+async def save_resume(resume_file: UploadFile = File(...)):
+    """Store a resume for the caller; later requests can send its resume_id instead of the file
+    
+    Uploading a file the caller already stored returns the existing resume_id.
+    """
+    try:
+        if not resume_file.filename.lower().endswith(('.pdf', '.docx', '.doc')):
+            raise HTTPException(status_code=400, detail="Only PDF and DOCX files are supported")
+        
+        stored, created = await resume_store.save(current_user(), await resume_file.read(), resume_file.filename)
+        return {
+            "success": True,
+            "resume_id": stored.resume_id,
+            "created": created,
+            "filename": stored.filename,
+            "data": stored.resume
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Resume storage failed: {str(e)}")
+
+@app.get("/api/resumes")
+async def list_resumes():
+    """The caller's stored resumes, newest first"""
+    return {"success": True, "resumes": resume_store.list(current_user())}
+
+@app.get("/api/resumes/{resume_id}")
+async def get_resume(resume_id: str):
+    """Parsed data of one of the caller's stored resumes"""
+    stored = stored_resume(resume_id)
+    return {
+        "success": True,
+        "resume_id": resume_id,
+        "filename": stored.filename,
+        "created_at": stored.created_at,
+        "data": stored.resume
+    }
+
+@app.delete("/api/resumes/{resume_id}")
+async def delete_resume(resume_id: str):
+    """Forget one of the caller's stored resumes"""
+    if not resume_store.delete(current_user(), resume_id):
+        raise HTTPException(status_code=404, detail="Resume not found")
+    resume_history.delete(resume_id)
+    return {"success": True}
+
+@app.get("/api/resumes/{resume_id}/versions")
+async def list_resume_versions(resume_id: str):
+    """Versions of a stored resume; version 1 is the resume as uploaded"""
+    stored = stored_resume(resume_id)
+    try:
+        resume_history.ensure(resume_id, stored.resume)
+        return {"success": True, "resume_id": resume_id, "versions": resume_history.versions(resume_id)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Resume history failed: {str(e)}")
+
+@app.post("/api/resumes/{resume_id}/versions")
+async def save_resume_version(resume_id: str, request: ResumeVersionRequest):
+    """Save an edited or tailored resume as the next version"""
+    stored = stored_resume(resume_id)
+    try:
+        resume_history.ensure(resume_id, stored.resume)
+        return {"success": True, "resume_id": resume_id, **resume_history.commit(resume_id, request.resume, request.note)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Resume history failed: {str(e)}")
+
+@app.get("/api/resumes/{resume_id}/versions/{version}")
+async def get_resume_version(resume_id: str, version: int):
+    """A stored resume as it was at one version"""
+    stored = stored_resume(resume_id)
+    resume_history.ensure(resume_id, stored.resume)
+    data = resume_history.get(resume_id, version)
+    if data is None:
+        raise HTTPException(status_code=404, detail="Resume version not found")
+    return {"success": True, "resume_id": resume_id, "version": version, "data": data}
+
+@app.get("/api/resumes/{resume_id}/diff")
+async def diff_resume_versions(resume_id: str, from_version: int, to_version: int):
+    """Sections changed between two versions of a stored resume, with a unified diff"""
+    stored = stored_resume(resume_id)
+    resume_history.ensure(resume_id, stored.resume)
+    diff = resume_history.diff(resume_id, from_version, to_version)
+    if diff is None:
+        raise HTTPException(status_code=404, detail="Resume version not found")
+    return {"success": True, "resume_id": resume_id, **diff}
+
 @app.post("/api/analyze-job", response_model=ResumeAnalysisResponse)
 async def analyze_job_posting(request: JobPostingRequest):
     """Analyze job posting and extract key requirements"""
     try:
+        started = time.perf_counter()
         analysis = await job_analyzer.analyze_job_posting(
             title=request.title,
             company=request.company,
@@ -114,7 +335,8 @@ async def analyze_job_posting(request: JobPostingRequest):
         
         return ResumeAnalysisResponse(
             success=True,
-            analysis=analysis
+            analysis=analysis,
+            processing_time=round(time.perf_counter() - started, 4)
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Job analysis failed: {str(e)}")
@@ -137,51 +359,177 @@ async def extract_keywords(request: JobPostingRequest):
 
 @app.post("/api/tailor-resume", response_model=TailoringSuggestionsResponse)
 async def tailor_resume(
-    job_request: JobPostingRequest,
-    resume_file: UploadFile = File(...)
+    http_request: Request,
+    job_request: JobPostingRequest = Depends(job_request_form),
+    run: PipelineRun = Depends(resume_form),
+    mode: Literal["single", "parallel"] = "single",
+    progress: bool = False
+):
+    """Generate AI-powered resume tailoring suggestions
+    
+    The resume is an upload (resume_file) or a stored resume (resume_id).
+    Resume parsing and job analysis run concurrently, then the LLM stage;
+    stage_times reports each stage. With progress=true the response is an
+    SSE stream with a "stage" event as each stage finishes and a final
+    "result" event. Work is cancelled if the client disconnects first.
+    """
+    async def tailor() -> TailoringSuggestionsResponse:
+        result = await tailoring_pipeline.tailor(run, mode=mode)
+        return TailoringSuggestionsResponse(
+            success=True,
+            suggestions=result.get("suggestions", []),
+            job_match_score=result.get("match_score", 0),
+            priority_changes=result.get("priority_changes", []),
+            ats_score=result.get("ats_score"),
+            missing_keywords=result.get("missing_keywords", []),
+            processing_time=result.get("processing_time"),
+            stage_times=result.get("stage_times", {})
+        )
+    
+    try:
+        run.job = job_request.model_dump()
+        if progress:
+            return sse_response(tailoring_pipeline.events(run, mode=mode))
+        return await until_disconnected(http_request, tailor())
+    except ClientDisconnectedError as e:
+        raise HTTPException(status_code=CLIENT_CLOSED_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Resume tailoring failed: {str(e)}")
+
+@app.post("/api/tailor-resume/stream")
+async def stream_tailor_resume(
+    job_request: JobPostingRequest = Depends(job_request_form),
+    run: PipelineRun = Depends(resume_form)
 ):
-    """Generate AI-powered resume tailoring suggestions"""
+    """Stream tailoring over SSE: a "stage" event as parsing and job analysis
+    finish (they run concurrently), then each suggestion as soon as it is generated
+    
+    A disconnect closes the event stream, cancelling whichever stage is running.
+    """
+    run.job = job_request.model_dump()
+    return sse_response(tailoring_pipeline.stream(run))
+
+@app.post("/api/tailor-resume/quick", response_model=QuickTailoringResponse)
+async def quick_tailor_resume(
+    job_request: JobPostingRequest = Depends(job_request_form),
+    run: PipelineRun = Depends(resume_form)
+):
+    """Two-phase tailoring: local scores now, LLM suggestions later
+    
+    The response carries the heuristic match/ATS scores and keyword gaps
+    without waiting for the LLM. Suggestions are generated in the background
+    and delivered via poll_url or stream_url.
+    """
     try:
-        # Parse resume
-        resume_content = await file.read()
-        parsed_resume = await resume_parser.parse_resume(resume_content, resume_file.filename)
+        run.job = job_request.model_dump()
+        async for _ in tailoring_pipeline.prepare(run):
+            pass
+        parsed_resume, job_analysis = run.resume, run.job_analysis
         
-        # Analyze job
-        job_analysis = await job_analyzer.analyze_job_posting(
-            title=job_request.title,
-            company=job_request.company,
-            description=job_request.description,
-            location=job_request.location
-        )
+        assessment = ai_service.heuristic_assessment(parsed_resume, job_analysis)
+        # LLM enrichment yields to interactive calls
+        with llm_priority(BACKGROUND):
+            job = tailoring_jobs.start(current_user(), ai_service.stream_tailoring_suggestions(
+                resume_data=parsed_resume,
+                job_analysis=job_analysis
+            ))
         
-        # Generate AI suggestions
-        suggestions = await ai_service.generate_tailoring_suggestions(
-            resume_data=parsed_resume,
-            job_analysis=job_analysis
+        return QuickTailoringResponse(
+            success=True,
+            job_id=job.job_id,
+            job_match_score=assessment["match_score"],
+            ats_score=assessment["ats_score"],
+            semantic_score=assessment["semantic_score"],
+            missing_keywords=assessment["missing_keywords"],
+            processing_time=run.processing_time,
+            stage_times=run.stage_times,
+            status=job.status,
+            poll_url=f"/api/tailor-resume/jobs/{job.job_id}",
+            stream_url=f"/api/tailor-resume/jobs/{job.job_id}/stream"
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Resume tailoring failed: {str(e)}")
+
+@app.post("/api/tailor-resume/batch")
+async def batch_tailor_resume(
+    job_requests: List[JobPostingRequest] = Depends(job_requests_form),
+    run: PipelineRun = Depends(resume_form),
+    mode: Literal["single", "parallel"] = "single"
+):
+    """Tailor one resume to many jobs over SSE
+    
+    The resume (resume_file or resume_id) is parsed once while the jobs are analyzed concurrently; a
+    "job" event (or "job_error") arrives per job as soon as its suggestions
+    are ready, in completion order with the job's index, then "done".
+    """
+    return sse_response(tailoring_pipeline.batch(
+        run,
+        [job.model_dump(mode="json") for job in job_requests],
+        mode=mode
+    ))
+
+def _get_tailoring_job(job_id: str):
+    # Another user's job is answered exactly like a missing one
+    job = tailoring_jobs.get(current_user(), job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Tailoring job not found or expired")
+    return job
+
+@app.get("/api/tailor-resume/jobs/{job_id}", response_model=TailoringJobResponse)
+async def get_tailoring_job(job_id: str):
+    """Poll an enrichment job: suggestions so far, and the final result once complete"""
+    job = _get_tailoring_job(job_id)
+    result = job.result or {}
+    return TailoringJobResponse(
+        success=job.status != "failed",
+        job_id=job_id,
+        status=job.status,
+        suggestions=job.suggestions,
+        priority_changes=result.get("priority_changes", []),
+        error=job.error
+    )
+
+@app.get("/api/tailor-resume/jobs/{job_id}/stream")
+async def stream_tailoring_job(job_id: str):
+    """Enrichment events over SSE; events produced before connecting are replayed first"""
+    job = _get_tailoring_job(job_id)
+    return sse_response(tailoring_jobs.follow(job))
+
+@app.post("/api/rank-jobs", response_model=RankJobsResponse)
+async def rank_jobs(request: RankJobsRequest):
+    """Rank many job postings by how well one parsed resume matches them"""
+    if request.resume is None and not request.resume_id:
+        raise HTTPException(status_code=422, detail="Send resume or resume_id")
+    resume_data = request.resume if request.resume is not None else stored_resume(request.resume_id).resume
+    try:
+        started = time.perf_counter()
+        results = await job_ranker.rank(
+            resume_data=resume_data,
+            jobs=[job.model_dump() for job in request.jobs],
+            top_k=request.top_k
         )
         
-        return TailoringSuggestionsResponse(
+        return RankJobsResponse(
             success=True,
-            suggestions=suggestions,
-            job_match_score=suggestions.get("match_score", 0),
-            priority_changes=suggestions.get("priority_changes", [])
+            results=results,
+            processing_time=round(time.perf_counter() - started, 4)
         )
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Resume tailoring failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Job ranking failed: {str(e)}")
 
 @app.post("/api/optimize-resume-text")
-async def optimize_resume_text(request: Dict[str, Any]):
+async def optimize_resume_text(request: Dict[str, Any], http_request: Request):
     """Optimize specific resume text sections using AI"""
     try:
         section_type = request.get("section_type")  # e.g., "summary", "experience", "skills"
         original_text = request.get("text")
         job_context = request.get("job_context", {})
         
-        optimized_text = await ai_service.optimize_text_section(
+        optimized_text = await until_disconnected(http_request, ai_service.optimize_text_section(
             text=original_text,
             section_type=section_type,
             job_context=job_context
-        )
+        ))
         
         return {
             "success": True,
@@ -189,9 +537,36 @@ async def optimize_resume_text(request: Dict[str, Any]):
             "optimized_text": optimized_text,
             "section_type": section_type
         }
+    except ClientDisconnectedError as e:
+        raise HTTPException(status_code=CLIENT_CLOSED_REQUEST, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Text optimization failed: {str(e)}")
 
+@app.post("/api/optimize-resume-sections", response_model=SectionsOptimizationResponse)
+async def optimize_resume_sections(request: SectionsOptimizationRequest, http_request: Request):
+    """Optimize several resume sections in one request"""
+    try:
+        results = await until_disconnected(http_request, ai_service.optimize_sections(
+            sections=[section.model_dump() for section in request.sections],
+            job_context=request.job_context
+        ))
+        
+        return SectionsOptimizationResponse(success=True, results=results)
+    except ClientDisconnectedError as e:
+        raise HTTPException(status_code=CLIENT_CLOSED_REQUEST, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Section optimization failed: {str(e)}")
+
+@app.post("/api/optimize-resume-text/stream")
+async def stream_optimize_resume_text(request: Dict[str, Any]):
+    """Streaming variant of /api/optimize-resume-text over server-sent events"""
+    events = ai_service.stream_text_section(
+        text=request.get("text"),
+        section_type=request.get("section_type"),
+        job_context=request.get("job_context", {})
+    )
+    return sse_response(events)
+
 @app.get("/api/supported-formats")
 async def get_supported_formats():
     """Get list of supported resume file formats"""
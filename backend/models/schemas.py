@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 
@@ -51,6 +51,8 @@ class TailoringSuggestionsResponse(BaseModel):
     priority_changes: List[TailoringSuggestion] = Field(default=[])
     ats_score: Optional[float] = Field(None, description="ATS friendliness score")
     missing_keywords: Optional[List[str]] = Field(default=[])
+    processing_time: Optional[float] = Field(None, description="Total time in seconds")
+    stage_times: Dict[str, float] = Field(default={}, description="Seconds per stage (parse_resume, analyze_job, suggestions)")
 
 class ParsedResume(BaseModel):
     personal_info: Dict[str, Any] = Field(default={})
@@ -75,3 +77,89 @@ class AIOptimizationResponse(BaseModel):
     optimized_text: str
     improvements: List[str] = Field(default=[], description="List of improvements made")
     keywords_added: List[str] = Field(default=[], description="Keywords incorporated")
+
+class SectionOptimizationInput(BaseModel):
+    id: Optional[str] = Field(None, description="Client-side section identifier (defaults to '#<position>')")
+    section_type: str = Field(..., description="Type of section (summary, experience, etc.)")
+    text: str = Field(..., description="Text to optimize")
+
+class SectionsOptimizationRequest(BaseModel):
+    sections: List[SectionOptimizationInput] = Field(..., description="Sections to optimize in one call")
+    job_context: Dict[str, Any] = Field(default={}, description="Job posting context")
+
+    @field_validator("sections")
+    @classmethod
+    def unique_section_ids(cls, sections: List[SectionOptimizationInput]) -> List[SectionOptimizationInput]:
+        """Results are matched back by id, so no two sections may share one"""
+        seen = set()
+        for index, section in enumerate(sections):
+            section_id = section.id or f"#{index}"
+            if section_id in seen:
+                raise ValueError(f"Duplicate section id '{section_id}'")
+            seen.add(section_id)
+        return sections
+
+class SectionOptimizationResult(BaseModel):
+    id: str
+    section_type: str
+    original_text: str
+    optimized_text: str
+    retried: bool = Field(default=False, description="Batch output was malformed and the section was redone alone")
+    error: Optional[str] = Field(None, description="Set when the section could not be optimized")
+
+class SectionsOptimizationResponse(BaseModel):
+    success: bool
+    results: List[SectionOptimizationResult] = Field(default=[])
+
+class QuickTailoringResponse(BaseModel):
+    success: bool
+    job_id: str = Field(..., description="Id of the background LLM enrichment job")
+    job_match_score: float = Field(..., description="Overall job match percentage (local heuristic)")
+    ats_score: Optional[float] = Field(None, description="ATS friendliness score")
+    semantic_score: Optional[float] = Field(None, description="Local embedding similarity to the job (0-100)")
+    missing_keywords: List[str] = Field(default=[])
+    processing_time: Optional[float] = Field(None, description="Time to this response in seconds")
+    stage_times: Dict[str, float] = Field(default={}, description="Seconds per stage (parse_resume, analyze_job)")
+    status: str = Field("pending", description="Enrichment status: pending, complete or failed")
+    poll_url: str = Field(..., description="GET for enrichment status and suggestions so far")
+    stream_url: str = Field(..., description="GET for enrichment events over SSE")
+
+class TailoringJobResponse(BaseModel):
+    success: bool
+    job_id: str
+    status: str
+    suggestions: List[TailoringSuggestion] = Field(default=[])
+    priority_changes: List[TailoringSuggestion] = Field(default=[])
+    error: Optional[str] = None
+
+class RankJobsRequest(BaseModel):
+    resume: Optional[Dict[str, Any]] = Field(None, description="Parsed resume, as returned by /api/parse-resume")
+    resume_id: Optional[str] = Field(None, description="Stored resume (/api/resumes) to use instead of resume")
+    jobs: List[JobPostingRequest] = Field(..., description="Job postings to rank")
+    top_k: Optional[int] = Field(None, ge=1, description="Return only the best top_k postings")
+
+class RankedJob(BaseModel):
+    index: int = Field(..., description="Position of the posting in the request")
+    title: str
+    company: str
+    url: Optional[str] = None
+    match_score: float
+    skills_score: float
+    keywords_score: float
+    experience_level: str
+    industry: str
+    missing_skills: List[str] = Field(default=[])
+
+class RankJobsResponse(BaseModel):
+    success: bool
+    results: List[RankedJob] = Field(default=[])
+    processing_time: float = Field(..., description="Ranking time in seconds")
+
+class ResumeVersionRequest(BaseModel):
+    resume: Dict[str, Any] = Field(..., description="Edited resume, in the shape of a stored resume's data")
+    note: Optional[str] = Field(None, description="What changed, e.g. the job it was tailored for")
+
+class ModelFeedbackRequest(BaseModel):
+    task: str = Field(..., description="Routing task the output came from (chat, rewrite, resume_match, ...)")
+    model: Optional[str] = Field(None, description="Model that produced the output, as returned by the endpoint")
+    rating: float = Field(..., ge=0.0, le=1.0, description="Output quality, 0 (unusable) to 1 (good)")
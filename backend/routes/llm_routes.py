@@ -1,16 +1,101 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
-import openai
-import os
 from dotenv import load_dotenv
+from services.llm_cache import llm_cache, llm_cache_bypass
+from services.single_flight import llm_flights
+from services.llm_streaming import stream_chat_completion, sse_response
+from services.prompt_builder import PromptBuilder
+from services.chat_sessions import chat_sessions
+from services.llm_providers import get_provider, get_latency_critical_provider
+from services.resilience import request_deadline, CircuitOpenError, DeadlineExceededError
+from services.llm_gateway import llm_gateway, RateLimitedError, INTERACTIVE
+from services.model_router import model_router
+from services.usage_ledger import usage_ledger, usage_context, current_user
+from services.resume_store import resume_store
 
 load_dotenv()
 
-router = APIRouter(prefix="/api/llm", tags=["LLM"])
+router = APIRouter(prefix="/api/llm", tags=["LLM"], dependencies=[Depends(llm_cache_bypass), Depends(request_deadline), Depends(usage_context)])
 
-# Configure OpenAI
-openai.api_key = os.getenv("OPENAI_API_KEY")
+# Trims resume/job context to each endpoint's token budget
+prompt_builder = PromptBuilder()
+
+async def _chat_completion(
+    messages: List[Dict[str, str]],
+    task: str,
+    max_tokens: int = 1500,
+    temperature: float = 0.3,
+    latency_critical: bool = False
+) -> Dict[str, Any]:
+    """Run a chat completion on the task's routed model, serving repeats of the same prompt from the cache"""
+    provider = get_provider()
+    model = model_router.route(task, messages, provider)
+    cache_key = llm_cache.make_key(f"{provider.name}/{model}", messages, temperature, max_tokens)
+    cached = llm_cache.get(cache_key)
+    if cached is not None:
+        usage_ledger.record(model, provider.name, cached.get("usage"), 0.0, cached=True, source="llm_routes")
+        return {**cached, "model": model}
+    
+    # Interactive calls may be hedged against a second provider
+    if latency_critical:
+        provider = get_latency_critical_provider()
+    
+    # Concurrent identical prompts share a single provider call
+    return await llm_flights.do(
+        cache_key,
+        lambda: _fetch_completion(
+            provider, cache_key, messages, model, max_tokens, temperature, task,
+            INTERACTIVE if latency_critical else None
+        )
+    )
+
+async def _fetch_completion(
+    provider,
+    cache_key: str,
+    messages: List[Dict[str, str]],
+    model: str,
+    max_tokens: int,
+    temperature: float,
+    task: str,
+    priority: Optional[int] = None
+) -> Dict[str, Any]:
+    """Call the provider through the gateway and cache the result"""
+    response = await llm_gateway.complete(
+        provider,
+        messages,
+        model=model,
+        max_tokens=max_tokens,
+        temperature=temperature,
+        priority=priority,
+        source="llm_routes",
+        task=task
+    )
+    
+    result = {
+        "content": response["content"],
+        "usage": response["usage"]
+    }
+    llm_cache.set(cache_key, result)
+    return {**result, "model": response["model"]}
+
+def _llm_error(e: Exception, action: str) -> HTTPException:
+    """Map an LLM failure to a response: 429 over quota, 503 while the circuit is open, 504 past the deadline"""
+    if isinstance(e, RateLimitedError):
+        return HTTPException(
+            status_code=429,
+            detail=f"{action} rate limited: {str(e)}",
+            headers={"Retry-After": str(int(e.retry_after) + 1)}
+        )
+    if isinstance(e, CircuitOpenError):
+        return HTTPException(
+            status_code=503,
+            detail=f"{action} temporarily unavailable: {str(e)}",
+            headers={"Retry-After": str(max(1, int(e.retry_after)))}
+        )
+    if isinstance(e, DeadlineExceededError):
+        return HTTPException(status_code=504, detail=f"{action} timed out: {str(e)}")
+    return HTTPException(status_code=500, detail=f"{action} failed: {str(e)}")
 
 class JobAnalysisRequest(BaseModel):
     job_description: str
@@ -19,15 +104,34 @@ class JobAnalysisRequest(BaseModel):
     job_url: Optional[str] = None
 
 class ResumeAnalysisRequest(BaseModel):
-    resume_content: str
+    resume_content: Optional[str] = None
+    resume_id: Optional[str] = None  # stored resume (/api/resumes) in place of resume_content
     job_description: str
 
+def _resume_content(request: ResumeAnalysisRequest) -> str:
+    """Resume text from the request, or from the caller's stored resume"""
+    if request.resume_id:
+        stored = resume_store.get(current_user(), request.resume_id)
+        if stored is None:
+            raise HTTPException(status_code=404, detail="Resume not found")
+        return stored.resume.get('raw_text', '') or ''
+    if request.resume_content is None:
+        raise HTTPException(status_code=422, detail="Send resume_content or resume_id")
+    return request.resume_content
+
 class ChatRequest(BaseModel):
     message: str
     context: Optional[str] = None
     resume_content: Optional[str] = None
     job_description: Optional[str] = None
 
+class ChatSessionRequest(BaseModel):
+    resume_content: Optional[str] = None
+    job_description: Optional[str] = None
+
+class ChatSessionMessage(BaseModel):
+    message: str
+
 class DocumentEditRequest(BaseModel):
     document_id: str
     suggested_changes: List[Dict[str, Any]]
@@ -55,19 +159,20 @@ async def analyze_job(request: JobAnalysisRequest):
         Format the response as structured JSON with these categories.
         """
         
-        response = openai.ChatCompletion.create(
-            model="gpt-4",
-            messages=[
+        response = await _chat_completion(
+            [
                 {"role": "system", "content": "You are an expert resume and job analysis assistant. Provide detailed, actionable insights."},
                 {"role": "user", "content": prompt}
             ],
+            task="job_analysis",
             max_tokens=1500,
             temperature=0.3
         )
         
         return {
             "status": "success", 
-            "analysis": response.choices[0].message.content,
+            "analysis": response["content"],
+            "model": response["model"],
             "job_info": {
                 "title": request.job_title,
                 "company": request.company,
@@ -75,20 +180,25 @@ async def analyze_job(request: JobAnalysisRequest):
             }
         }
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Job analysis failed: {str(e)}")
+        raise _llm_error(e, "Job analysis")
 
 @router.post("/analyze-resume-match")
 async def analyze_resume_match(request: ResumeAnalysisRequest):
     """Analyze how well a resume matches a job posting"""
+    resume_content = _resume_content(request)
     try:
+        resume_content, job_description = await prompt_builder.fit_context(
+            resume_content, request.job_description, "analyze_resume_match"
+        )
+        
         prompt = f"""
         Compare this resume against the job requirements and provide detailed feedback:
         
         JOB DESCRIPTION:
-        {request.job_description}
+        {job_description}
         
         RESUME CONTENT:
-        {request.resume_content}
+        {resume_content}
         
         Please provide:
         1. Match percentage (0-100%)
@@ -102,42 +212,25 @@ async def analyze_resume_match(request: ResumeAnalysisRequest):
         Format as structured JSON with actionable recommendations.
         """
         
-        response = openai.ChatCompletion.create(
-            model="gpt-4",
-            messages=[
+        response = await _chat_completion(
+            [
                 {"role": "system", "content": "You are an expert resume coach and ATS optimization specialist. Provide specific, actionable feedback."},
                 {"role": "user", "content": prompt}
             ],
+            task="resume_match",
             max_tokens=2000,
             temperature=0.3
         )
         
         return {
             "status": "success",
-            "analysis": response.choices[0].message.content
+            "analysis": response["content"],
+            "model": response["model"]
         }
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Resume analysis failed: {str(e)}")
+        raise _llm_error(e, "Resume analysis")
 
-@router.post("/chat")
-async def chat_with_llm(request: ChatRequest):
-    """Interactive chat for resume tailoring assistance"""
-    try:
-        # Build context for the conversation
-        context_parts = []
-        
-        if request.job_description:
-            context_parts.append(f"JOB DESCRIPTION:\n{request.job_description}")
-        
-        if request.resume_content:
-            context_parts.append(f"CURRENT RESUME:\n{request.resume_content}")
-        
-        if request.context:
-            context_parts.append(f"PREVIOUS CONTEXT:\n{request.context}")
-        
-        context_str = "\n\n".join(context_parts)
-        
-        system_prompt = """You are an expert resume coach and career advisor. You help users tailor their resumes for specific job applications. 
+CHAT_SYSTEM_PROMPT = """You are an expert resume coach and career advisor. You help users tailor their resumes for specific job applications. 
 
 Guidelines:
 - Provide specific, actionable advice
@@ -146,43 +239,173 @@ Guidelines:
 - Help with formatting and structure
 - Be encouraging but honest about areas for improvement
 - When making edit suggestions, be very specific about what to change and where"""
-        
-        user_prompt = f"""
+
+async def _build_chat_messages(request: ChatRequest) -> List[Dict[str, str]]:
+    """Build the chat prompt from the request's job, resume and prior context"""
+    resume_content, job_description = await prompt_builder.fit_context(
+        request.resume_content, request.job_description, "chat", focus_text=request.message
+    )
+    
+    context_parts = []
+    
+    if job_description:
+        context_parts.append(f"JOB DESCRIPTION:\n{job_description}")
+    
+    if resume_content:
+        context_parts.append(f"CURRENT RESUME:\n{resume_content}")
+    
+    if request.context:
+        context_parts.append(f"PREVIOUS CONTEXT:\n{request.context}")
+    
+    context_str = "\n\n".join(context_parts)
+    
+    user_prompt = f"""
         {context_str}
         
         USER QUESTION: {request.message}
         """
-        
-        response = openai.ChatCompletion.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
+    
+    return [
+        {"role": "system", "content": CHAT_SYSTEM_PROMPT},
+        {"role": "user", "content": user_prompt}
+    ]
+
+@router.post("/chat")
+async def chat_with_llm(request: ChatRequest):
+    """Interactive chat for resume tailoring assistance"""
+    try:
+        response = await _chat_completion(
+            await _build_chat_messages(request),
+            task="chat",
             max_tokens=1500,
-            temperature=0.7
+            temperature=0.7,
+            latency_critical=True
         )
         
         return {
             "status": "success",
-            "response": response.choices[0].message.content,
-            "usage": response.usage.total_tokens
+            "response": response["content"],
+            "model": response["model"],
+            "usage": response["usage"]["total_tokens"]
         }
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Chat failed: {str(e)}")
+        raise _llm_error(e, "Chat")
+
+@router.post("/chat/stream")
+async def stream_chat_with_llm(request: ChatRequest):
+    """Streaming variant of /chat: tokens over SSE, then a done event with usage"""
+    provider = get_provider()
+    messages = await _build_chat_messages(request)
+    events = stream_chat_completion(
+        provider,
+        messages,
+        model=model_router.route("chat", messages, provider),
+        max_tokens=1500,
+        temperature=0.7,
+        priority=INTERACTIVE,
+        task="chat"
+    )
+    return sse_response(events)
+
+@router.post("/chat/sessions")
+async def create_chat_session(request: ChatSessionRequest):
+    """Store the resume and job context once; later turns send only the message"""
+    resume_content, job_description = await prompt_builder.fit_context(
+        request.resume_content, request.job_description, "chat"
+    )
+    
+    context_parts = []
+    if job_description:
+        context_parts.append(f"JOB DESCRIPTION:\n{job_description}")
+    if resume_content:
+        context_parts.append(f"CURRENT RESUME:\n{resume_content}")
+    
+    session = chat_sessions.create(
+        current_user(), "\n\n".join(context_parts) or "No resume or job context provided."
+    )
+    return {"status": "success", "session_id": session.session_id}
+
+def _get_chat_session(session_id: str):
+    # Another user's session is answered exactly like a missing one
+    session = chat_sessions.get(current_user(), session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Chat session not found or expired")
+    return session
+
+@router.post("/chat/sessions/{session_id}/messages")
+async def chat_in_session(session_id: str, request: ChatSessionMessage):
+    """Send one chat turn within a stored session"""
+    session = _get_chat_session(session_id)
+    try:
+        async with session.lock:
+            response = await _chat_completion(
+                chat_sessions.build_messages(session, CHAT_SYSTEM_PROMPT, request.message),
+                task="chat",
+                max_tokens=1500,
+                temperature=0.7,
+                latency_critical=True
+            )
+            chat_sessions.record_turn(session, request.message, response["content"])
+        
+        return {
+            "status": "success",
+            "session_id": session_id,
+            "response": response["content"],
+            "model": response["model"],
+            "usage": response["usage"]["total_tokens"]
+        }
+    except Exception as e:
+        raise _llm_error(e, "Chat")
+
+@router.post("/chat/sessions/{session_id}/messages/stream")
+async def stream_chat_in_session(session_id: str, request: ChatSessionMessage):
+    """Streaming variant of a session turn; the turn is recorded when the stream completes"""
+    session = _get_chat_session(session_id)
+    
+    async def events():
+        async with session.lock:
+            provider = get_provider()
+            messages = chat_sessions.build_messages(session, CHAT_SYSTEM_PROMPT, request.message)
+            async for event in stream_chat_completion(
+                provider,
+                messages,
+                model=model_router.route("chat", messages, provider),
+                max_tokens=1500,
+                temperature=0.7,
+                priority=INTERACTIVE,
+                task="chat"
+            ):
+                if event["type"] == "done":
+                    chat_sessions.record_turn(session, request.message, event["content"])
+                    event["session_id"] = session_id
+                yield event
+    
+    return sse_response(events())
+
+@router.delete("/chat/sessions/{session_id}")
+async def delete_chat_session(session_id: str):
+    """End a chat session and drop its stored context"""
+    if not chat_sessions.delete(current_user(), session_id):
+        raise HTTPException(status_code=404, detail="Chat session not found or expired")
+    return {"status": "success"}
 
 @router.post("/suggest-edits")
 async def suggest_document_edits(request: ResumeAnalysisRequest):
     """Generate specific edit suggestions for a resume based on job requirements"""
+    resume_content = _resume_content(request)
     try:
+        resume_content, job_description = await prompt_builder.fit_context(
+            resume_content, request.job_description, "suggest_edits"
+        )
+        
         prompt = f"""
         Based on this job posting, provide specific edit suggestions for the resume:
         
         JOB POSTING:
-        {request.job_description}
+        {job_description}
         
         CURRENT RESUME:
-        {request.resume_content}
+        {resume_content}
         
         Provide specific, actionable edit suggestions in this JSON format:
         {{
@@ -211,19 +434,20 @@ async def suggest_document_edits(request: ResumeAnalysisRequest):
         - Optimizing for ATS
         """
         
-        response = openai.ChatCompletion.create(
-            model="gpt-4",
-            messages=[
+        response = await _chat_completion(
+            [
                 {"role": "system", "content": "You are an expert resume editor. Provide specific, implementable edit suggestions in the exact JSON format requested."},
                 {"role": "user", "content": prompt}
             ],
+            task="document_edits",
             max_tokens=2000,
             temperature=0.3
         )
         
         return {
             "status": "success",
-            "suggestions": response.choices[0].message.content
+            "suggestions": response["content"],
+            "model": response["model"]
         }
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Edit suggestions failed: {str(e)}")
+        raise _llm_error(e, "Edit suggestions")
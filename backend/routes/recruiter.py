@@ -0,0 +1,75 @@
+from fastapi import APIRouter, File, Form, UploadFile, HTTPException
+from pydantic import BaseModel, Field
+from typing import Optional, Dict, Any
+import json
+import uuid
+from models.schemas import JobPostingRequest
+from services.resume_parser import ResumeParser
+from services.job_analyzer import JobAnalyzer
+from services.resume_index import resume_index
+
+router = APIRouter(prefix="/api/recruiter", tags=["Recruiter"])
+
+resume_parser = ResumeParser()
+job_analyzer = JobAnalyzer()
+
+class IndexResumeRequest(BaseModel):
+    resume: Dict[str, Any] = Field(..., description="Parsed resume, as returned by /api/parse-resume")
+    resume_id: Optional[str] = Field(None, description="Stable id; re-indexing an id replaces it")
+    metadata: Optional[Dict[str, Any]] = Field(default={}, description="Returned with search results")
+
+class ResumeSearchRequest(BaseModel):
+    job: JobPostingRequest
+    top_k: int = Field(10, ge=1, le=500)
+    mode: str = Field("keyword", description="keyword (WAND over skills/keywords) or semantic (embedding nearest neighbours)")
+
+@router.post("/resumes")
+async def index_resume(request: IndexResumeRequest):
+    """Add a parsed resume to the recruiter index (or replace it)"""
+    resume_id = request.resume_id or uuid.uuid4().hex
+    try:
+        await resume_index.add(resume_id, request.resume, request.metadata)
+        return {"success": True, "resume_id": resume_id}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Resume indexing failed: {str(e)}")
+
+@router.post("/resumes/upload")
+async def upload_and_index_resume(
+    resume_file: UploadFile = File(...),
+    resume_id: Optional[str] = Form(None),
+    metadata: Optional[str] = Form(None)
+):
+    """Parse a resume file and add it to the recruiter index"""
+    resume_id = resume_id or uuid.uuid4().hex
+    try:
+        parsed_resume = await resume_parser.parse_resume(await resume_file.read(), resume_file.filename)
+        extra = json.loads(metadata) if metadata else {}
+        await resume_index.add(resume_id, parsed_resume, {"filename": resume_file.filename, **extra})
+        return {"success": True, "resume_id": resume_id}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Resume indexing failed: {str(e)}")
+
+@router.delete("/resumes/{resume_id}")
+async def delete_indexed_resume(resume_id: str):
+    """Remove a resume from the recruiter index"""
+    if not resume_index.delete(resume_id):
+        raise HTTPException(status_code=404, detail="Resume not found in index")
+    return {"success": True}
+
+@router.post("/search")
+async def search_resumes(request: ResumeSearchRequest):
+    """Top-k indexed resumes for one job posting"""
+    try:
+        analysis = await job_analyzer.analyze_job_posting(
+            title=request.job.title,
+            company=request.job.company,
+            description=request.job.description,
+            location=request.job.location
+        )
+        if request.mode == "semantic":
+            results = resume_index.semantic_search(analysis, top_k=request.top_k)
+        else:
+            results = resume_index.search(analysis, top_k=request.top_k)
+        return {"success": True, "mode": request.mode, "results": results}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Resume search failed: {str(e)}")
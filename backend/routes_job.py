@@ -1,22 +1,82 @@
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, File, Form, UploadFile, HTTPException
 from pydantic import BaseModel
-from typing import Any
+from typing import Optional
+from services.resume_parser import ResumeParser
+from services.speculative_tailoring import speculative_tailoring
+from services.usage_ledger import current_user
+from services.resume_store import resume_store
 
 router = APIRouter()
 
+resume_parser = ResumeParser()
+
 class JobData(BaseModel):
     title: str
     description: str
     url: str
-    # Add more fields as needed
+    company: Optional[str] = ""
+    location: Optional[str] = None
+
+@router.put("/api/job/default-resume")
+async def set_default_resume(
+    resume_file: Optional[UploadFile] = File(None),
+    resume_id: Optional[str] = Form(None)
+):
+    """Resume used to pre-tailor jobs this user captures (user from X-User-Id):
+    an upload, or a resume stored via /api/resumes"""
+    if resume_id:
+        stored = resume_store.get(current_user(), resume_id)
+        if stored is None:
+            raise HTTPException(status_code=404, detail="Resume not found")
+        speculative_tailoring.set_default_resume(current_user(), stored.resume)
+        return {"status": "success", "filename": stored.filename, "resume_id": resume_id}
+    if resume_file is None:
+        raise HTTPException(status_code=422, detail="Send resume_file or resume_id")
+    try:
+        parsed_resume = await resume_parser.parse_resume(await resume_file.read(), resume_file.filename)
+        speculative_tailoring.set_default_resume(current_user(), parsed_resume)
+        return {"status": "success", "filename": resume_file.filename}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Resume parsing failed: {str(e)}")
 
 @router.post("/api/job")
-async def receive_job(job: JobData, request: Request):
-    # Store job data, associate with user session
-    # Return job_id for further processing
-    return {"job_id": "job123", "status": "received"}
+async def receive_job(job: JobData):
+    """Store a captured job and start analyzing (and, with a default resume, tailoring) it right away"""
+    captured = speculative_tailoring.capture(current_user(), job.model_dump())
+    return {"job_id": captured.job_id, "status": "received"}
 
 @router.get("/api/job/{job_id}/analysis")
 async def get_job_analysis(job_id: str):
-    # Return analysis result for job_id
-    return {"job_id": job_id, "analysis": {"score": 85, "suggestions": []}}
+    """Analysis result for a captured job, complete or as far as it has got"""
+    # Another user's job is answered exactly like a missing one
+    captured = speculative_tailoring.get(current_user(), job_id)
+    if captured is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    assessment = captured.assessment or {}
+    tailoring = captured.tailoring
+    result = (tailoring.result if tailoring else None) or {}
+    return {
+        "job_id": job_id,
+        "status": captured.status,
+        "error": captured.error,
+        "job": captured.posting,
+        "analysis": {
+            "score": assessment.get("match_score"),
+            "ats_score": assessment.get("ats_score"),
+            "semantic_score": assessment.get("semantic_score"),
+            "missing_keywords": assessment.get("missing_keywords", []),
+            "suggestions": tailoring.suggestions if tailoring else [],
+            "priority_changes": result.get("priority_changes", []),
+            "job_analysis": captured.analysis
+        },
+        # Follow /api/tailor-resume/jobs/{tailoring_job_id}/stream for suggestions as they arrive
+        "tailoring_job_id": tailoring.job_id if tailoring else None
+    }
+
+@router.delete("/api/job/{job_id}/speculation")
+async def cancel_job_speculation(job_id: str):
+    """Stop background work for a captured job the user will not open"""
+    if speculative_tailoring.get(current_user(), job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"job_id": job_id, "cancelled": speculative_tailoring.cancel(current_user(), job_id)}
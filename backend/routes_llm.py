@@ -1,6 +1,5 @@
 from fastapi import APIRouter, Request
 from pydantic import BaseModel
-from typing import Any
 
 router = APIRouter()
 
@@ -12,12 +11,3 @@ class AnalyzeRequest(BaseModel):
 async def analyze_resume(data: AnalyzeRequest):
     # Call OpenAI API and return analysis
     return {"analysis": {"score": 90, "suggestions": ["Add more keywords"]}}
-
-class ChatRequest(BaseModel):
-    message: str
-    context: Any
-
-@router.post("/api/llm/chat")
-async def chat_with_llm(data: ChatRequest):
-    # Call OpenAI API and return chat response
-    return {"response": "Here's how you can improve your resume..."}
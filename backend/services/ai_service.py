@@ -1,54 +1,139 @@
-import openai
-from typing import Dict, Any, List
+from typing import Dict, Any, List, AsyncIterator
 import os
 import json
+import asyncio
 import logging
 from datetime import datetime
+from services.llm_cache import llm_cache
+from services.single_flight import llm_flights
+from services.llm_streaming import stream_chat_completion
+from services.suggestion_stream_parser import SuggestionStreamParser
+from services.prompt_builder import estimate_tokens
+from services.llm_providers import get_provider, get_latency_critical_provider
+from services.llm_gateway import llm_gateway, INTERACTIVE
+from services.model_router import model_router
+from services.usage_ledger import usage_ledger
+from services.term_index import term_indexer
+from services.semantic_index import semantic_encoder, resume_spans, job_spans
 
 logger = logging.getLogger(__name__)
 
 class AIService:
-    """Service for AI-powered resume analysis and optimization using OpenAI"""
+    """Service for AI-powered resume analysis and optimization (OpenAI by default)"""
     
     def __init__(self):
-        # Initialize OpenAI client
-        self.client = openai.OpenAI(
-            api_key=os.getenv('OPENAI_API_KEY')
-        )
+        # LLM backend selected by LLM_PROVIDER (openai, anthropic or mock)
+        self.provider = get_provider()
         
-        # Model configuration
-        self.model = "gpt-4-turbo-preview"  # Use latest GPT-4 model
+        # Model per call is picked by model_router from the task and prompt size
         self.max_tokens = 2000
         self.temperature = 0.3  # Lower temperature for more consistent results
+        
+        # Parallel (per-section) tailoring
+        self.section_concurrency = int(os.getenv('AI_SECTION_CONCURRENCY', '4'))
+        self.section_max_tokens = 600
     
     async def generate_tailoring_suggestions(
         self, 
         resume_data: Dict[str, Any], 
-        job_analysis: Dict[str, Any]
+        job_analysis: Dict[str, Any],
+        mode: str = "single"
     ) -> Dict[str, Any]:
-        """Generate AI-powered resume tailoring suggestions"""
+        """Generate AI-powered resume tailoring suggestions
+        
+        mode="single" asks for all suggestions in one completion; mode="parallel"
+        runs one smaller completion per resume section concurrently and merges them.
+        """
         try:
-            # Prepare context for AI
-            context = self._prepare_context(resume_data, job_analysis)
-            
-            # Generate suggestions using OpenAI
-            suggestions = await self._get_ai_suggestions(context)
-            
-            # Calculate match score
-            match_score = self._calculate_match_score(resume_data, job_analysis)
+            if mode == "parallel":
+                suggestions = await self._get_parallel_suggestions(resume_data, job_analysis)
+            else:
+                # Prepare context for AI
+                context = self._prepare_context(resume_data, job_analysis)
+                
+                # Generate suggestions using OpenAI
+                suggestions = await self._get_ai_suggestions(context)
             
             return {
                 "suggestions": suggestions,
-                "match_score": match_score,
                 "priority_changes": [s for s in suggestions if s.get("priority", 0) >= 4],
-                "missing_keywords": self._find_missing_keywords(resume_data, job_analysis),
-                "ats_score": self._calculate_ats_score(resume_data, job_analysis)
+                **self.heuristic_assessment(resume_data, job_analysis)
             }
             
         except Exception as e:
             logger.error(f"Error generating tailoring suggestions: {str(e)}")
             raise
     
+    async def stream_tailoring_suggestions(
+        self, 
+        resume_data: Dict[str, Any], 
+        job_analysis: Dict[str, Any]
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream tailoring suggestions, emitting each one as soon as its JSON object closes"""
+        context = self._prepare_context(resume_data, job_analysis)
+        parser = SuggestionStreamParser()
+        suggestions = []
+        full_text = ""
+        
+        try:
+            messages = self._suggestion_messages(context)
+            async for event in stream_chat_completion(
+                self.provider,
+                messages,
+                model=model_router.route("suggestions", messages, self.provider),
+                max_tokens=self.max_tokens,
+                temperature=self.temperature,
+                task="suggestions"
+            ):
+                if event["type"] == "token":
+                    for suggestion in parser.feed(event["content"]):
+                        suggestions.append(suggestion)
+                        yield {"type": "suggestion", "suggestion": suggestion}
+                elif event["type"] == "done":
+                    full_text = event["content"]
+        except Exception as e:
+            logger.error(f"Error streaming AI suggestions: {str(e)}")
+        
+        # Nothing parsed incrementally: fall back the same way _get_ai_suggestions does
+        if not suggestions:
+            fallback = self._parse_suggestions_fallback(full_text) if full_text else []
+            if not fallback:
+                fallback = self._generate_fallback_suggestions(context)
+            for suggestion in fallback:
+                suggestions.append(suggestion)
+                yield {"type": "suggestion", "suggestion": suggestion}
+        
+        yield {
+            "type": "done",
+            "priority_changes": [s for s in suggestions if s.get("priority", 0) >= 4],
+            **self.heuristic_assessment(resume_data, job_analysis)
+        }
+    
+    def heuristic_assessment(
+        self, 
+        resume_data: Dict[str, Any], 
+        job_analysis: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Match score, keyword gaps, ATS and semantic scores; local only, no LLM call"""
+        return {
+            "match_score": self._calculate_match_score(resume_data, job_analysis),
+            "missing_keywords": self._find_missing_keywords(resume_data, job_analysis),
+            "ats_score": self._calculate_ats_score(resume_data, job_analysis),
+            "semantic_score": self._calculate_semantic_score(resume_data, job_analysis)
+        }
+    
+    def _calculate_semantic_score(
+        self, 
+        resume_data: Dict[str, Any], 
+        job_analysis: Dict[str, Any]
+    ) -> float:
+        """Embedding similarity of resume spans to job bullets (catches synonyms keywords miss)"""
+        try:
+            return semantic_encoder.similarity(resume_spans(resume_data), job_spans(job_analysis))
+        except Exception as e:
+            logger.error(f"Error calculating semantic score: {str(e)}")
+            return 0.0
+    
     async def optimize_text_section(
         self, 
         text: str, 
@@ -59,33 +144,188 @@ class AIService:
         try:
             prompt = self._create_optimization_prompt(text, section_type, job_context)
             
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
+            return await self._chat_completion(
+                [
                     {"role": "system", "content": "You are an expert resume writer and career coach."},
                     {"role": "user", "content": prompt}
                 ],
-                max_tokens=self.max_tokens,
-                temperature=self.temperature
+                latency_critical=True,
+                task="rewrite"
             )
             
-            return response.choices[0].message.content.strip()
-            
         except Exception as e:
             logger.error(f"Error optimizing text section: {str(e)}")
             raise
     
+    def stream_text_section(
+        self, 
+        text: str, 
+        section_type: str, 
+        job_context: Dict[str, Any]
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream the optimized section as token events, ending with a done event"""
+        prompt = self._create_optimization_prompt(text, section_type, job_context)
+        
+        messages = [
+            {"role": "system", "content": "You are an expert resume writer and career coach."},
+            {"role": "user", "content": prompt}
+        ]
+        return stream_chat_completion(
+            self.provider,
+            messages,
+            model=model_router.route("rewrite", messages, self.provider),
+            max_tokens=self.max_tokens,
+            temperature=self.temperature,
+            priority=INTERACTIVE,
+            task="rewrite"
+        )
+    
+    async def optimize_sections(
+        self, 
+        sections: List[Dict[str, Any]], 
+        job_context: Dict[str, Any]
+    ) -> List[Dict[str, Any]]:
+        """Optimize several resume sections in one LLM call
+        
+        Each section dict has section_type, text and an optional id ("#<index>"
+        by default). The batch answer is validated per section; any section
+        whose result is missing or malformed is retried alone through
+        optimize_text_section.
+        """
+        if not sections:
+            return []
+        
+        items = [
+            {
+                "id": str(section.get("id") or f"#{index}"),
+                "section_type": section.get("section_type") or "general",
+                "text": section.get("text") or ""
+            }
+            for index, section in enumerate(sections)
+        ]
+        
+        messages = [
+            {"role": "system", "content": "You are an expert resume writer and career coach."},
+            {"role": "user", "content": self._create_batch_optimization_prompt(items, job_context)}
+        ]
+        batch_results: Dict[str, str] = {}
+        batch_answered = False
+        try:
+            ai_response = await self._chat_completion(
+                messages,
+                max_tokens=self._batch_max_tokens(items),
+                task="rewrite"
+            )
+            batch_results = self._parse_batch_optimization(ai_response)
+            batch_answered = True
+        except Exception as e:
+            logger.error(f"Error optimizing sections in batch: {str(e)}")
+        
+        results = []
+        retries = []
+        for item in items:
+            optimized = batch_results.get(item["id"])
+            result = {
+                "id": item["id"],
+                "section_type": item["section_type"],
+                "original_text": item["text"],
+                "optimized_text": optimized or "",
+                "retried": False,
+                "error": None
+            }
+            results.append(result)
+            if not self._is_valid_optimization(item["text"], optimized):
+                retries.append(result)
+        
+        if batch_answered:
+            # Share of sections the routed model answered usably, under the
+            # model name the gateway recorded the call with
+            model = self.provider.resolve_model(model_router.route("rewrite", messages, self.provider))
+            try:
+                model_router.feedback("rewrite", model, 1 - len(retries) / len(items))
+            except ValueError as e:
+                # LLM_ROUTING_TABLE names a model this provider does not serve
+                logger.warning(f"Routing feedback not recorded: {str(e)}")
+        
+        if retries:
+            outcomes = await asyncio.gather(
+                *[
+                    self.optimize_text_section(r["original_text"], r["section_type"], job_context)
+                    for r in retries
+                ],
+                return_exceptions=True
+            )
+            for result, outcome in zip(retries, outcomes):
+                result["retried"] = True
+                if isinstance(outcome, Exception):
+                    result["optimized_text"] = result["original_text"]
+                    result["error"] = str(outcome)
+                else:
+                    result["optimized_text"] = outcome
+        
+        return results
+    
+    async def _chat_completion(
+        self, 
+        messages: List[Dict[str, str]], 
+        max_tokens: int = None, 
+        latency_critical: bool = False,
+        task: str = "default"
+    ) -> str:
+        """Run a chat completion, serving repeats of the same prompt from the cache"""
+        max_tokens = max_tokens or self.max_tokens
+        model = model_router.route(task, messages, self.provider)
+        cache_key = llm_cache.make_key(f"{self.provider.name}/{model}", messages, self.temperature, max_tokens)
+        cached = llm_cache.get(cache_key)
+        if cached is not None:
+            usage_ledger.record(model, self.provider.name, cached.get("usage"), 0.0, cached=True, source="ai_service")
+            return cached["content"]
+        
+        # Interactive calls may be hedged against a second provider
+        provider = get_latency_critical_provider() if latency_critical else self.provider
+        
+        # Concurrent identical prompts share a single provider call
+        result = await llm_flights.do(
+            cache_key,
+            lambda: self._fetch_completion(
+                provider, cache_key, messages, model, max_tokens, task,
+                INTERACTIVE if latency_critical else None
+            )
+        )
+        return result["content"]
+    
+    async def _fetch_completion(
+        self, 
+        provider, 
+        cache_key: str, 
+        messages: List[Dict[str, str]], 
+        model: str,
+        max_tokens: int,
+        task: str,
+        priority: int = None
+    ) -> Dict[str, Any]:
+        """Call the provider through the gateway and cache the result"""
+        response = await llm_gateway.complete(
+            provider,
+            messages,
+            model=model,
+            max_tokens=max_tokens,
+            temperature=self.temperature,
+            priority=priority,
+            source="ai_service",
+            task=task
+        )
+        
+        result = {
+            "content": response["content"].strip(),
+            "usage": response["usage"]
+        }
+        llm_cache.set(cache_key, result)
+        return result
+    
     def _prepare_context(self, resume_data: Dict[str, Any], job_analysis: Dict[str, Any]) -> str:
         """Prepare context for AI analysis"""
-        context = f"""
-        JOB POSTING ANALYSIS:
-        - Title: {job_analysis.get('job_title', 'N/A')}
-        - Company: {job_analysis.get('company', 'N/A')}
-        - Industry: {job_analysis.get('industry', 'N/A')}
-        - Experience Level: {job_analysis.get('experience_level', 'N/A')}
-        - Required Skills: {', '.join(job_analysis.get('required_skills', []))}
-        - Key Requirements: {job_analysis.get('requirements', {})}
-        
+        context = f"""{self._prepare_job_context(job_analysis)}
         CURRENT RESUME DATA:
         - Summary: {resume_data.get('summary', 'N/A')}
         - Skills: {', '.join(resume_data.get('skills', []))}
@@ -96,10 +336,122 @@ class AIService:
         
         return context
     
-    async def _get_ai_suggestions(self, context: str) -> List[Dict[str, Any]]:
-        """Get AI-generated suggestions"""
+    def _prepare_job_context(self, job_analysis: Dict[str, Any]) -> str:
+        """Job half of the AI context, shared by whole-resume and per-section prompts"""
+        return f"""
+        JOB POSTING ANALYSIS:
+        - Title: {job_analysis.get('job_title', 'N/A')}
+        - Company: {job_analysis.get('company', 'N/A')}
+        - Industry: {job_analysis.get('industry', 'N/A')}
+        - Experience Level: {job_analysis.get('experience_level', 'N/A')}
+        - Required Skills: {', '.join(job_analysis.get('required_skills', []))}
+        - Key Requirements: {job_analysis.get('requirements', {})}
+        """
+    
+    def _resume_section_units(self, resume_data: Dict[str, Any]) -> List[Dict[str, str]]:
+        """Split a parsed resume into independent units for per-section suggestions"""
+        units = []
+        
+        if resume_data.get('summary'):
+            units.append({"section": "summary", "text": resume_data['summary']})
+        
+        for index, entry in enumerate(resume_data.get('experience', [])):
+            text = entry.get('description') or entry.get('raw_text', '')
+            if text:
+                units.append({"section": f"experience[{index}]", "text": text})
+        
+        if resume_data.get('skills'):
+            units.append({"section": "skills", "text": ', '.join(resume_data['skills'])})
+        
+        return units
+    
+    async def _get_parallel_suggestions(
+        self, 
+        resume_data: Dict[str, Any], 
+        job_analysis: Dict[str, Any]
+    ) -> List[Dict[str, Any]]:
+        """Map: one suggestion call per section under a concurrency cap. Reduce: dedupe and rank."""
+        units = self._resume_section_units(resume_data)
+        if not units:
+            return await self._get_ai_suggestions(self._prepare_context(resume_data, job_analysis))
+        
+        job_context = self._prepare_job_context(job_analysis)
+        semaphore = asyncio.Semaphore(self.section_concurrency)
+        
+        async def run(unit: Dict[str, str]) -> List[Dict[str, Any]]:
+            async with semaphore:
+                return await self._get_section_suggestions(unit["section"], unit["text"], job_context)
+        
+        per_section = await asyncio.gather(*[run(unit) for unit in units])
+        suggestions = self._merge_suggestions(per_section)
+        
+        return suggestions or self._generate_fallback_suggestions(job_context)
+    
+    async def _get_section_suggestions(
+        self, 
+        section: str, 
+        text: str, 
+        job_context: str
+    ) -> List[Dict[str, Any]]:
+        """Suggestions for a single resume section; failures yield no suggestions"""
+        prompt = f"""
+            Based on the following job posting analysis, provide 1-3 specific, actionable suggestions to tailor this single resume section for the job.
+            
+            {job_context}
+            
+            RESUME SECTION ({section}):
+            {text}
+            
+            Respond with a JSON array where each suggestion has this structure:
+            {{
+                "section": "{section}",
+                "type": "add|modify|remove",
+                "original_text": "current text (if modifying)",
+                "suggested_text": "new text",
+                "reason": "explanation for the change",
+                "priority": 1-5 (5 being highest priority)
+            }}
+            """
+        
+        try:
+            ai_response = await self._chat_completion(
+                [
+                    {"role": "system", "content": "You are an expert resume writer with deep knowledge of ATS systems and hiring practices."},
+                    {"role": "user", "content": prompt}
+                ],
+                max_tokens=self.section_max_tokens,
+                task="suggestions"
+            )
+            return self._parse_suggestions(ai_response)
+        except Exception as e:
+            logger.error(f"Error getting suggestions for section {section}: {str(e)}")
+            return []
+    
+    def _merge_suggestions(self, per_section: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """Drop duplicate suggestions and order by priority, highest first"""
+        merged = {}
+        for suggestions in per_section:
+            for suggestion in suggestions:
+                if not isinstance(suggestion, dict):
+                    continue
+                text = ' '.join(str(suggestion.get('suggested_text', '')).lower().split())
+                key = (str(suggestion.get('type', '')).lower(), text)
+                kept = merged.get(key)
+                if kept is None or self._priority(suggestion) > self._priority(kept):
+                    merged[key] = suggestion
+        
+        return sorted(merged.values(), key=self._priority, reverse=True)
+    
+    @staticmethod
+    def _priority(suggestion: Dict[str, Any]) -> int:
         try:
-            prompt = f"""
+            return int(suggestion.get('priority', 0))
+        except (TypeError, ValueError):
+            return 0
+    
+    def _suggestion_messages(self, context: str) -> List[Dict[str, str]]:
+        """Build the chat messages that ask for tailoring suggestions"""
+        prompt = f"""
             Based on the following job posting and resume data, provide specific, actionable suggestions to tailor the resume for this job. Focus on:
             
             1. Keywords to add or emphasize
@@ -123,47 +475,49 @@ class AIService:
             
             Provide 5-10 specific, actionable suggestions.
             """
-            
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are an expert resume writer with deep knowledge of ATS systems and hiring practices."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=self.max_tokens,
-                temperature=self.temperature
-            )
-            
+        
+        return [
+            {"role": "system", "content": "You are an expert resume writer with deep knowledge of ATS systems and hiring practices."},
+            {"role": "user", "content": prompt}
+        ]
+    
+    async def _get_ai_suggestions(self, context: str) -> List[Dict[str, Any]]:
+        """Get AI-generated suggestions"""
+        try:
             # Parse AI response
-            ai_response = response.choices[0].message.content.strip()
+            ai_response = await self._chat_completion(self._suggestion_messages(context), task="suggestions")
             
-            # Try to extract JSON from the response
-            try:
-                # Look for JSON content between ```json tags or parse directly
-                if "```json" in ai_response:
-                    json_start = ai_response.find("```json") + 7
-                    json_end = ai_response.find("```", json_start)
-                    json_content = ai_response[json_start:json_end]
-                else:
-                    json_content = ai_response
-                
-                suggestions = json.loads(json_content)
-                
-                # Ensure suggestions is a list
-                if isinstance(suggestions, dict):
-                    suggestions = [suggestions]
-                
-                return suggestions
-                
-            except json.JSONDecodeError:
-                # Fallback: parse suggestions manually
-                return self._parse_suggestions_fallback(ai_response)
+            return self._parse_suggestions(ai_response)
             
         except Exception as e:
             logger.error(f"Error getting AI suggestions: {str(e)}")
             # Return basic suggestions as fallback
             return self._generate_fallback_suggestions(context)
     
+    def _parse_suggestions(self, ai_response: str) -> List[Dict[str, Any]]:
+        """Parse suggestions from a completion, falling back to line-based parsing"""
+        # Try to extract JSON from the response
+        try:
+            # Look for JSON content between ```json tags or parse directly
+            if "```json" in ai_response:
+                json_start = ai_response.find("```json") + 7
+                json_end = ai_response.find("```", json_start)
+                json_content = ai_response[json_start:json_end]
+            else:
+                json_content = ai_response
+            
+            suggestions = json.loads(json_content)
+            
+            # Ensure suggestions is a list
+            if isinstance(suggestions, dict):
+                suggestions = [suggestions]
+            
+            return suggestions
+            
+        except json.JSONDecodeError:
+            # Fallback: parse suggestions manually
+            return self._parse_suggestions_fallback(ai_response)
+    
     def _parse_suggestions_fallback(self, ai_response: str) -> List[Dict[str, Any]]:
         """Fallback parsing when JSON parsing fails"""
         suggestions = []
@@ -239,6 +593,73 @@ class AIService:
         Return only the optimized text without explanations.
         """
     
+    def _create_batch_optimization_prompt(
+        self, 
+        items: List[Dict[str, str]], 
+        job_context: Dict[str, Any]
+    ) -> str:
+        """Create one prompt that optimizes every section, sharing the job context"""
+        sections_text = "\n\n".join(
+            f"[id: {item['id']}] ({item['section_type']})\n{item['text']}"
+            for item in items
+        )
+        
+        return f"""
+        Please optimize each of the following resume sections for the given job context.
+        
+        Sections:
+        {sections_text}
+        
+        Job Context:
+        - Title: {job_context.get('title', 'N/A')}
+        - Company: {job_context.get('company', 'N/A')}
+        - Required Skills: {', '.join(job_context.get('required_skills', []))}
+        - Industry: {job_context.get('industry', 'N/A')}
+        
+        Requirements:
+        1. Maintain the same general structure and length for each section
+        2. Incorporate relevant keywords naturally
+        3. Use action verbs and quantifiable achievements
+        4. Make it ATS-friendly
+        5. Keep it professional and concise
+        
+        Return only JSON in this format, with one entry per section id:
+        {{"sections": [{{"id": "section id", "optimized_text": "optimized text"}}]}}
+        """
+    
+    def _batch_max_tokens(self, items: List[Dict[str, str]]) -> int:
+        """Output budget for a batch: room for every section plus JSON overhead"""
+        input_tokens = sum(estimate_tokens(item["text"]) for item in items)
+        return min(4096, max(self.max_tokens, int(input_tokens * 1.5) + 50 * len(items)))
+    
+    def _parse_batch_optimization(self, ai_response: str) -> Dict[str, str]:
+        """Map section id to optimized text from a batch response"""
+        json_content = ai_response
+        if "```json" in ai_response:
+            json_start = ai_response.find("```json") + 7
+            json_end = ai_response.find("```", json_start)
+            json_content = ai_response[json_start:json_end]
+        
+        try:
+            data = json.loads(json_content)
+        except json.JSONDecodeError:
+            logger.warning("Batch optimization response was not valid JSON")
+            return {}
+        
+        entries = data.get("sections", []) if isinstance(data, dict) else data
+        results = {}
+        for entry in entries if isinstance(entries, list) else []:
+            if isinstance(entry, dict) and entry.get("id") is not None:
+                results[str(entry["id"])] = entry.get("optimized_text")
+        return results
+    
+    def _is_valid_optimization(self, original: str, optimized: Any) -> bool:
+        """A section result must be non-empty text of a plausible length"""
+        if not isinstance(optimized, str) or not optimized.strip():
+            return False
+        # The prompt asks to keep the length; wild growth means the model merged sections
+        return len(optimized) <= max(200, len(original) * 3)
+    
     def _calculate_match_score(
         self, 
         resume_data: Dict[str, Any], 
@@ -249,21 +670,21 @@ class AIService:
             score = 0.0
             total_factors = 0
             
+            index = term_indexer.index_for(resume_data)
+            
             # Skills match (40% weight)
-            resume_skills = set(skill.lower() for skill in resume_data.get('skills', []))
-            required_skills = set(skill.lower() for skill in job_analysis.get('required_skills', []))
+            required_skills = set(term_indexer.skill_id(skill) for skill in job_analysis.get('required_skills', []))
             
             if required_skills:
-                skills_match = len(resume_skills.intersection(required_skills)) / len(required_skills)
+                skills_match = sum(1 for skill in required_skills if term_indexer.has_skill(index, skill)) / len(required_skills)
                 score += skills_match * 40
             total_factors += 40
             
             # Keywords match (30% weight)
-            resume_text = resume_data.get('raw_text', '').lower()
             job_keywords = [kw.lower() for kw in job_analysis.get('keywords', [])]
             
             if job_keywords:
-                keyword_matches = sum(1 for kw in job_keywords if kw in resume_text)
+                keyword_matches = sum(1 for kw in job_keywords if index.contains(kw))
                 keyword_score = keyword_matches / len(job_keywords)
                 score += keyword_score * 30
             total_factors += 30
@@ -311,10 +732,9 @@ class AIService:
     ) -> float:
         """Match industry relevance"""
         # Simplified industry matching
-        resume_text = resume_data.get('raw_text', '').lower()
         job_industry = job_analysis.get('industry', '').lower()
         
-        if job_industry in resume_text:
+        if job_industry and term_indexer.index_for(resume_data).contains(job_industry):
             return 1.0
         else:
             return 0.5  # Assume some transferable skills
@@ -325,7 +745,7 @@ class AIService:
         job_analysis: Dict[str, Any]
     ) -> List[str]:
         """Find important keywords missing from resume"""
-        resume_text = resume_data.get('raw_text', '').lower()
+        index = term_indexer.index_for(resume_data)
         job_keywords = [kw.lower() for kw in job_analysis.get('keywords', [])]
         required_skills = [skill.lower() for skill in job_analysis.get('required_skills', [])]
         
@@ -333,12 +753,12 @@ class AIService:
         
         # Check for missing skills
         for skill in required_skills:
-            if skill not in resume_text:
+            if not term_indexer.has_skill(index, skill):
                 missing.append(skill)
         
         # Check for missing important keywords (top 10)
         for keyword in job_keywords[:10]:
-            if keyword not in resume_text and keyword not in missing:
+            if not index.contains(keyword) and keyword not in missing:
                 missing.append(keyword)
         
         return missing[:10]  # Return top 10 missing keywords
@@ -0,0 +1,52 @@
+from fastapi import Request
+from typing import Dict, Any, Awaitable, Optional, TypeVar
+import asyncio
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Non-standard status (nginx) for a request the client abandoned; nobody reads the body
+CLIENT_CLOSED_REQUEST = 499
+
+_metrics = {
+    'watched': 0,
+    'cancelled': 0
+}
+
+
+class ClientDisconnectedError(Exception):
+    """The client went away before the response was ready"""
+
+
+async def until_disconnected(request: Request, work: Awaitable[T], poll_seconds: Optional[float] = None) -> T:
+    """Await work, cancelling it as soon as the client disconnects
+
+    Cancellation reaches everything the work is awaiting: queued parser
+    threads are dropped, LLM calls waiting in the gateway leave the queue,
+    and provider requests in flight are closed (a shared single-flight call
+    only once no other request is waiting on it). Work that was cancelled
+    writes no results.
+    """
+    poll_seconds = poll_seconds or float(os.getenv('DISCONNECT_POLL_SECONDS', '0.25'))
+    _metrics['watched'] += 1
+    task = asyncio.ensure_future(work)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_seconds)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                _metrics['cancelled'] += 1
+                logger.info(f"Client disconnected; cancelling {request.method} {request.url.path}")
+                raise ClientDisconnectedError(f"Client disconnected from {request.url.path}")
+    finally:
+        if not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+
+def cancellation_stats() -> Dict[str, Any]:
+    return dict(_metrics)
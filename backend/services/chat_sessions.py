@@ -0,0 +1,122 @@
+from typing import Dict, Any, List, Optional
+from collections import OrderedDict
+from dataclasses import dataclass, field
+import asyncio
+import logging
+import os
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ChatSession:
+    """Conversation state kept on the server between chat turns"""
+    session_id: str
+    user: str
+    context: str
+    summary: str = ""
+    turns: List[Dict[str, str]] = field(default_factory=list)
+    created_at: float = field(default_factory=time.time)
+    last_active: float = field(default_factory=time.time)
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock, repr=False)
+
+
+class ChatSessionStore:
+    """In-memory chat sessions with bounded history and folding of old turns
+
+    Messages are laid out so everything before the newest turns stays
+    byte-identical across requests (system prompt, stored context, summary),
+    which lets provider-side prompt caching reuse the prefix.
+    """
+
+    def __init__(
+        self,
+        max_sessions: Optional[int] = None,
+        idle_ttl_seconds: Optional[int] = None,
+        max_turns: Optional[int] = None
+    ):
+        self.max_sessions = max_sessions or int(os.getenv('CHAT_MAX_SESSIONS', '1000'))
+        self.idle_ttl_seconds = idle_ttl_seconds or int(os.getenv('CHAT_SESSION_TTL_SECONDS', '3600'))
+        # Message pairs kept verbatim; older ones are folded into the summary
+        self.max_turns = max_turns or int(os.getenv('CHAT_MAX_TURNS', '6'))
+        self.summary_chars_per_message = 240
+        self.max_summary_chars = 2000
+        self._sessions: "OrderedDict[str, ChatSession]" = OrderedDict()
+
+    def create(self, user: str, context: str) -> ChatSession:
+        """Start a session for the user holding the resume/job context"""
+        self._evict_expired()
+        session = ChatSession(session_id=uuid.uuid4().hex, user=user, context=context)
+        self._sessions[session.session_id] = session
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+        return session
+
+    def get(self, user: str, session_id: str) -> Optional[ChatSession]:
+        """Return the user's live session and mark it active; None if unknown, expired or not theirs"""
+        session = self._sessions.get(session_id)
+        if session is None or session.user != user:
+            return None
+        if time.time() - session.last_active > self.idle_ttl_seconds:
+            del self._sessions[session_id]
+            return None
+        session.last_active = time.time()
+        self._sessions.move_to_end(session_id)
+        return session
+
+    def delete(self, user: str, session_id: str) -> bool:
+        session = self._sessions.get(session_id)
+        if session is None or session.user != user:
+            return False
+        del self._sessions[session_id]
+        return True
+
+    def build_messages(self, session: ChatSession, system_prompt: str, message: str) -> List[Dict[str, str]]:
+        """Stable prefix first, then recent turns, then the new user message"""
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "system", "content": session.context}
+        ]
+        if session.summary:
+            messages.append({"role": "system", "content": f"EARLIER CONVERSATION (summarized):\n{session.summary}"})
+        messages.extend(session.turns)
+        messages.append({"role": "user", "content": message})
+        return messages
+
+    def record_turn(self, session: ChatSession, message: str, response: str):
+        """Append a user/assistant pair and fold the oldest pairs past the limit"""
+        session.turns.append({"role": "user", "content": message})
+        session.turns.append({"role": "assistant", "content": response})
+
+        if len(session.turns) > self.max_turns * 2:
+            # Fold down to half the limit at once so the summary (part of the
+            # cached prefix) only changes every few turns, not on every turn
+            keep = max(1, self.max_turns // 2) * 2
+            folded, session.turns = session.turns[:-keep], session.turns[-keep:]
+            lines = [session.summary] if session.summary else []
+            lines.extend(
+                f"{turn['role']}: {self._condense(turn['content'])}"
+                for turn in folded
+            )
+            session.summary = "\n".join(lines)[-self.max_summary_chars:]
+
+    def _condense(self, text: str) -> str:
+        """Extractive summary of one message: collapsed whitespace, clipped"""
+        text = ' '.join(text.split())
+        if len(text) <= self.summary_chars_per_message:
+            return text
+        return text[:self.summary_chars_per_message].rsplit(' ', 1)[0] + ' ...'
+
+    def _evict_expired(self):
+        cutoff = time.time() - self.idle_ttl_seconds
+        for session_id in [sid for sid, s in self._sessions.items() if s.last_active < cutoff]:
+            del self._sessions[session_id]
+
+    def stats(self) -> Dict[str, Any]:
+        return {'active_sessions': len(self._sessions)}
+
+
+# Shared store used by the chat endpoints
+chat_sessions = ChatSessionStore()
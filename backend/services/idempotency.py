@@ -0,0 +1,241 @@
+from typing import Dict, Any, List, Optional
+from collections import OrderedDict
+from dataclasses import dataclass, field
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from services.usage_ledger import USER_HEADER
+from services.cancellation import CLIENT_CLOSED_REQUEST
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = "idempotency-key"
+REPLAYED_HEADER = (b"idempotent-replayed", b"true")
+
+# Expensive POSTs the extension retries on network errors
+DEFAULT_PATHS = ("/api/tailor-resume", "/api/analyze-job", "/api/llm/suggest-edits")
+
+_BOUNDARY = re.compile(rb'boundary="?([^";]+)"?')
+
+
+@dataclass
+class IdempotentEntry:
+    """One Idempotency-Key: the request it was first used with and, once done, its response"""
+    fingerprint: str
+    status: Optional[int] = None
+    headers: List[tuple] = field(default_factory=list)
+    body: bytearray = field(default_factory=bytearray)
+    waiters: int = 0
+    disconnected_at: Optional[float] = None
+    completed_at: Optional[float] = None
+    done: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+
+class IdempotencyStore:
+    """Responses by (user, path, Idempotency-Key), kept for ttl_seconds after they complete"""
+
+    def __init__(self, ttl_seconds: Optional[float] = None, max_entries: Optional[int] = None):
+        self.ttl_seconds = ttl_seconds or float(os.getenv('IDEMPOTENCY_TTL_SECONDS', '3600'))
+        self.max_entries = max_entries or int(os.getenv('IDEMPOTENCY_MAX_ENTRIES', '1000'))
+        self.entries: "OrderedDict[tuple, IdempotentEntry]" = OrderedDict()
+        self.metrics = {
+            'executed': 0,
+            'replayed': 0,
+            'attached': 0,
+            'conflicts': 0,
+            'not_stored': 0
+        }
+
+    def get(self, entry_key: tuple) -> Optional[IdempotentEntry]:
+        self._evict()
+        return self.entries.get(entry_key)
+
+    def add(self, entry_key: tuple, entry: IdempotentEntry):
+        self.entries[entry_key] = entry
+
+    def discard(self, entry_key: tuple, entry: IdempotentEntry):
+        if self.entries.get(entry_key) is entry:
+            del self.entries[entry_key]
+
+    def _evict(self):
+        now = time.time()
+        for entry_key in [k for k, e in self.entries.items() if e.completed_at and now - e.completed_at > self.ttl_seconds]:
+            del self.entries[entry_key]
+        # Over capacity: drop the oldest completed responses, never running ones
+        for entry_key in list(self.entries):
+            if len(self.entries) < self.max_entries:
+                break
+            if self.entries[entry_key].completed_at is not None:
+                del self.entries[entry_key]
+
+    def stats(self) -> Dict[str, Any]:
+        in_flight = sum(1 for entry in self.entries.values() if entry.completed_at is None)
+        return {
+            **self.metrics,
+            'stored': len(self.entries) - in_flight,
+            'in_flight': in_flight,
+            'stored_bytes': sum(len(entry.body) for entry in self.entries.values() if entry.completed_at)
+        }
+
+
+# Shared by the middleware and /api/metrics
+idempotency_store = IdempotencyStore()
+
+
+class IdempotencyMiddleware:
+    """Run a POST carrying an Idempotency-Key once, and replay its response to retries
+
+    A retry that arrives while the first request is still running waits for
+    it and gets the same response; one that arrives later, within the
+    store's ttl, gets the stored response replayed byte for byte (plus an
+    Idempotent-Replayed header). Keys are scoped per user (X-User-Id) and
+    path; reusing one with a different request body is answered with 422.
+    Server errors are not stored, so a retry after one runs again.
+
+    If the first client disconnects, its work keeps running for up to
+    retry_grace_seconds (and for as long as a retry is attached) instead
+    of being cancelled, so the retry that follows a network blip can pick
+    up the result.
+    """
+
+    def __init__(
+        self,
+        app,
+        paths: Optional[List[str]] = None,
+        store: Optional[IdempotencyStore] = None,
+        retry_grace_seconds: Optional[float] = None
+    ):
+        self.app = app
+        configured = os.getenv('IDEMPOTENCY_PATHS')
+        self.paths = set(paths or (configured.split(',') if configured else DEFAULT_PATHS))
+        self.store = store or idempotency_store
+        self.metrics = self.store.metrics
+        self.retry_grace_seconds = retry_grace_seconds or float(os.getenv('IDEMPOTENCY_RETRY_GRACE_SECONDS', '15'))
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope["headers"])
+        key = headers.get(IDEMPOTENCY_HEADER.encode())
+        if not key:
+            await self.app(scope, receive, send)
+            return
+
+        body = await self._read_body(receive)
+        fingerprint = self._fingerprint(scope, headers, body)
+        entry_key = (headers.get(USER_HEADER.lower().encode(), b"anonymous"), scope["path"], key)
+
+        while True:
+            entry = self.store.get(entry_key)
+            if entry is None:
+                entry = IdempotentEntry(fingerprint=fingerprint)
+                self.store.add(entry_key, entry)
+                await self._execute(entry_key, entry, scope, receive, send, body)
+                return
+            if entry.fingerprint != fingerprint:
+                self.metrics['conflicts'] += 1
+                await self._send_json(send, 422, {"detail": "Idempotency-Key was already used with a different request"})
+                return
+            if entry.completed_at is None:
+                # Same request still running: wait for its response
+                self.metrics['attached'] += 1
+                entry.waiters += 1
+                try:
+                    await entry.done.wait()
+                finally:
+                    entry.waiters -= 1
+                if entry.completed_at is None:
+                    continue  # it failed without a storable response; run it here instead
+            self.metrics['replayed'] += 1
+            await send({"type": "http.response.start", "status": entry.status, "headers": [*entry.headers, REPLAYED_HEADER]})
+            await send({"type": "http.response.body", "body": bytes(entry.body)})
+            return
+
+    async def _execute(self, entry_key: tuple, entry: IdempotentEntry, scope, receive, send, body: bytes):
+        self.metrics['executed'] += 1
+        body_sent = False
+
+        async def replay_receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            if entry.disconnected_at is None:
+                message = await receive()
+                if message["type"] != "http.disconnect":
+                    return message
+                entry.disconnected_at = time.monotonic()
+            # The client is gone; hold the disconnect back while a retry may still want the result
+            while not entry.done.is_set() and (
+                entry.waiters or time.monotonic() - entry.disconnected_at < self.retry_grace_seconds
+            ):
+                try:
+                    await asyncio.wait_for(entry.done.wait(), timeout=0.5)
+                except asyncio.TimeoutError:
+                    pass
+            return {"type": "http.disconnect"}
+
+        async def capture_send(message):
+            if message["type"] == "http.response.start":
+                entry.status = message["status"]
+                entry.headers = list(message.get("headers", []))
+            elif message["type"] == "http.response.body":
+                entry.body.extend(message.get("body", b""))
+            try:
+                await send(message)
+            except Exception:
+                # Still finish the response for retries if only the first client is gone
+                if entry.disconnected_at is None:
+                    raise
+
+        stored = False
+        try:
+            await self.app(scope, replay_receive, capture_send)
+            # Server errors (and abandoned requests) are worth retrying, so they are not kept
+            stored = entry.status is not None and entry.status < 500 and entry.status != CLIENT_CLOSED_REQUEST
+        finally:
+            if stored:
+                entry.completed_at = time.time()
+            else:
+                self.metrics['not_stored'] += 1
+                entry.status = None
+                self.store.discard(entry_key, entry)
+            entry.done.set()
+
+    @staticmethod
+    async def _read_body(receive) -> bytes:
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] != "http.request":
+                break
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        return b"".join(chunks)
+
+    @staticmethod
+    def _fingerprint(scope, headers: Dict[bytes, bytes], body: bytes) -> str:
+        """Hash of the request; multipart boundaries (new on every retry) are left out"""
+        match = _BOUNDARY.search(headers.get(b"content-type", b""))
+        if match:
+            body = body.replace(match.group(1), b"")
+        digest = hashlib.sha256(scope.get("query_string", b""))
+        digest.update(b"\x00")
+        digest.update(body)
+        return digest.hexdigest()
+
+    @staticmethod
+    async def _send_json(send, status: int, payload: Dict[str, Any]):
+        body = json.dumps(payload).encode('utf-8')
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -2,6 +2,7 @@ from typing import Dict, Any, List
 import re
 import logging
 from services.keyword_extractor import KeywordExtractor
+from services.single_flight import analysis_flights
 
 logger = logging.getLogger(__name__)
 
@@ -47,6 +48,21 @@ class JobAnalyzer:
         location: str = None
     ) -> Dict[str, Any]:
         """Analyze a job posting and extract structured information"""
+        # Identical postings submitted concurrently share one analysis
+        key = analysis_flights.make_key(title, company, description, location)
+        return await analysis_flights.do(
+            key,
+            lambda: self._analyze_job_posting(title, company, description, location)
+        )
+    
+    async def _analyze_job_posting(
+        self, 
+        title: str, 
+        company: str, 
+        description: str, 
+        location: str = None
+    ) -> Dict[str, Any]:
+        """Run the full analysis for one posting"""
         try:
             analysis = {
                 'job_title': title,
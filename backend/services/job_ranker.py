@@ -0,0 +1,191 @@
+from typing import Dict, Any, List, Optional
+import logging
+import time
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import CountVectorizer, ENGLISH_STOP_WORDS
+from services.job_analyzer import JobAnalyzer
+from services.term_index import term_indexer, sequence_terms, tokenize
+
+logger = logging.getLogger(__name__)
+
+# Same weights as AIService._calculate_match_score
+SCORE_WEIGHTS = {
+    'skills': 40.0,
+    'keywords': 30.0,
+    'experience': 20.0,
+    'industry': 10.0
+}
+
+# Keywords per posting, as KeywordExtractor.extract_keywords returns by default
+KEYWORDS_PER_JOB = 20
+
+
+def _pretokenized(terms: List[str]) -> List[str]:
+    return terms
+
+
+class JobRanker:
+    """Rank many job postings against one parsed resume with matrix operations
+
+    Skills, keywords and industry are extracted for all postings at once as
+    sparse count matrices; the score of every posting is then a handful of
+    matrix-vector products against the resume's term index, using the same
+    factors and weights as the single-posting match score.
+    """
+
+    def __init__(self, job_analyzer: Optional[JobAnalyzer] = None):
+        self.job_analyzer = job_analyzer or JobAnalyzer()
+        extractor = self.job_analyzer.keyword_extractor
+        self.stop_words = set(ENGLISH_STOP_WORDS) | set(extractor.stop_words)
+
+        # Skill spellings -> canonical skill ids, as a 0/1 projection matrix
+        aliases = term_indexer.skill_aliases
+        self.skill_ids = sorted(set(aliases.values()))
+        skill_column = {skill: i for i, skill in enumerate(self.skill_ids)}
+        self.skill_vectorizer = CountVectorizer(
+            analyzer=_pretokenized, vocabulary=sorted(a for a in aliases if a), binary=True
+        )
+        alias_rows = [skill_column[aliases[a]] for a in self.skill_vectorizer.vocabulary]
+        self.alias_to_skill = sparse.csr_matrix(
+            (np.ones(len(alias_rows)), (np.arange(len(alias_rows)), alias_rows)),
+            shape=(len(alias_rows), len(self.skill_ids))
+        )
+
+        # Industry keyword counts -> per-industry totals, like JobAnalyzer._classify_industry
+        self.industries = list(self.job_analyzer.industry_keywords)
+        industry_terms = sorted({
+            " ".join(tokenize(keyword))
+            for keywords in self.job_analyzer.industry_keywords.values()
+            for keyword in keywords
+        })
+        self.industry_vectorizer = CountVectorizer(analyzer=_pretokenized, vocabulary=industry_terms)
+        term_column = {term: i for i, term in enumerate(industry_terms)}
+        rows, cols = [], []
+        for j, industry in enumerate(self.industries):
+            for keyword in self.job_analyzer.industry_keywords[industry]:
+                rows.append(term_column[" ".join(tokenize(keyword))])
+                cols.append(j)
+        self.term_to_industry = sparse.csr_matrix(
+            (np.ones(len(rows)), (rows, cols)), shape=(len(industry_terms), len(self.industries))
+        )
+
+        # First words of the multi-word skill and industry phrases; other n-grams are never looked up
+        self.phrase_starts = {
+            phrase.split(" ", 1)[0]
+            for phrase in [*self.skill_vectorizer.vocabulary, *industry_terms]
+            if " " in phrase
+        }
+
+    async def rank(
+        self,
+        resume_data: Dict[str, Any],
+        jobs: List[Dict[str, Any]],
+        top_k: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Score every job (dicts with title, company, description, url) and sort best-first"""
+        if not jobs:
+            return []
+
+        started = time.perf_counter()
+        index = term_indexer.index_for(resume_data)
+        # Tokenize each posting once; all three extractors below share the tokens
+        sequences = [tokenize(f"{job.get('title') or ''}\n{job.get('description') or ''}") for job in jobs]
+        terms = [sequence_terms(sequence, self.phrase_starts) for sequence in sequences]
+
+        # Skills: fraction of each posting's skills present in the resume
+        job_skills = (self.skill_vectorizer.transform(terms) @ self.alias_to_skill) > 0
+        job_skills = job_skills.astype(np.float32).tocsr()
+        resume_skills = np.array([skill in index.skill_ids for skill in self.skill_ids], dtype=np.float32)
+        skills_total = np.asarray(job_skills.sum(axis=1)).ravel()
+        skills_hit = job_skills @ resume_skills
+        skills_score = np.divide(skills_hit, skills_total, out=np.zeros_like(skills_hit), where=skills_total > 0)
+
+        # Keywords: each posting's most frequent content words, found in the resume or not
+        keywords, vocabulary = self._top_keywords(sequences)
+        resume_terms = np.array([term in index.tokens for term in vocabulary], dtype=np.float32)
+        keywords_total = np.asarray(keywords.sum(axis=1)).ravel()
+        keywords_hit = keywords @ resume_terms
+        keywords_score = np.divide(keywords_hit, keywords_total, out=np.zeros_like(keywords_hit), where=keywords_total > 0)
+
+        # Experience level: same table as AIService._match_experience_level
+        match_level = self.job_analyzer.keyword_extractor.match_experience_level
+        levels = np.array([match_level(job.get('description') or '') for job in jobs])
+        entries = len(resume_data.get('experience', []))
+        experience_score = np.where(
+            ((levels == 'entry') & (entries <= 2))
+            | ((levels == 'mid') & (2 <= entries) & (entries <= 5))
+            | ((levels == 'senior') & (entries >= 5)),
+            1.0, 0.5
+        )
+
+        # Industry: highest keyword count wins, 'other' when nothing matched
+        industry_terms = [job_terms + tokenize(job.get('company') or '') for job_terms, job in zip(terms, jobs)]
+        industry_counts = (self.industry_vectorizer.transform(industry_terms) @ self.term_to_industry).toarray()
+        industry_labels = np.where(
+            industry_counts.max(axis=1) > 0,
+            np.array(self.industries, dtype=object)[industry_counts.argmax(axis=1)],
+            'other'
+        )
+        label_match = {label: 1.0 if index.contains(label) else 0.5 for label in set(industry_labels)}
+        industry_score = np.array([label_match[label] for label in industry_labels])
+
+        total = (
+            skills_score * SCORE_WEIGHTS['skills']
+            + keywords_score * SCORE_WEIGHTS['keywords']
+            + experience_score * SCORE_WEIGHTS['experience']
+            + industry_score * SCORE_WEIGHTS['industry']
+        ) / sum(SCORE_WEIGHTS.values()) * 100
+
+        order = np.argsort(-total, kind='stable')
+        if top_k:
+            order = order[:top_k]
+
+        missing = (job_skills @ sparse.diags(1 - resume_skills)).tocsr()
+        missing.eliminate_zeros()
+        results = []
+        for position in order:
+            job = jobs[position]
+            results.append({
+                'index': int(position),
+                'title': job.get('title'),
+                'company': job.get('company'),
+                'url': job.get('url'),
+                'match_score': round(float(total[position]), 2),
+                'skills_score': round(float(skills_score[position]) * 100, 2),
+                'keywords_score': round(float(keywords_score[position]) * 100, 2),
+                'experience_level': str(levels[position]),
+                'industry': str(industry_labels[position]),
+                'missing_skills': [self.skill_ids[i] for i in missing[position].indices]
+            })
+
+        logger.debug(f"Ranked {len(jobs)} jobs in {(time.perf_counter() - started) * 1000:.1f} ms")
+        return results
+
+    def _top_keywords(self, sequences: List[List[str]]):
+        """0/1 matrix of each posting's KEYWORDS_PER_JOB most frequent content words"""
+        vectorizer = CountVectorizer(analyzer=self._keyword_tokens)
+        try:
+            counts = vectorizer.fit_transform(sequences).tocsr()
+        except ValueError:
+            # Empty vocabulary: no posting has a content word, so none has keywords
+            return sparse.csr_matrix((len(sequences), 0), dtype=np.float32), np.array([], dtype=object)
+        vocabulary = vectorizer.get_feature_names_out()
+
+        rows, cols = [], []
+        for row in range(counts.shape[0]):
+            start, end = counts.indptr[row], counts.indptr[row + 1]
+            data, columns = counts.data[start:end], counts.indices[start:end]
+            if len(data) > KEYWORDS_PER_JOB:
+                keep = np.argpartition(-data, KEYWORDS_PER_JOB)[:KEYWORDS_PER_JOB]
+                columns = columns[keep]
+            rows.extend([row] * len(columns))
+            cols.extend(columns)
+
+        keywords = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.float32), (rows, cols)), shape=counts.shape
+        )
+        return keywords, vocabulary
+
+    def _keyword_tokens(self, sequence: List[str]) -> List[str]:
+        return [t for t in sequence if t.isalpha() and len(t) > 2 and t not in self.stop_words]
@@ -63,6 +63,46 @@ class KeywordExtractor:
         self.all_tech_skills = []
         for category, skills in self.tech_skills.items():
             self.all_tech_skills.extend(skills)
+        
+        # Variations and common abbreviations of skills
+        self.skill_variations = {
+            'javascript': ['js', 'javascript', 'java script'],
+            'typescript': ['ts', 'typescript'],
+            'c++': ['cpp', 'c plus plus'],
+            'c#': ['csharp', 'c sharp'],
+            'node.js': ['nodejs', 'node'],
+            'react.js': ['reactjs', 'react'],
+            'vue.js': ['vuejs', 'vue'],
+            'angular.js': ['angularjs', 'angular'],
+            'sql server': ['sqlserver', 'mssql'],
+            'postgresql': ['postgres', 'pg'],
+            'mongodb': ['mongo'],
+            'aws': ['amazon web services'],
+            'gcp': ['google cloud platform'],
+            'ci/cd': ['continuous integration', 'continuous deployment']
+        }
+        
+        # Experience level patterns, checked in order (the first level that matches wins)
+        level_patterns = {
+            'entry': [
+                r'entry.?level', r'junior', r'0.?2 years?', r'new grad', r'recent grad',
+                r'no experience', r'fresh'
+            ],
+            'mid': [
+                r'mid.?level', r'intermediate', r'2.?5 years?', r'3.?5 years?',
+                r'some experience'
+            ],
+            'senior': [
+                r'senior', r'5\+ years?', r'6\+ years?', r'7\+ years?', r'experienced',
+                r'lead', r'principal'
+            ],
+            'executive': [
+                r'director', r'manager', r'head of', r'vp', r'cto', r'ceo', r'executive'
+            ]
+        }
+        self.experience_patterns = {
+            level: re.compile('|'.join(patterns)) for level, patterns in level_patterns.items()
+        }
     
     async def extract_keywords(self, text: str, max_keywords: int = 20) -> List[str]:
         """Extract important keywords from job posting text using NLTK"""
@@ -132,24 +172,7 @@ class KeywordExtractor:
                 found_skills.append(skill)
         
         # Also look for variations and common abbreviations
-        skill_variations = {
-            'javascript': ['js', 'javascript', 'java script'],
-            'typescript': ['ts', 'typescript'],
-            'c++': ['cpp', 'c plus plus'],
-            'c#': ['csharp', 'c sharp'],
-            'node.js': ['nodejs', 'node'],
-            'react.js': ['reactjs', 'react'],
-            'vue.js': ['vuejs', 'vue'],
-            'angular.js': ['angularjs', 'angular'],
-            'sql server': ['sqlserver', 'mssql'],
-            'postgresql': ['postgres', 'pg'],
-            'mongodb': ['mongo'],
-            'aws': ['amazon web services'],
-            'gcp': ['google cloud platform'],
-            'ci/cd': ['continuous integration', 'continuous deployment']
-        }
-        
-        for main_skill, variations in skill_variations.items():
+        for main_skill, variations in self.skill_variations.items():
             for variation in variations:
                 pattern = r'\b' + re.escape(variation.lower()) + r'\b'
                 if re.search(pattern, text_lower) and main_skill not in found_skills:
@@ -159,31 +182,14 @@ class KeywordExtractor:
     
     async def extract_experience_level(self, text: str) -> str:
         """Extract required experience level from job posting"""
+        return self.match_experience_level(text)
+    
+    def match_experience_level(self, text: str) -> str:
+        """extract_experience_level without the coroutine, for scoring many postings in one pass"""
         text_lower = text.lower()
-        
-        # Experience level patterns
-        patterns = {
-            'entry': [
-                r'entry.?level', r'junior', r'0.?2 years?', r'new grad', r'recent grad',
-                r'no experience', r'fresh'
-            ],
-            'mid': [
-                r'mid.?level', r'intermediate', r'2.?5 years?', r'3.?5 years?',
-                r'some experience'
-            ],
-            'senior': [
-                r'senior', r'5\+ years?', r'6\+ years?', r'7\+ years?', r'experienced',
-                r'lead', r'principal'
-            ],
-            'executive': [
-                r'director', r'manager', r'head of', r'vp', r'cto', r'ceo', r'executive'
-            ]
-        }
-        
-        for level, level_patterns in patterns.items():
-            for pattern in level_patterns:
-                if re.search(pattern, text_lower):
-                    return level
+        for level, pattern in self.experience_patterns.items():
+            if pattern.search(text_lower):
+                return level
         
         return 'not_specified'
     
@@ -0,0 +1,200 @@
+from fastapi import Request
+from typing import Dict, Any, List, Optional
+from collections import OrderedDict
+from contextvars import ContextVar
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Clients send this header (any truthy value) to force a fresh completion
+CACHE_BYPASS_HEADER = "X-LLM-Cache-Bypass"
+
+_bypass_cache: ContextVar[bool] = ContextVar("llm_cache_bypass", default=False)
+
+
+class LLMCache:
+    """Prompt-level cache for LLM completions: in-memory LRU over a SQLite tier"""
+
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        max_entries: Optional[int] = None,
+        ttl_seconds: Optional[int] = None,
+        enabled: Optional[bool] = None
+    ):
+        self.db_path = db_path or os.getenv('LLM_CACHE_DB', 'llm_cache.sqlite3')
+        self.max_entries = max_entries or int(os.getenv('LLM_CACHE_MAX_ENTRIES', '512'))
+        self.ttl_seconds = ttl_seconds or int(os.getenv('LLM_CACHE_TTL_SECONDS', str(7 * 24 * 3600)))
+        if enabled is None:
+            enabled = os.getenv('ENABLE_CACHING', 'True').lower() == 'true'
+        self.enabled = enabled
+
+        # key -> (expires_at, value), most recently used last
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+        self.metrics = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'bypassed': 0,
+            'expired': 0,
+            'writes': 0
+        }
+
+    @staticmethod
+    def make_key(
+        model: str,
+        messages: List[Dict[str, Any]],
+        temperature: float,
+        max_tokens: int
+    ) -> str:
+        """Hash the request parameters that determine a completion"""
+        payload = json.dumps(
+            {
+                'model': model,
+                'messages': messages,
+                'temperature': temperature,
+                'max_tokens': max_tokens
+            },
+            sort_keys=True,
+            ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return a cached completion, or None on miss, expiry or bypass"""
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            if _bypass_cache.get():
+                self.metrics['bypassed'] += 1
+                return None
+
+            now = time.time()
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self.metrics['memory_hits'] += 1
+                    return value
+                del self._memory[key]
+                self.metrics['expired'] += 1
+
+            row = self._read_disk(key)
+            if row is not None:
+                expires_at, value = row
+                if expires_at > now:
+                    self._remember(key, expires_at, value)
+                    self.metrics['disk_hits'] += 1
+                    return value
+                self._delete_disk(key)
+                self.metrics['expired'] += 1
+
+            self.metrics['misses'] += 1
+            return None
+
+    def set(self, key: str, value: Dict[str, Any], ttl_seconds: Optional[int] = None):
+        """Store a completion in both tiers"""
+        if not self.enabled:
+            return
+
+        expires_at = time.time() + (ttl_seconds or self.ttl_seconds)
+        with self._lock:
+            self._remember(key, expires_at, value)
+            self._write_disk(key, expires_at, value)
+            self.metrics['writes'] += 1
+
+    def clear(self):
+        """Drop every cached completion"""
+        with self._lock:
+            self._memory.clear()
+            try:
+                conn = self._connection()
+                conn.execute("DELETE FROM llm_cache")
+                conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"LLM cache clear failed: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and tier sizes"""
+        hits = self.metrics['memory_hits'] + self.metrics['disk_hits']
+        lookups = hits + self.metrics['misses']
+        return {
+            **self.metrics,
+            'enabled': self.enabled,
+            'memory_entries': len(self._memory),
+            'hit_rate': round(hits / lookups, 4) if lookups else 0.0
+        }
+
+    def _remember(self, key: str, expires_at: float, value: Dict[str, Any]):
+        """Insert into the LRU tier, evicting the least recently used entry"""
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _connection(self) -> sqlite3.Connection:
+        """Open the SQLite tier lazily so importing the module stays cheap"""
+        if self._conn is None:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def _read_disk(self, key: str) -> Optional[tuple]:
+        try:
+            row = self._connection().execute(
+                "SELECT expires_at, value FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"LLM cache read failed: {str(e)}")
+            return None
+        if row is None:
+            return None
+        return row[0], json.loads(row[1])
+
+    def _write_disk(self, key: str, expires_at: float, value: Dict[str, Any]):
+        try:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), expires_at)
+            )
+            conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"LLM cache write failed: {str(e)}")
+
+    def _delete_disk(self, key: str):
+        try:
+            conn = self._connection()
+            conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+            conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"LLM cache delete failed: {str(e)}")
+
+
+async def llm_cache_bypass(request: Request):
+    """Request dependency: honour the bypass header for this request's LLM calls"""
+    flag = request.headers.get(CACHE_BYPASS_HEADER, '').lower() in ('1', 'true', 'yes')
+    no_cache = 'no-cache' in request.headers.get('cache-control', '').lower()
+    _bypass_cache.set(flag or no_cache)
+
+
+# Shared cache instance used by every LLM call site
+llm_cache = LLMCache()
@@ -0,0 +1,268 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from collections import Counter, OrderedDict, deque
+from typing import Dict, Any, List, AsyncIterator, Optional
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import time
+from services.llm_providers import LLMProvider
+from services.prompt_builder import estimate_tokens
+from services.resilience import resilient_call, remaining_seconds, DeadlineExceededError
+from services.usage_ledger import usage_ledger, current_user
+from services.model_router import model_router
+
+logger = logging.getLogger(__name__)
+
+# Lower runs first: interactive chat, ordinary requests, background enrichment
+INTERACTIVE = 0
+STANDARD = 1
+BACKGROUND = 2
+PRIORITY_NAMES = {INTERACTIVE: 'interactive', STANDARD: 'standard', BACKGROUND: 'background'}
+
+_priority: ContextVar[Optional[int]] = ContextVar("llm_priority", default=None)
+
+
+@contextmanager
+def llm_priority(priority: int):
+    """Run LLM calls made in this block (and tasks started from it) at the given priority"""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class RateLimitedError(Exception):
+    """The caller's token quota is used up"""
+
+    def __init__(self, user: str, retry_after: float):
+        super().__init__(f"LLM token quota exceeded for user '{user}'")
+        self.user = user
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """LLM-token quota refilled continuously; completions may run it into debt"""
+
+    def __init__(self, capacity: float, rate_per_second: float):
+        self.capacity = capacity
+        self.rate = rate_per_second
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, amount: float) -> float:
+        """Take amount if any quota is left; otherwise seconds until there is"""
+        self._refill()
+        if self.tokens <= 0:
+            return -self.tokens / self.rate + 0.001
+        self.tokens -= amount
+        return 0.0
+
+    def charge(self, amount: float):
+        self._refill()
+        self.tokens -= amount
+
+    def refund(self, amount: float):
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class LLMGateway:
+    """Single entry point for provider calls
+
+    Caps concurrent provider requests, admits waiting calls by priority
+    (and, within a priority, users with fewer calls in flight first), and
+    enforces a per-user token bucket. Each admitted call runs with retries
+    and circuit breaking, and its latency and usage are recorded against
+    its routing task and in the usage ledger.
+    """
+
+    def __init__(
+        self,
+        concurrency: Optional[int] = None,
+        user_tokens_per_minute: Optional[int] = None,
+        user_burst_tokens: Optional[int] = None,
+        max_users: int = 10000
+    ):
+        self.concurrency = concurrency or int(os.getenv('LLM_GATEWAY_CONCURRENCY', '8'))
+        self.user_tokens_per_minute = user_tokens_per_minute or int(os.getenv('LLM_USER_TOKENS_PER_MINUTE', '40000'))
+        self.user_burst_tokens = user_burst_tokens or int(os.getenv('LLM_USER_BURST_TOKENS', str(self.user_tokens_per_minute)))
+        self.max_users = max_users
+
+        self._free = self.concurrency
+        self._waiters: List[tuple] = []  # heap of (priority, user calls in flight, seq, future)
+        self._seq = itertools.count()
+        self._user_calls: Counter = Counter()
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._queue_ms = {p: deque(maxlen=500) for p in PRIORITY_NAMES}
+        self.metrics = {
+            'requests': Counter(),
+            'queued': Counter(),
+            'rate_limited': 0,
+            'queue_timeouts': 0
+        }
+
+    async def complete(
+        self,
+        provider: LLMProvider,
+        messages: List[Dict[str, str]],
+        model: Optional[str] = None,
+        max_tokens: int = 1000,
+        temperature: float = 0.3,
+        priority: Optional[int] = None,
+        source: str = "api",
+        task: str = "default"
+    ) -> Dict[str, Any]:
+        """provider.complete() behind the queue and quota, with retries and usage recording"""
+        user = current_user()
+        await self._admit(user, messages, priority)
+        started = time.perf_counter()
+        try:
+            response = await resilient_call(
+                provider.name,
+                lambda: provider.complete(messages, model=model, max_tokens=max_tokens, temperature=temperature)
+            )
+        except Exception:
+            model_router.record(task, provider.resolve_model(model), (time.perf_counter() - started) * 1000, ok=False)
+            raise
+        finally:
+            self._release(user)
+
+        self._settle(user, response["usage"])
+        latency_ms = (time.perf_counter() - started) * 1000
+        model_router.record(task, response["model"], latency_ms)
+        usage_ledger.record(response["model"], response["provider"], response["usage"], latency_ms, source=source)
+        return response
+
+    async def stream(
+        self,
+        provider: LLMProvider,
+        messages: List[Dict[str, str]],
+        model: Optional[str] = None,
+        max_tokens: int = 1000,
+        temperature: float = 0.3,
+        priority: Optional[int] = None,
+        source: str = "stream",
+        task: str = "default"
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """provider.stream() holding a slot until the stream ends or is closed"""
+        user = current_user()
+        await self._admit(user, messages, priority)
+        model = provider.resolve_model(model)
+        started = time.perf_counter()
+        usage = {}
+        try:
+            async for event in provider.stream(messages, model, max_tokens, temperature):
+                if event["type"] == "usage":
+                    usage = event["usage"]
+                yield event
+        except Exception:
+            model_router.record(task, model, (time.perf_counter() - started) * 1000, ok=False)
+            raise
+        finally:
+            self._release(user)
+
+        self._settle(user, usage)
+        latency_ms = (time.perf_counter() - started) * 1000
+        model_router.record(task, model, latency_ms)
+        usage_ledger.record(model, provider.name, usage, latency_ms, source=source)
+
+    async def _admit(self, user: str, messages: List[Dict[str, str]], priority: Optional[int]):
+        """Charge the prompt to the user's quota, then wait for a free slot"""
+        if priority is None:
+            priority = _priority.get()
+        if priority is None:
+            priority = STANDARD
+        self.metrics['requests'][priority] += 1
+
+        prompt_tokens = sum(estimate_tokens(m["content"]) for m in messages)
+        retry_after = self._bucket(user).take(prompt_tokens)
+        if retry_after:
+            self.metrics['rate_limited'] += 1
+            raise RateLimitedError(user, retry_after)
+
+        self._user_calls[user] += 1
+        queued = time.perf_counter()
+        if self._free > 0 and not self._waiters:
+            self._free -= 1
+        else:
+            self.metrics['queued'][priority] += 1
+            future = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._waiters, (priority, self._user_calls[user], next(self._seq), future))
+            try:
+                await asyncio.wait_for(asyncio.shield(future), timeout=remaining_seconds())
+            except BaseException as e:
+                if future.done() and not future.cancelled():
+                    # The slot was handed over just as we gave up; pass it on
+                    self._release(user)
+                else:
+                    future.cancel()
+                    self._drop_user_call(user)
+                    # Never sent to the provider: give the prompt tokens back
+                    self._bucket(user).refund(prompt_tokens)
+                if isinstance(e, asyncio.TimeoutError):
+                    self.metrics['queue_timeouts'] += 1
+                    raise DeadlineExceededError("Request deadline exceeded while queued for the LLM")
+                raise
+        self._queue_ms[priority].append((time.perf_counter() - queued) * 1000)
+
+    def _release(self, user: str):
+        """Hand the slot to the best waiter, or free it"""
+        self._drop_user_call(user)
+        while self._waiters:
+            future = heapq.heappop(self._waiters)[-1]
+            if not future.done():
+                future.set_result(None)
+                return
+        self._free += 1
+
+    def _drop_user_call(self, user: str):
+        self._user_calls[user] -= 1
+        if self._user_calls[user] <= 0:
+            del self._user_calls[user]
+
+    def _settle(self, user: str, usage: Dict[str, Any]):
+        """Charge the completion tokens once they are known"""
+        self._bucket(user).charge((usage or {}).get('completion_tokens') or 0)
+
+    def _bucket(self, user: str) -> TokenBucket:
+        bucket = self._buckets.get(user)
+        if bucket is None:
+            bucket = TokenBucket(self.user_burst_tokens, self.user_tokens_per_minute / 60)
+            self._buckets[user] = bucket
+            while len(self._buckets) > self.max_users:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(user)
+        return bucket
+
+    def stats(self) -> Dict[str, Any]:
+        queue_time = {}
+        for priority, samples in self._queue_ms.items():
+            ordered = sorted(samples)
+            queue_time[PRIORITY_NAMES[priority]] = {
+                'requests': self.metrics['requests'][priority],
+                'queued': self.metrics['queued'][priority],
+                'p50_ms': round(ordered[len(ordered) // 2], 1) if ordered else None,
+                'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 1) if ordered else None
+            }
+        return {
+            'concurrency': self.concurrency,
+            'in_flight': self.concurrency - self._free,
+            'waiting': sum(1 for waiter in self._waiters if not waiter[-1].done()),
+            'rate_limited': self.metrics['rate_limited'],
+            'queue_timeouts': self.metrics['queue_timeouts'],
+            'queue_time': queue_time
+        }
+
+
+# Shared by AIService, the LLM routes and simple_server
+llm_gateway = LLMGateway()
@@ -0,0 +1,394 @@
+from typing import Dict, Any, List, AsyncIterator, Optional
+from collections import deque
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from services.prompt_builder import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+
+def _usage(prompt_tokens: int, completion_tokens: int) -> Dict[str, int]:
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens
+    }
+
+
+_http_client = None
+
+
+def shared_http_client():
+    """One connection pool for every provider SDK client
+
+    Sized to the gateway's concurrency (doubled for hedged backups). The
+    SDKs' own retries are off: services.resilience retries instead.
+    """
+    global _http_client
+    if _http_client is None:
+        import httpx
+        slots = int(os.getenv('LLM_GATEWAY_CONCURRENCY', '8'))
+        _http_client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=slots * 2, max_keepalive_connections=slots),
+            timeout=httpx.Timeout(600.0, connect=5.0)
+        )
+    return _http_client
+
+
+class LLMProvider:
+    """Interface every chat-completion backend implements
+
+    complete() returns {"content", "usage", "model", "provider"}; stream()
+    yields {"type": "token", "content"} events followed by one
+    {"type": "usage", "usage"} event.
+    """
+
+    name = "base"
+    default_model = ""
+    # Requested model names this provider understands; others map to default_model
+    model_prefixes: tuple = ()
+
+    def is_configured(self) -> bool:
+        return True
+
+    def resolve_model(self, model: Optional[str]) -> str:
+        if model and model.startswith(self.model_prefixes):
+            return model
+        return self.default_model
+
+    async def complete(
+        self,
+        messages: List[Dict[str, str]],
+        model: Optional[str] = None,
+        max_tokens: int = 1000,
+        temperature: float = 0.3
+    ) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    async def stream(
+        self,
+        messages: List[Dict[str, str]],
+        model: Optional[str] = None,
+        max_tokens: int = 1000,
+        temperature: float = 0.3
+    ) -> AsyncIterator[Dict[str, Any]]:
+        raise NotImplementedError
+        yield
+
+
+class OpenAIProvider(LLMProvider):
+    """OpenAI chat completions through the async v1 client"""
+
+    name = "openai"
+    default_model = os.getenv('OPENAI_MODEL', 'gpt-4-turbo-preview')
+    model_prefixes = ("gpt-", "o1", "o3")
+
+    def __init__(self):
+        self._client = None
+
+    def is_configured(self) -> bool:
+        return bool(os.getenv('OPENAI_API_KEY'))
+
+    @property
+    def client(self):
+        # Created on first use so the module imports without a key
+        if self._client is None:
+            import openai
+            self._client = openai.AsyncOpenAI(
+                api_key=os.getenv('OPENAI_API_KEY'), http_client=shared_http_client(), max_retries=0
+            )
+        return self._client
+
+    async def complete(self, messages, model=None, max_tokens=1000, temperature=0.3):
+        model = self.resolve_model(model)
+        response = await self.client.chat.completions.create(
+            model=model,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature
+        )
+        return {
+            "content": response.choices[0].message.content or "",
+            "usage": response.usage.model_dump() if response.usage else {},
+            "model": model,
+            "provider": self.name
+        }
+
+    async def stream(self, messages, model=None, max_tokens=1000, temperature=0.3):
+        stream = await self.client.chat.completions.create(
+            model=self.resolve_model(model),
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+        usage = {}
+        async for chunk in stream:
+            if chunk.usage:
+                usage = chunk.usage.model_dump()
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield {"type": "token", "content": chunk.choices[0].delta.content}
+        yield {"type": "usage", "usage": usage}
+
+
+class AnthropicProvider(LLMProvider):
+    """Anthropic Messages API; OpenAI-style system messages become the system prompt"""
+
+    name = "anthropic"
+    default_model = os.getenv('ANTHROPIC_MODEL', 'claude-3-sonnet-20240229')
+    model_prefixes = ("claude-",)
+
+    def __init__(self):
+        self._client = None
+
+    def is_configured(self) -> bool:
+        return bool(os.getenv('ANTHROPIC_API_KEY'))
+
+    @property
+    def client(self):
+        if self._client is None:
+            import anthropic
+            self._client = anthropic.AsyncAnthropic(
+                api_key=os.getenv('ANTHROPIC_API_KEY'), http_client=shared_http_client(), max_retries=0
+            )
+        return self._client
+
+    def _convert(self, messages: List[Dict[str, str]]) -> tuple:
+        """Split out the system prompt and merge consecutive same-role turns"""
+        system = "\n\n".join(m["content"] for m in messages if m["role"] == "system")
+        converted = []
+        for message in messages:
+            if message["role"] == "system":
+                continue
+            if converted and converted[-1]["role"] == message["role"]:
+                converted[-1]["content"] += "\n\n" + message["content"]
+            else:
+                converted.append({"role": message["role"], "content": message["content"]})
+        return system, converted
+
+    async def complete(self, messages, model=None, max_tokens=1000, temperature=0.3):
+        model = self.resolve_model(model)
+        system, converted = self._convert(messages)
+        response = await self.client.messages.create(
+            model=model,
+            system=system,
+            messages=converted,
+            max_tokens=max_tokens,
+            temperature=temperature
+        )
+        return {
+            "content": "".join(block.text for block in response.content if block.type == "text"),
+            "usage": _usage(response.usage.input_tokens, response.usage.output_tokens),
+            "model": model,
+            "provider": self.name
+        }
+
+    async def stream(self, messages, model=None, max_tokens=1000, temperature=0.3):
+        system, converted = self._convert(messages)
+        async with self.client.messages.stream(
+            model=self.resolve_model(model),
+            system=system,
+            messages=converted,
+            max_tokens=max_tokens,
+            temperature=temperature
+        ) as stream:
+            async for text in stream.text_stream:
+                yield {"type": "token", "content": text}
+            final = await stream.get_final_message()
+        yield {"type": "usage", "usage": _usage(final.usage.input_tokens, final.usage.output_tokens)}
+
+
+class MockProvider(LLMProvider):
+    """Deterministic offline provider for local runs, tests and benchmarks
+
+    Replies depend only on the prompt, arrive after a configurable simulated
+    latency, and follow the JSON shapes the prompts in this backend ask for.
+    """
+
+    name = "mock"
+    default_model = "mock-1"
+    model_prefixes = ("mock-",)
+
+    def __init__(self, latency_ms: Optional[float] = None, token_latency_ms: Optional[float] = None):
+        self.latency_ms = float(os.getenv('MOCK_LLM_LATENCY_MS', '50')) if latency_ms is None else latency_ms
+        self.token_latency_ms = float(os.getenv('MOCK_LLM_TOKEN_LATENCY_MS', '2')) if token_latency_ms is None else token_latency_ms
+
+    def _reply(self, messages: List[Dict[str, str]]) -> str:
+        prompt = messages[-1]["content"] if messages else ""
+        digest = hashlib.sha256(json.dumps(messages, sort_keys=True).encode('utf-8')).hexdigest()
+
+        if '"sections"' in prompt:
+            ids = re.findall(r"\[id: ([^\]]+)\]", prompt)
+            return json.dumps({"sections": [
+                {"id": section_id, "optimized_text": f"Optimized section {section_id} ({digest[:6]})"}
+                for section_id in ids
+            ]})
+        if '"edits"' in prompt:
+            return json.dumps({"edits": [{
+                "section": "Skills",
+                "action": "add",
+                "suggested_text": f"Mock skill {digest[:6]}",
+                "reason": "Matches a job requirement"
+            }]})
+        if '"section"' in prompt:
+            section = re.search(r'"section": "([^"|]+)"', prompt)
+            section = section.group(1) if section and section.group(1) != "section_name" else "summary"
+            return json.dumps([
+                {
+                    "section": section,
+                    "type": "modify",
+                    "original_text": "",
+                    "suggested_text": f"Mock suggestion {index} for {section} ({digest[:6]})",
+                    "reason": "Deterministic mock output",
+                    "priority": 5 - index
+                }
+                for index in range(3)
+            ])
+        return f"Mock response {digest[:12]}: " + " ".join(prompt.split()[:40])
+
+    async def complete(self, messages, model=None, max_tokens=1000, temperature=0.3):
+        await asyncio.sleep(self.latency_ms / 1000)
+        content = self._reply(messages)
+        prompt_tokens = sum(estimate_tokens(m["content"]) for m in messages)
+        return {
+            "content": content,
+            "usage": _usage(prompt_tokens, estimate_tokens(content)),
+            "model": self.resolve_model(model),
+            "provider": self.name
+        }
+
+    async def stream(self, messages, model=None, max_tokens=1000, temperature=0.3):
+        await asyncio.sleep(self.latency_ms / 1000)
+        content = self._reply(messages)
+        for piece in re.findall(r"\S+\s*", content):
+            await asyncio.sleep(self.token_latency_ms / 1000)
+            yield {"type": "token", "content": piece}
+        prompt_tokens = sum(estimate_tokens(m["content"]) for m in messages)
+        yield {"type": "usage", "usage": _usage(prompt_tokens, estimate_tokens(content))}
+
+
+class HedgedProvider(LLMProvider):
+    """Send a backup request to a second provider when the primary runs past its p95
+
+    Until enough primary latencies are observed, the hedge fires after
+    initial_hedge_ms. A primary failure starts the backup immediately.
+    Streams are not hedged.
+    """
+
+    def __init__(
+        self,
+        primary: LLMProvider,
+        backup: LLMProvider,
+        initial_hedge_ms: Optional[float] = None,
+        min_samples: int = 20
+    ):
+        self.primary = primary
+        self.backup = backup
+        self.name = f"{primary.name}+{backup.name}"
+        self.default_model = primary.default_model
+        self.initial_hedge_ms = initial_hedge_ms or float(os.getenv('LLM_HEDGE_AFTER_MS', '4000'))
+        self.min_samples = min_samples
+        self._latencies = deque(maxlen=200)
+        self.metrics = {
+            'requests': 0,
+            'hedges_sent': 0,
+            'backup_wins': 0
+        }
+
+    def is_configured(self) -> bool:
+        return self.primary.is_configured()
+
+    def resolve_model(self, model: Optional[str]) -> str:
+        return self.primary.resolve_model(model)
+
+    def hedge_threshold_ms(self) -> float:
+        if len(self._latencies) < self.min_samples:
+            return self.initial_hedge_ms
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    async def complete(self, messages, model=None, max_tokens=1000, temperature=0.3):
+        self.metrics['requests'] += 1
+        started = time.perf_counter()
+
+        async def timed_primary():
+            result = await self.primary.complete(messages, model, max_tokens, temperature)
+            self._latencies.append((time.perf_counter() - started) * 1000)
+            return result
+
+        primary = asyncio.ensure_future(timed_primary())
+        done, _ = await asyncio.wait({primary}, timeout=self.hedge_threshold_ms() / 1000)
+        if primary in done and not primary.exception():
+            return primary.result()
+
+        self.metrics['hedges_sent'] += 1
+        backup = asyncio.ensure_future(self.backup.complete(messages, model, max_tokens, temperature))
+        pending = {primary, backup} - done
+        errors = [primary.exception()] if primary in done else []
+
+        try:
+            while pending:
+                finished, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in finished:
+                    if task.exception() is None:
+                        if task is backup:
+                            self.metrics['backup_wins'] += 1
+                        return task.result()
+                    errors.append(task.exception())
+            raise errors[-1]
+        finally:
+            for task in pending:
+                task.cancel()
+            if not primary.done() or primary.cancelled():
+                # A primary slower than the backup still counts: its elapsed time is a lower bound
+                self._latencies.append((time.perf_counter() - started) * 1000)
+
+    def stream(self, messages, model=None, max_tokens=1000, temperature=0.3):
+        return self.primary.stream(messages, model, max_tokens, temperature)
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.metrics, 'hedge_threshold_ms': round(self.hedge_threshold_ms(), 1)}
+
+
+PROVIDERS = {
+    'openai': OpenAIProvider,
+    'anthropic': AnthropicProvider,
+    'mock': MockProvider
+}
+
+_instances: Dict[str, LLMProvider] = {}
+_hedged: Optional[HedgedProvider] = None
+
+
+def get_provider(name: Optional[str] = None) -> LLMProvider:
+    """Shared provider instance by name (default: LLM_PROVIDER, falling back to openai)"""
+    name = (name or os.getenv('LLM_PROVIDER', 'openai')).lower()
+    if name not in PROVIDERS:
+        raise ValueError(f"Unknown LLM provider: {name}")
+    if name not in _instances:
+        _instances[name] = PROVIDERS[name]()
+    return _instances[name]
+
+
+def get_latency_critical_provider() -> LLMProvider:
+    """Provider for interactive calls: hedged when LLM_HEDGE_PROVIDER is set"""
+    global _hedged
+    backup_name = os.getenv('LLM_HEDGE_PROVIDER')
+    if not backup_name:
+        return get_provider()
+    if _hedged is None:
+        _hedged = HedgedProvider(get_provider(), get_provider(backup_name))
+    return _hedged
+
+
+def provider_stats() -> Dict[str, Any]:
+    return {
+        'default': get_provider().name,
+        'hedging': _hedged.stats() if _hedged else None
+    }
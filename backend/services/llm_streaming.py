@@ -0,0 +1,109 @@
+from fastapi.responses import StreamingResponse
+from typing import Dict, Any, List, AsyncIterator, Optional
+import json
+import logging
+import time
+from services.llm_cache import llm_cache
+from services.llm_providers import LLMProvider
+from services.resilience import get_breaker, is_retryable, deadline_passed, DeadlineExceededError
+from services.usage_ledger import usage_ledger
+from services.llm_gateway import llm_gateway
+
+logger = logging.getLogger(__name__)
+
+
+def format_sse(data: Dict[str, Any], event: Optional[str] = None) -> str:
+    """Encode one server-sent event"""
+    lines = []
+    if event:
+        lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data)}")
+    return "\n".join(lines) + "\n\n"
+
+
+async def stream_chat_completion(
+    provider: LLMProvider,
+    messages: List[Dict[str, str]],
+    model: str,
+    max_tokens: int,
+    temperature: float,
+    priority: Optional[int] = None,
+    task: str = "default"
+) -> AsyncIterator[Dict[str, Any]]:
+    """Yield token events as they arrive, then a done event with usage totals
+
+    Completed streams are written to the prompt cache, and a cached prompt is
+    replayed as a single token event. The provider's circuit breaker is
+    consulted before streaming starts; a stream is never retried once
+    tokens have been sent.
+    """
+    model = provider.resolve_model(model)
+    cache_key = llm_cache.make_key(f"{provider.name}/{model}", messages, temperature, max_tokens)
+    cached = llm_cache.get(cache_key)
+    if cached is not None:
+        usage_ledger.record(model, provider.name, cached.get("usage"), 0.0, cached=True, source="stream")
+        yield {"type": "token", "content": cached["content"]}
+        yield {"type": "done", "content": cached["content"], "usage": cached.get("usage", {}), "cached": True}
+        return
+
+    breaker = get_breaker(provider.name)
+    breaker.before_call()
+    started = time.perf_counter()
+    first_token_ms = None
+    parts = []
+    usage = {}
+
+    try:
+        async for event in llm_gateway.stream(
+            provider, messages, model, max_tokens, temperature, priority=priority, task=task
+        ):
+            if event["type"] == "usage":
+                usage = event["usage"]
+                continue
+            if first_token_ms is None:
+                first_token_ms = round((time.perf_counter() - started) * 1000, 1)
+            parts.append(event["content"])
+            yield event
+    except Exception as e:
+        if not is_retryable(e):
+            breaker.release()
+            raise
+        if deadline_passed():
+            # Cut short by the request's deadline, not a provider failure
+            breaker.release()
+            raise DeadlineExceededError(f"Request deadline passed while streaming from '{provider.name}'") from e
+        breaker.record_failure()
+        raise
+    except BaseException:
+        # Client went away or the generator was closed early
+        breaker.release()
+        raise
+    breaker.record_success()
+
+    content = "".join(parts)
+    llm_cache.set(cache_key, {"content": content, "usage": usage})
+    yield {
+        "type": "done",
+        "content": content,
+        "usage": usage,
+        "cached": False,
+        "time_to_first_token_ms": first_token_ms
+    }
+
+
+def sse_response(events: AsyncIterator[Dict[str, Any]]) -> StreamingResponse:
+    """Wrap an event iterator as a text/event-stream response"""
+    async def body():
+        try:
+            async for item in events:
+                event = item.pop("type", None)
+                yield format_sse(item, event=event)
+        except Exception as e:
+            logger.error(f"Error while streaming completion: {str(e)}")
+            yield format_sse({"detail": str(e)}, event="error")
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,136 @@
+from collections import OrderedDict, deque
+from typing import Dict, Any, List, Optional
+import json
+import logging
+import os
+from services.llm_providers import LLMProvider
+from services.prompt_builder import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Model per tier for each provider
+DEFAULT_TIERS = {
+    'openai': {'fast': 'gpt-3.5-turbo', 'large': 'gpt-4-turbo-preview'},
+    'anthropic': {'fast': 'claude-3-haiku-20240307', 'large': 'claude-3-sonnet-20240229'},
+    'mock': {'fast': 'mock-fast', 'large': 'mock-large'}
+}
+
+# Most (task, model) routes whose outcomes are kept; the least recently used go first
+MAX_TRACKED_ROUTES = 200
+
+# Task -> rules checked in order; the first whose max_input_tokens fits (or has none) picks the tier
+DEFAULT_ROUTES = {
+    'chat': [{'max_input_tokens': 1500, 'tier': 'fast'}, {'tier': 'large'}],
+    'rewrite': [{'max_input_tokens': 1000, 'tier': 'fast'}, {'tier': 'large'}],
+    'job_analysis': [{'max_input_tokens': 3000, 'tier': 'fast'}, {'tier': 'large'}],
+    'resume_match': [{'tier': 'large'}],
+    'suggestions': [{'tier': 'large'}],
+    'document_edits': [{'tier': 'large'}],
+    'default': [{'tier': 'large'}]
+}
+
+
+class ModelRouter:
+    """Pick a model per task type and prompt size, and keep per-route outcomes
+
+    The table can be overridden with a JSON file (LLM_ROUTING_TABLE) holding
+    "tiers" and/or "routes" in the shape of DEFAULT_TIERS / DEFAULT_ROUTES;
+    entries in the file replace the defaults of the same name.
+    """
+
+    def __init__(self, table_path: Optional[str] = None):
+        self.tiers = {provider: dict(models) for provider, models in DEFAULT_TIERS.items()}
+        self.routes = dict(DEFAULT_ROUTES)
+
+        table_path = table_path or os.getenv('LLM_ROUTING_TABLE')
+        if table_path:
+            try:
+                with open(table_path, 'r', encoding='utf-8') as f:
+                    table = json.load(f)
+                for provider, models in table.get('tiers', {}).items():
+                    self.tiers.setdefault(provider, {}).update(models)
+                self.routes.update(table.get('routes', {}))
+                logger.info(f"Loaded LLM routing table from {table_path}")
+            except (OSError, ValueError) as e:
+                logger.error(f"Could not load LLM routing table {table_path}: {str(e)}")
+                raise
+
+        # (task, model) -> outcomes
+        self._outcomes: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+
+    def route(self, task: str, messages: List[Dict[str, str]], provider: LLMProvider) -> str:
+        """Model for this task and prompt on the given provider"""
+        tier = self.tier_for(task, sum(estimate_tokens(m["content"]) for m in messages))
+        model = self.tiers.get(provider.name, {}).get(tier)
+        return provider.resolve_model(model)
+
+    def tier_for(self, task: str, input_tokens: int) -> str:
+        for rule in self.routes.get(task, self.routes['default']):
+            limit = rule.get('max_input_tokens')
+            if limit is None or input_tokens <= limit:
+                return rule['tier']
+        return 'large'
+
+    def record(self, task: str, model: str, latency_ms: float, ok: bool = True):
+        """Latency and outcome of one provider call on a route"""
+        stats = self._stats(task, model)
+        stats['calls'] += 1
+        if ok:
+            stats['latencies_ms'].append(latency_ms)
+        else:
+            stats['errors'] += 1
+
+    def models_for(self, task: str) -> set:
+        """Every model the task can be routed to, on any provider"""
+        tiers = {rule['tier'] for rule in self.routes.get(task, [])}
+        return {model for models in self.tiers.values() for tier, model in models.items() if tier in tiers}
+
+    def feedback(self, task: str, model: Optional[str], rating: float):
+        """Quality rating (0..1) for a route's output, from users or validation
+
+        Raises ValueError for a task that is not routed, or a model the task
+        is not routed to.
+        """
+        if task not in self.routes:
+            raise ValueError(f"Unknown routing task '{task}'")
+        if model is not None and model not in self.models_for(task):
+            raise ValueError(f"Model '{model}' is not routed for task '{task}'")
+        stats = self._stats(task, model or '*')
+        stats['ratings'] += 1
+        stats['rating_total'] += rating
+
+    def _stats(self, task: str, model: str) -> Dict[str, Any]:
+        key = (task, model)
+        if key in self._outcomes:
+            self._outcomes.move_to_end(key)
+        else:
+            self._outcomes[key] = {
+                'calls': 0,
+                'errors': 0,
+                'latencies_ms': deque(maxlen=500),
+                'ratings': 0,
+                'rating_total': 0.0
+            }
+            while len(self._outcomes) > MAX_TRACKED_ROUTES:
+                self._outcomes.popitem(last=False)
+        return self._outcomes[key]
+
+    def stats(self) -> Dict[str, Any]:
+        routes = []
+        for (task, model), stats in list(self._outcomes.items()):
+            ordered = sorted(stats['latencies_ms'])
+            routes.append({
+                'task': task,
+                'model': model,
+                'calls': stats['calls'],
+                'errors': stats['errors'],
+                'p50_ms': round(ordered[len(ordered) // 2], 1) if ordered else None,
+                'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 1) if ordered else None,
+                'ratings': stats['ratings'],
+                'avg_rating': round(stats['rating_total'] / stats['ratings'], 3) if stats['ratings'] else None
+            })
+        return {'routes': routes, 'table': self.routes}
+
+
+# Shared router for every LLM call site
+model_router = ModelRouter()
@@ -0,0 +1,143 @@
+from typing import Dict, List, Optional, Set, Tuple
+import os
+import re
+import logging
+from services.keyword_extractor import KeywordExtractor
+
+logger = logging.getLogger(__name__)
+
+# Input-token budgets for the resume + job context of each endpoint
+ENDPOINT_TOKEN_BUDGETS = {
+    'analyze_resume_match': int(os.getenv('PROMPT_BUDGET_ANALYZE_MATCH', '3000')),
+    'suggest_edits': int(os.getenv('PROMPT_BUDGET_SUGGEST_EDITS', '3000')),
+    'chat': int(os.getenv('PROMPT_BUDGET_CHAT', '2000'))
+}
+
+# Relevance weight of a term by where it came from (plain job keywords weigh 1.0)
+TERM_WEIGHTS = {
+    'skill': 3.0,
+    'focus': 2.0
+}
+
+# Share of the budget reserved for the job description before redistribution
+JOB_BUDGET_SHARE = 0.4
+
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+_TERM_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#.]*")
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap local token estimate (roughly what tiktoken reports for English prose)"""
+    if not text:
+        return 0
+    pieces = _TOKEN_PATTERN.findall(text)
+    # Long words split into several BPE tokens; ~4 characters per token is the usual rule
+    return max(len(pieces), (len(text) + 3) // 4)
+
+
+class PromptBuilder:
+    """Fit resume and job text into a token budget, keeping the most relevant spans"""
+
+    def __init__(self, keyword_extractor: Optional[KeywordExtractor] = None):
+        self.keyword_extractor = keyword_extractor or KeywordExtractor()
+
+    async def fit_context(
+        self,
+        resume_text: str,
+        job_text: str,
+        endpoint: str,
+        focus_text: Optional[str] = None
+    ) -> Tuple[str, str]:
+        """Return (resume_text, job_text) trimmed to the endpoint's budget
+
+        Text that already fits is returned unchanged. Otherwise resume
+        sections and job lines are ranked by overlap with the job's
+        keywords and skills (plus focus_text, e.g. a chat question) and
+        the best spans are kept in their original order.
+        """
+        resume_text = resume_text or ""
+        job_text = job_text or ""
+        budget = ENDPOINT_TOKEN_BUDGETS.get(endpoint, ENDPOINT_TOKEN_BUDGETS['chat'])
+
+        resume_tokens = estimate_tokens(resume_text)
+        job_tokens = estimate_tokens(job_text)
+        if resume_tokens + job_tokens <= budget:
+            return resume_text, job_text
+
+        terms = await self._relevant_terms(job_text, focus_text)
+
+        # Give each side its share, handing whatever one side leaves unused to the other
+        job_budget = min(job_tokens, int(budget * JOB_BUDGET_SHARE))
+        resume_budget = min(resume_tokens, budget - job_budget)
+        job_budget = budget - resume_budget
+
+        trimmed_resume = self._select_spans(self._split_resume(resume_text), terms, resume_budget, "\n\n")
+        trimmed_job = self._select_spans(self._split_job(job_text), terms, job_budget, "\n")
+
+        logger.debug(
+            f"Prompt context for {endpoint} trimmed from {resume_tokens + job_tokens} "
+            f"to {estimate_tokens(trimmed_resume) + estimate_tokens(trimmed_job)} tokens"
+        )
+        return trimmed_resume, trimmed_job
+
+    async def _relevant_terms(self, job_text: str, focus_text: Optional[str]) -> Dict[str, float]:
+        """Normalized terms that make a span worth keeping, with their weights"""
+        keywords = await self.keyword_extractor.extract_keywords(job_text, max_keywords=40)
+        skills = await self.keyword_extractor.extract_skills(job_text)
+
+        # Frequent keywords can be boilerplate (benefits, EEO text); named skills and
+        # the user's own question are stronger relevance signals
+        terms: Dict[str, float] = {}
+        for phrases, weight in ((keywords, 1.0), (skills, TERM_WEIGHTS['skill'])):
+            for phrase in phrases:
+                for term in self._terms(phrase):
+                    terms[term] = max(terms.get(term, 0.0), weight)
+        if focus_text:
+            for term in self._terms(focus_text):
+                terms[term] = max(terms.get(term, 0.0), TERM_WEIGHTS['focus'])
+
+        for stop_word in self.keyword_extractor.stop_words:
+            terms.pop(stop_word, None)
+        return terms
+
+    def _terms(self, text: str) -> Set[str]:
+        """Lowercased, lemmatized terms of a span"""
+        words = [w.rstrip('.') for w in _TERM_PATTERN.findall(text.lower())]
+        lemmatizer = self.keyword_extractor.lemmatizer
+        if lemmatizer:
+            return {lemmatizer.lemmatize(w) for w in words if w}
+        return {w for w in words if w}
+
+    def _split_resume(self, text: str) -> List[str]:
+        """Resume sections/entries, separated by blank lines"""
+        return [part.strip() for part in re.split(r'\n\s*\n', text) if part.strip()]
+
+    def _split_job(self, text: str) -> List[str]:
+        """Job description lines and bullets"""
+        return [line.strip() for line in text.split('\n') if line.strip()]
+
+    def _select_spans(self, spans: List[str], terms: Dict[str, float], budget: int, separator: str) -> str:
+        """Greedily keep the highest-overlap spans that fit, in document order"""
+        if not spans:
+            return ""
+
+        scored = []
+        for position, span in enumerate(spans):
+            cost = estimate_tokens(span)
+            overlap = sum(terms.get(term, 0.0) for term in self._terms(span))
+            # Favour dense matches; the first span (name/title/intro) gets a small bonus
+            score = overlap / (cost ** 0.5) + (0.5 if position == 0 else 0.0)
+            scored.append((score, position, cost, span))
+
+        kept = []
+        remaining = budget
+        for score, position, cost, span in sorted(scored, key=lambda item: (-item[0], item[1])):
+            if cost <= remaining:
+                kept.append((position, span))
+                remaining -= cost
+            elif score > 0 and remaining > 20 and not kept:
+                # Nothing fits whole yet: keep the start of the best span
+                kept.append((position, span[:remaining * 4]))
+                remaining = 0
+
+        return separator.join(span for _, span in sorted(kept))
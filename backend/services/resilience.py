@@ -0,0 +1,221 @@
+from fastapi import Request
+from contextvars import ContextVar
+from typing import Dict, Any, Awaitable, Callable, Optional, TypeVar
+import asyncio
+import logging
+import os
+import random
+import time
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Client-supplied time budget for the whole request, in milliseconds
+DEADLINE_HEADER = "X-Request-Timeout-Ms"
+
+# Absolute time.monotonic() by which the current request's LLM calls must finish
+_deadline: ContextVar[Optional[float]] = ContextVar("llm_request_deadline", default=None)
+
+# HTTP statuses worth retrying: request timeout, rate limit and server errors
+RETRYABLE_STATUS_CODES = {408, 429}
+
+
+class CircuitOpenError(Exception):
+    """Raised without calling the provider while its circuit is open"""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"LLM provider '{name}' is unavailable; retry in {retry_after:.0f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class DeadlineExceededError(TimeoutError):
+    """The request's deadline passed before the LLM call could complete"""
+
+
+async def request_deadline(request: Request):
+    """Request dependency: start the deadline clock for this request's LLM calls
+
+    The budget is LLM_REQUEST_DEADLINE_SECONDS, or less if the client sends
+    X-Request-Timeout-Ms (a client that gives up after 10s gains nothing
+    from retries at 25s).
+    """
+    budget = float(os.getenv('LLM_REQUEST_DEADLINE_SECONDS', '60'))
+    header = request.headers.get(DEADLINE_HEADER)
+    if header:
+        try:
+            budget = min(budget, max(0.0, float(header) / 1000))
+        except ValueError:
+            pass
+    set_deadline(budget)
+
+
+def set_deadline(budget_seconds: Optional[float]):
+    """Deadline for LLM calls in the current context (None: no deadline)
+
+    Background tasks inherit the deadline of the request that started them;
+    they call this to get a budget of their own.
+    """
+    _deadline.set(None if budget_seconds is None else time.monotonic() + budget_seconds)
+
+
+def remaining_seconds() -> Optional[float]:
+    """Time left before the current request's deadline (None outside a request)"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def deadline_passed() -> bool:
+    remaining = remaining_seconds()
+    return remaining is not None and remaining <= 0
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Timeouts, connection failures, rate limits and 5xx responses; not bad requests"""
+    if isinstance(error, (CircuitOpenError, DeadlineExceededError)):
+        return False
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    status = getattr(error, 'status_code', None)
+    if isinstance(status, int):
+        return status in RETRYABLE_STATUS_CODES or status >= 500
+    # SDK errors raised before any response arrives (APIConnectionError, APITimeoutError)
+    name = type(error).__name__
+    return 'Timeout' in name or 'Connection' in name
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker for one LLM provider
+
+    closed: calls pass through. open: calls fail fast with CircuitOpenError
+    until reset_seconds have passed. half_open: one trial call is let
+    through; its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: Optional[int] = None,
+        reset_seconds: Optional[float] = None
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold or int(os.getenv('LLM_BREAKER_FAILURE_THRESHOLD', '5'))
+        self.reset_seconds = reset_seconds or float(os.getenv('LLM_BREAKER_RESET_SECONDS', '30'))
+        self.state = 'closed'
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._stats = {'successes': 0, 'failures': 0, 'rejected': 0, 'opened': 0}
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go to the provider now"""
+        if self.state == 'open':
+            waited = time.monotonic() - self._opened_at
+            if waited < self.reset_seconds:
+                self._stats['rejected'] += 1
+                raise CircuitOpenError(self.name, self.reset_seconds - waited)
+            self.state = 'half_open'
+        if self.state == 'half_open':
+            if self._trial_in_flight:
+                self._stats['rejected'] += 1
+                raise CircuitOpenError(self.name, self.reset_seconds)
+            self._trial_in_flight = True
+
+    def record_success(self):
+        self._stats['successes'] += 1
+        self._consecutive_failures = 0
+        self._trial_in_flight = False
+        if self.state != 'closed':
+            logger.info(f"Circuit for LLM provider '{self.name}' closed")
+        self.state = 'closed'
+
+    def record_failure(self):
+        self._stats['failures'] += 1
+        self._consecutive_failures += 1
+        self._trial_in_flight = False
+        if self.state == 'half_open' or self._consecutive_failures >= self.failure_threshold:
+            if self.state != 'open':
+                self._stats['opened'] += 1
+                logger.warning(f"Circuit for LLM provider '{self.name}' opened after {self._consecutive_failures} failures")
+            self.state = 'open'
+            self._opened_at = time.monotonic()
+
+    def release(self):
+        """End a call that says nothing about provider health (e.g. a rejected prompt)"""
+        self._trial_in_flight = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'state': self.state,
+            'consecutive_failures': self._consecutive_failures,
+            **self._stats
+        }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """Shared breaker for a provider name"""
+    if name not in _breakers:
+        _breakers[name] = CircuitBreaker(name)
+    return _breakers[name]
+
+
+async def resilient_call(
+    name: str,
+    fn: Callable[[], Awaitable[T]],
+    max_attempts: Optional[int] = None
+) -> T:
+    """Run an LLM call under the provider's breaker, the request deadline and retries
+
+    Each attempt is bounded by LLM_ATTEMPT_TIMEOUT_SECONDS and by the time
+    left on the request deadline. Retryable failures back off exponentially
+    with full jitter; a retry that could not finish before the deadline is
+    not attempted. An attempt cut short by the request's own deadline (which
+    the client can shorten) raises DeadlineExceededError and is not counted
+    against the provider's breaker.
+    """
+    breaker = get_breaker(name)
+    max_attempts = max_attempts or int(os.getenv('LLM_MAX_ATTEMPTS', '3'))
+    attempt_timeout = float(os.getenv('LLM_ATTEMPT_TIMEOUT_SECONDS', '30'))
+    base_delay = float(os.getenv('LLM_RETRY_BASE_SECONDS', '0.5'))
+    max_delay = float(os.getenv('LLM_RETRY_MAX_SECONDS', '8'))
+
+    for attempt in range(1, max_attempts + 1):
+        remaining = remaining_seconds()
+        if remaining is not None and remaining <= 0:
+            raise DeadlineExceededError(f"Request deadline passed before calling '{name}'")
+        capped = remaining is not None and remaining < attempt_timeout
+        timeout = remaining if capped else attempt_timeout
+
+        breaker.before_call()
+        try:
+            result = await asyncio.wait_for(fn(), timeout=timeout)
+        except asyncio.CancelledError:
+            breaker.release()
+            raise
+        except Exception as e:
+            if not is_retryable(e):
+                breaker.release()
+                raise
+            if deadline_passed() or (capped and isinstance(e, asyncio.TimeoutError)):
+                breaker.release()
+                raise DeadlineExceededError(f"Request deadline passed while calling '{name}'") from e
+            breaker.record_failure()
+            delay = random.uniform(0, min(max_delay, base_delay * 2 ** (attempt - 1)))
+            remaining = remaining_seconds()
+            if attempt == max_attempts or (remaining is not None and remaining <= delay):
+                raise
+            logger.warning(f"LLM call to '{name}' failed ({type(e).__name__}); retry {attempt} in {delay:.2f}s")
+            await asyncio.sleep(delay)
+        else:
+            breaker.record_success()
+            return result
+
+
+def resilience_stats() -> Dict[str, Any]:
+    return {name: breaker.stats() for name, breaker in _breakers.items()}
@@ -0,0 +1,237 @@
+from typing import Dict, Any, List, Optional
+from collections import OrderedDict
+import difflib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+logger = logging.getLogger(__name__)
+
+# Delta op codes: copy a range of base lines, or insert literal lines
+COPY = 0
+INSERT = 1
+
+
+def resume_lines(resume: Dict[str, Any]) -> List[str]:
+    """Canonical line form of a parsed resume; small edits change few lines"""
+    return json.dumps(resume, sort_keys=True, indent=1, ensure_ascii=False, default=str).splitlines()
+
+
+def make_delta(base: List[str], target: List[str]) -> List[list]:
+    """Ops rebuilding target from base: [COPY, start, end] or [INSERT, lines]"""
+    ops: List[list] = []
+    matcher = difflib.SequenceMatcher(None, base, target, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            ops.append([COPY, i1, i2])
+        elif j2 > j1:
+            ops.append([INSERT, target[j1:j2]])
+    return ops
+
+
+def apply_delta(base: List[str], ops: List[list]) -> List[str]:
+    lines: List[str] = []
+    for op in ops:
+        if op[0] == COPY:
+            lines.extend(base[op[1]:op[2]])
+        else:
+            lines.extend(op[1])
+    return lines
+
+
+def _pack(ops: List[list]) -> bytes:
+    return zlib.compress(json.dumps(ops, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+
+
+def _unpack(blob: bytes) -> List[list]:
+    return json.loads(zlib.decompress(blob).decode('utf-8'))
+
+
+class ResumeHistory:
+    """Version history of stored resumes, kept as deltas against a base snapshot
+
+    Version 1 is the resume as stored. Each later version is saved as a
+    compressed line delta against its resume's latest full snapshot, so
+    reading any version is one snapshot plus one delta, and storage grows
+    with the size of the edits. When a delta stops being much smaller than
+    a snapshot (rebase_ratio), the version is saved in full and becomes
+    the base for the versions after it.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, rebase_ratio: Optional[float] = None, cache_size: int = 64):
+        self.db_path = db_path or os.getenv('RESUME_STORE_DB', 'resume_store.sqlite3')
+        self.rebase_ratio = rebase_ratio or float(os.getenv('RESUME_HISTORY_REBASE_RATIO', '0.5'))
+        self.cache_size = cache_size
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        # (resume_id, version) -> lines of recently read snapshots
+        self._snapshots: "OrderedDict[tuple, List[str]]" = OrderedDict()
+        self.metrics = {
+            'versions': 0,
+            'snapshots': 0,
+            'stored_bytes': 0,
+            'full_bytes': 0,
+            'reads': 0
+        }
+
+    def ensure(self, resume_id: str, resume: Dict[str, Any]):
+        """Record the stored resume as version 1 if its history has not started yet"""
+        with self._lock:
+            exists = self._connection().execute(
+                "SELECT 1 FROM resume_versions WHERE resume_id = ? LIMIT 1", (resume_id,)
+            ).fetchone()
+        if exists is None:
+            self.commit(resume_id, resume, note="original")
+
+    def commit(self, resume_id: str, resume: Dict[str, Any], note: Optional[str] = None) -> Dict[str, Any]:
+        """Save resume as the next version; returns its summary"""
+        lines = resume_lines(resume)
+        full = _pack([[INSERT, lines]])
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT MAX(version), MAX(CASE WHEN base_version IS NULL THEN version END) "
+                "FROM resume_versions WHERE resume_id = ?",
+                (resume_id,)
+            ).fetchone()
+            version = (row[0] or 0) + 1
+            base_version = row[1]
+
+            blob, stored_base = full, None
+            if base_version is not None:
+                delta = _pack(make_delta(self._snapshot(conn, resume_id, base_version), lines))
+                if len(delta) <= len(full) * self.rebase_ratio:
+                    blob, stored_base = delta, base_version
+
+            created_at = time.time()
+            try:
+                conn.execute(
+                    "INSERT INTO resume_versions (resume_id, version, base_version, data, size, created_at, note) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (resume_id, version, stored_base, blob, len(full), created_at, note)
+                )
+                conn.commit()
+            except sqlite3.Error:
+                conn.rollback()
+                raise
+
+        self.metrics['versions'] += 1
+        self.metrics['stored_bytes'] += len(blob)
+        self.metrics['full_bytes'] += len(full)
+        if stored_base is None:
+            self.metrics['snapshots'] += 1
+        return {
+            'version': version,
+            'base_version': stored_base,
+            'stored_bytes': len(blob),
+            'full_bytes': len(full),
+            'created_at': created_at,
+            'note': note
+        }
+
+    def versions(self, resume_id: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT version, base_version, LENGTH(data), size, created_at, note "
+                "FROM resume_versions WHERE resume_id = ? ORDER BY version",
+                (resume_id,)
+            ).fetchall()
+        return [
+            {
+                'version': r[0], 'base_version': r[1], 'stored_bytes': r[2],
+                'full_bytes': r[3], 'created_at': r[4], 'note': r[5]
+            }
+            for r in rows
+        ]
+
+    def get(self, resume_id: str, version: int) -> Optional[Dict[str, Any]]:
+        """The resume as it was at version; None if there is no such version"""
+        with self._lock:
+            lines = self._lines(self._connection(), resume_id, version)
+        if lines is None:
+            return None
+        self.metrics['reads'] += 1
+        return json.loads("\n".join(lines))
+
+    def diff(self, resume_id: str, from_version: int, to_version: int, context: int = 1) -> Optional[Dict[str, Any]]:
+        """Sections that changed between two versions, and a unified diff of their content"""
+        before = self.get(resume_id, from_version)
+        after = self.get(resume_id, to_version)
+        if before is None or after is None:
+            return None
+
+        changed = sorted(
+            key for key in set(before) | set(after)
+            if before.get(key) != after.get(key)
+        )
+        diff = list(difflib.unified_diff(
+            resume_lines(before), resume_lines(after),
+            fromfile=f"v{from_version}", tofile=f"v{to_version}", n=context, lineterm=""
+        ))
+        return {'from': from_version, 'to': to_version, 'changed_sections': changed, 'diff': diff}
+
+    def delete(self, resume_id: str):
+        with self._lock:
+            conn = self._connection()
+            conn.execute("DELETE FROM resume_versions WHERE resume_id = ?", (resume_id,))
+            conn.commit()
+            for key in [key for key in self._snapshots if key[0] == resume_id]:
+                del self._snapshots[key]
+
+    def _lines(self, conn: sqlite3.Connection, resume_id: str, version: int) -> Optional[List[str]]:
+        row = conn.execute(
+            "SELECT base_version, data FROM resume_versions WHERE resume_id = ? AND version = ?",
+            (resume_id, version)
+        ).fetchone()
+        if row is None:
+            return None
+        base_version, blob = row
+        if base_version is None:
+            return self._snapshot(conn, resume_id, version, blob)
+        return apply_delta(self._snapshot(conn, resume_id, base_version), _unpack(blob))
+
+    def _snapshot(self, conn: sqlite3.Connection, resume_id: str, version: int, blob: Optional[bytes] = None) -> List[str]:
+        """Lines of a full snapshot, from the cache when it was read recently"""
+        key = (resume_id, version)
+        lines = self._snapshots.get(key)
+        if lines is not None:
+            self._snapshots.move_to_end(key)
+            return lines
+        if blob is None:
+            blob = conn.execute(
+                "SELECT data FROM resume_versions WHERE resume_id = ? AND version = ?", key
+            ).fetchone()[0]
+        lines = apply_delta([], _unpack(blob))
+        self._snapshots[key] = lines
+        while len(self._snapshots) > self.cache_size:
+            self._snapshots.popitem(last=False)
+        return lines
+
+    def _connection(self) -> sqlite3.Connection:
+        """Open the history lazily so importing the module stays cheap"""
+        if self._conn is None:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.executescript(
+                "CREATE TABLE IF NOT EXISTS resume_versions ("
+                "resume_id TEXT NOT NULL, version INTEGER NOT NULL, base_version INTEGER, "
+                "data BLOB NOT NULL, size INTEGER NOT NULL, created_at REAL NOT NULL, note TEXT, "
+                "PRIMARY KEY (resume_id, version));"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def stats(self) -> Dict[str, Any]:
+        # Bytes written per byte of full (compressed) snapshots the same versions would take
+        full = self.metrics['full_bytes']
+        return {**self.metrics, 'storage_ratio': round(self.metrics['stored_bytes'] / full, 4) if full else None}
+
+
+# Versions of resumes in resume_store, in the same database
+resume_history = ResumeHistory()
@@ -0,0 +1,391 @@
+from typing import Dict, Any, List, Optional, Tuple
+from bisect import bisect_left
+import heapq
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from services.keyword_extractor import KeywordExtractor
+from services.term_index import term_indexer
+from services.semantic_index import semantic_encoder, resume_spans, job_spans, VectorStore
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Query weight of each factor, split evenly across its terms (as in the match score)
+QUERY_WEIGHTS = {
+    'skill': 40.0,
+    'keyword': 30.0
+}
+
+# Lowest posting weight a resume keyword gets (its most frequent keywords weigh 1.0)
+MIN_KEYWORD_WEIGHT = 0.3
+
+
+class PostingsCursor:
+    """One query term's postings, read from the index in doc_num order a chunk at a time
+
+    Skipping ahead past the loaded chunk seeks the (term, doc_num) primary
+    key instead of reading the postings in between.
+    """
+
+    def __init__(
+        self,
+        conn: sqlite3.Connection,
+        term: str,
+        query_weight: float,
+        upper_bound: float,
+        chunk_size: int,
+        metrics: Dict[str, int]
+    ):
+        self.conn = conn
+        self.term = term
+        self.query_weight = query_weight
+        self.upper_bound = upper_bound
+        self.chunk_size = chunk_size
+        self.metrics = metrics
+        self.docs: List[int] = []
+        self.weights: List[float] = []
+        self.position = 0
+        self.exhausted = False
+        self._fetch(0)
+
+    @property
+    def doc(self) -> float:
+        """Current doc_num; inf once the postings are used up"""
+        return self.docs[self.position] if self.position < len(self.docs) else float('inf')
+
+    @property
+    def weight(self) -> float:
+        return self.weights[self.position]
+
+    def next(self):
+        self.position += 1
+        if self.position >= len(self.docs) and not self.exhausted:
+            self._fetch(self.docs[-1] + 1)
+
+    def advance(self, target: int):
+        """Move to the first posting with doc_num >= target"""
+        self.position = bisect_left(self.docs, target, self.position)
+        if self.position >= len(self.docs) and not self.exhausted:
+            self._fetch(target)
+
+    def _fetch(self, from_doc: int):
+        rows = self.conn.execute(
+            "SELECT doc_num, weight FROM postings WHERE term = ? AND doc_num >= ? ORDER BY doc_num LIMIT ?",
+            (self.term, from_doc, self.chunk_size)
+        ).fetchall()
+        self.docs = [row[0] for row in rows]
+        self.weights = [row[1] for row in rows]
+        self.position = 0
+        self.exhausted = len(rows) < self.chunk_size
+        self.metrics['postings_read'] += len(rows)
+
+
+class ResumeIndex:
+    """On-disk inverted index over parsed resumes, queried with WAND top-k
+
+    Postings are keyed by term ("skill:<id>" or "kw:<lemma>") and hold a
+    per-document weight in (0, 1]. Every term also stores its largest
+    posting weight, which bounds how much it can add to any score; WAND uses
+    those bounds to skip documents that cannot enter the current top-k
+    without scoring them.
+    """
+
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        keyword_extractor: Optional[KeywordExtractor] = None,
+        keywords_per_resume: Optional[int] = None,
+        postings_chunk: Optional[int] = None
+    ):
+        self.db_path = db_path or os.getenv('RESUME_INDEX_DB', 'resume_index.sqlite3')
+        self.keyword_extractor = keyword_extractor or KeywordExtractor()
+        self.keywords_per_resume = keywords_per_resume or int(os.getenv('RESUME_INDEX_KEYWORDS', '200'))
+        self.postings_chunk = postings_chunk or int(os.getenv('RESUME_INDEX_POSTINGS_CHUNK', '256'))
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        # Resume embeddings, loaded from the documents table on first semantic search
+        self._vectors: Optional[VectorStore] = None
+        self.metrics = {
+            'searches': 0,
+            'documents_scored': 0,
+            'documents_skipped': 0,
+            'postings_read': 0
+        }
+
+    async def add(self, resume_id: str, resume_data: Dict[str, Any], metadata: Optional[Dict[str, Any]] = None):
+        """Index a parsed resume, replacing any earlier version with the same id"""
+        terms = await self._document_terms(resume_data)
+        vector = semantic_encoder.encode(["\n\n".join(resume_spans(resume_data))])[0]
+        with self._lock:
+            conn = self._connection()
+            try:
+                self._delete(conn, resume_id)
+                cursor = conn.execute(
+                    "INSERT INTO documents (resume_id, metadata, added_at, vector, vector_version) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (
+                        resume_id, json.dumps(metadata or {}), time.time(),
+                        VectorStore.quantize(vector).tobytes(), semantic_encoder.version
+                    )
+                )
+                doc_num = cursor.lastrowid
+                conn.executemany(
+                    "INSERT INTO postings (term, doc_num, weight) VALUES (?, ?, ?)",
+                    [(term, doc_num, weight) for term, weight in terms.items()]
+                )
+                conn.executemany(
+                    "INSERT INTO terms (term, max_weight, doc_freq) VALUES (?, ?, 1) "
+                    "ON CONFLICT(term) DO UPDATE SET "
+                    "max_weight = MAX(max_weight, excluded.max_weight), doc_freq = doc_freq + 1",
+                    list(terms.items())
+                )
+                conn.commit()
+            except sqlite3.Error:
+                conn.rollback()
+                raise
+            if self._vectors is not None:
+                self._vectors.add(resume_id, vector)
+
+    def delete(self, resume_id: str) -> bool:
+        """Remove a resume's postings; returns False if it was not indexed"""
+        with self._lock:
+            conn = self._connection()
+            try:
+                deleted = self._delete(conn, resume_id)
+                conn.commit()
+            except sqlite3.Error:
+                conn.rollback()
+                raise
+            if self._vectors is not None:
+                self._vectors.remove(resume_id)
+        return deleted
+
+    def _delete(self, conn: sqlite3.Connection, resume_id: str) -> bool:
+        row = conn.execute("SELECT doc_num FROM documents WHERE resume_id = ?", (resume_id,)).fetchone()
+        if row is None:
+            return False
+        doc_num = row[0]
+        # max_weight is left as is: a stale maximum is still a valid upper bound
+        conn.execute(
+            "UPDATE terms SET doc_freq = doc_freq - 1 "
+            "WHERE term IN (SELECT term FROM postings WHERE doc_num = ?)",
+            (doc_num,)
+        )
+        conn.execute("DELETE FROM postings WHERE doc_num = ?", (doc_num,))
+        conn.execute("DELETE FROM documents WHERE doc_num = ?", (doc_num,))
+        return True
+
+    async def _document_terms(self, resume_data: Dict[str, Any]) -> Dict[str, float]:
+        """Skill ids (weight 1) and lemmatized keywords weighted by frequency rank"""
+        terms = {f"skill:{skill}": 1.0 for skill in term_indexer.index_for(resume_data).skill_ids}
+        keywords = await self.keyword_extractor.extract_keywords(
+            resume_data.get('raw_text', '') or '', max_keywords=self.keywords_per_resume
+        )
+        for rank, keyword in enumerate(keywords):
+            weight = max(MIN_KEYWORD_WEIGHT, 1.0 - rank / self.keywords_per_resume)
+            terms.setdefault(f"kw:{keyword.lower()}", round(weight, 4))
+        return terms
+
+    def query_terms(self, job_analysis: Dict[str, Any]) -> Dict[str, float]:
+        """Query weights for a JobAnalyzer analysis: its skills and keywords"""
+        skills = {term_indexer.skill_id(skill) for skill in job_analysis.get('required_skills', []) if skill}
+        keywords = {kw.lower() for kw in job_analysis.get('keywords', []) if kw}
+
+        query: Dict[str, float] = {}
+        for skill in skills:
+            query[f"skill:{skill}"] = QUERY_WEIGHTS['skill'] / len(skills)
+        for keyword in keywords:
+            query[f"kw:{keyword}"] = QUERY_WEIGHTS['keyword'] / len(keywords)
+        return query
+
+    def search(self, job_analysis: Dict[str, Any], top_k: int = 10) -> List[Dict[str, Any]]:
+        """Top-k resumes for a job analysis, best first; scores are 0-100"""
+        query = self.query_terms(job_analysis)
+        if not query or top_k <= 0:
+            return []
+
+        with self._lock:
+            conn = self._connection()
+            cursors = []
+            for term, query_weight in query.items():
+                row = conn.execute("SELECT max_weight FROM terms WHERE term = ?", (term,)).fetchone()
+                if row is None:
+                    continue
+                cursor = PostingsCursor(
+                    conn, term, query_weight, query_weight * row[0], self.postings_chunk, self.metrics
+                )
+                if cursor.docs:
+                    cursors.append(cursor)
+
+            top, scored = self._wand(cursors, top_k)
+            # Skips are counted over documents containing a query term, not the whole corpus
+            candidates = 0
+            if cursors:
+                placeholders = ",".join("?" * len(cursors))
+                candidates = conn.execute(
+                    f"SELECT COUNT(DISTINCT doc_num) FROM postings WHERE term IN ({placeholders})",
+                    [cursor.term for cursor in cursors]
+                ).fetchone()[0]
+
+            documents = {}
+            if top:
+                placeholders = ",".join("?" * len(top))
+                for doc_num, resume_id, metadata in conn.execute(
+                    f"SELECT doc_num, resume_id, metadata FROM documents WHERE doc_num IN ({placeholders})",
+                    [doc_num for _, doc_num, _ in top]
+                ):
+                    documents[doc_num] = (resume_id, json.loads(metadata))
+
+        self.metrics['searches'] += 1
+        self.metrics['documents_scored'] += scored
+        self.metrics['documents_skipped'] += max(0, candidates - scored)
+
+        max_score = sum(query.values())
+        results = []
+        for score, doc_num, matched in sorted(top, key=lambda item: (-item[0], item[1])):
+            if doc_num not in documents:
+                continue
+            resume_id, metadata = documents[doc_num]
+            results.append({
+                'resume_id': resume_id,
+                'score': round(score / max_score * 100, 2),
+                'matched_skills': sorted(t[len('skill:'):] for t in matched if t.startswith('skill:')),
+                'matched_keywords': sorted(t[len('kw:'):] for t in matched if t.startswith('kw:')),
+                'metadata': metadata
+            })
+        return results
+
+    def semantic_search(self, job_analysis: Dict[str, Any], top_k: int = 10) -> List[Dict[str, Any]]:
+        """Nearest resumes to the job's bullets by embedding, for matches keywords miss"""
+        spans = job_spans(job_analysis)
+        if not spans or top_k <= 0:
+            return []
+        query = semantic_encoder.encode(["\n".join(spans)])[0]
+
+        with self._lock:
+            conn = self._connection()
+            if self._vectors is None or self._vectors.version != semantic_encoder.version:
+                self._vectors = self._load_vectors(conn)
+            hits = self._vectors.search(query, top_k)
+            documents = {}
+            if hits:
+                placeholders = ",".join("?" * len(hits))
+                for resume_id, metadata in conn.execute(
+                    f"SELECT resume_id, metadata FROM documents WHERE resume_id IN ({placeholders})",
+                    [resume_id for resume_id, _ in hits]
+                ):
+                    documents[resume_id] = json.loads(metadata)
+
+        return [
+            {
+                'resume_id': resume_id,
+                'score': round(max(0.0, similarity) * 100, 2),
+                'metadata': documents.get(resume_id, {})
+            }
+            for resume_id, similarity in hits
+        ]
+
+    def _load_vectors(self, conn: sqlite3.Connection) -> VectorStore:
+        """Vectors stored under the current encoder; resumes indexed with another need re-adding"""
+        store = VectorStore(dims=semantic_encoder.output_dims)
+        store.version = semantic_encoder.version
+        stale = 0
+        for resume_id, blob, version in conn.execute("SELECT resume_id, vector, vector_version FROM documents"):
+            if blob is None or version != semantic_encoder.version:
+                stale += 1
+                continue
+            store.add(resume_id, np.frombuffer(blob, dtype=np.int8).astype(np.float32) / 127)
+        if stale:
+            logger.warning(f"{stale} indexed resumes have no vector for semantic model {semantic_encoder.version}")
+        return store
+
+    @staticmethod
+    def _wand(cursors: List[PostingsCursor], top_k: int) -> Tuple[List[tuple], int]:
+        """WAND over postings cursors
+
+        Returns the top-k (score, doc_num, matched_terms) and how many
+        documents were fully scored.
+        """
+        heap: List[tuple] = []  # min-heap of (score, -doc_num, matched_terms)
+        scored = 0
+
+        while True:
+            threshold = heap[0][0] if len(heap) >= top_k else 0.0
+            order = sorted((cursor for cursor in cursors if cursor.doc != float('inf')), key=lambda c: c.doc)
+            if not order:
+                break
+
+            # Pivot: first cursor at which the summed upper bounds could beat the threshold
+            bound = 0.0
+            pivot = None
+            for n, cursor in enumerate(order):
+                bound += cursor.upper_bound
+                if bound > threshold:
+                    pivot = n
+                    break
+            if pivot is None:
+                break
+
+            pivot_doc = order[pivot].doc
+            if order[0].doc == pivot_doc:
+                score = 0.0
+                matched = []
+                for cursor in order:
+                    if cursor.doc != pivot_doc:
+                        break
+                    score += cursor.query_weight * cursor.weight
+                    matched.append(cursor.term)
+                    cursor.next()
+                scored += 1
+                entry = (score, -pivot_doc, matched)
+                if len(heap) < top_k:
+                    heapq.heappush(heap, entry)
+                elif score > threshold:
+                    heapq.heapreplace(heap, entry)
+            else:
+                # Documents before the pivot cannot reach the threshold: skip them
+                for cursor in order[:pivot]:
+                    cursor.advance(pivot_doc)
+
+        return [(score, -neg_doc, matched) for score, neg_doc, matched in heap], scored
+
+    def _connection(self) -> sqlite3.Connection:
+        """Open the index lazily so importing the module stays cheap"""
+        if self._conn is None:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.executescript(
+                "CREATE TABLE IF NOT EXISTS documents ("
+                "doc_num INTEGER PRIMARY KEY AUTOINCREMENT, resume_id TEXT UNIQUE NOT NULL, "
+                "metadata TEXT NOT NULL, added_at REAL NOT NULL, vector BLOB, vector_version TEXT);"
+                "CREATE TABLE IF NOT EXISTS postings ("
+                "term TEXT NOT NULL, doc_num INTEGER NOT NULL, weight REAL NOT NULL, "
+                "PRIMARY KEY (term, doc_num)) WITHOUT ROWID;"
+                "CREATE INDEX IF NOT EXISTS postings_by_doc ON postings (doc_num);"
+                "CREATE TABLE IF NOT EXISTS terms ("
+                "term TEXT PRIMARY KEY, max_weight REAL NOT NULL, doc_freq INTEGER NOT NULL);"
+            )
+            # Indexes created before resume embeddings were stored
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(documents)")}
+            for column, kind in (("vector", "BLOB"), ("vector_version", "TEXT")):
+                if column not in columns:
+                    self._conn.execute(f"ALTER TABLE documents ADD COLUMN {column} {kind}")
+            self._conn.commit()
+        return self._conn
+
+    def stats(self) -> Dict[str, Any]:
+        documents = None
+        if self._conn is not None:
+            with self._lock:
+                documents = self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+        return {'documents': documents, **self.metrics}
+
+
+# Shared index for recruiter mode
+resume_index = ResumeIndex()
@@ -3,10 +3,20 @@ import docx
 from typing import Dict, Any, List
 import re
 from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
 import logging
+import os
+from services.term_index import term_indexer
 
 logger = logging.getLogger(__name__)
 
+# PDF/DOCX parsing is blocking; it runs here instead of on the event loop
+parse_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv('RESUME_PARSE_WORKERS', '4')),
+    thread_name_prefix="resume-parse"
+)
+
 class ResumeParser:
     """Service for parsing resume files (PDF, DOCX) and extracting structured data"""
     
@@ -57,19 +67,31 @@ class ResumeParser:
         }
     
     async def parse_resume(self, file_content: bytes, filename: str) -> Dict[str, Any]:
-        """Parse resume file and extract structured data"""
+        """Parse resume file and extract structured data
+        
+        Runs on parse_executor; if the caller is cancelled while the parse is
+        still queued, it is dropped without running.
+        """
         try:
-            if filename.lower().endswith('.pdf'):
-                return await self._parse_pdf(file_content)
-            elif filename.lower().endswith(('.docx', '.doc')):
-                return await self._parse_docx(file_content)
-            else:
-                raise ValueError(f"Unsupported file format: {filename}")
+            loop = asyncio.get_running_loop()
+            parsed = await loop.run_in_executor(parse_executor, self._parse_file, file_content, filename)
         except Exception as e:
             logger.error(f"Error parsing resume {filename}: {str(e)}")
             raise
+        
+        # Build the term index now so scoring this resume later is lookups only
+        term_indexer.index_for(parsed)
+        return parsed
+    
+    def _parse_file(self, file_content: bytes, filename: str) -> Dict[str, Any]:
+        if filename.lower().endswith('.pdf'):
+            return self._parse_pdf(file_content)
+        elif filename.lower().endswith(('.docx', '.doc')):
+            return self._parse_docx(file_content)
+        else:
+            raise ValueError(f"Unsupported file format: {filename}")
     
-    async def _parse_pdf(self, content: bytes) -> Dict[str, Any]:
+    def _parse_pdf(self, content: bytes) -> Dict[str, Any]:
         """Parse PDF resume using pdfplumber"""
         text_content = ""
         
@@ -79,9 +101,9 @@ class ResumeParser:
                 if page_text:
                     text_content += page_text + "\n"
         
-        return await self._extract_structured_data(text_content)
+        return self._extract_structured_data(text_content)
     
-    async def _parse_docx(self, content: bytes) -> Dict[str, Any]:
+    def _parse_docx(self, content: bytes) -> Dict[str, Any]:
         """Parse DOCX resume using python-docx"""
         doc = docx.Document(BytesIO(content))
         text_content = ""
@@ -96,9 +118,9 @@ class ResumeParser:
                     text_content += cell.text + " "
                 text_content += "\n"
         
-        return await self._extract_structured_data(text_content)
+        return self._extract_structured_data(text_content)
     
-    async def _extract_structured_data(self, text: str) -> Dict[str, Any]:
+    def _extract_structured_data(self, text: str) -> Dict[str, Any]:
         """Extract structured data from raw text"""
         sections = self._identify_sections(text)
         
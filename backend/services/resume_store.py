@@ -0,0 +1,231 @@
+from typing import Dict, Any, List, Optional, Tuple
+from collections import OrderedDict
+from dataclasses import dataclass
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from services.resume_parser import ResumeParser
+from services.term_index import term_indexer, ResumeTermIndex
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class StoredResume:
+    """A user's saved resume and its parsed data"""
+    resume_id: str
+    user: str
+    filename: str
+    content_hash: str
+    resume: Dict[str, Any]
+    created_at: float
+
+
+class ResumeStore:
+    """Server-side resumes, so requests can send a resume_id instead of the file
+
+    Files are deduplicated by content hash: a document (parsed ResumeData and
+    its term index) is parsed and stored once, however many users or saves
+    refer to it. Each user's saved resumes point at documents; saving the
+    same file twice returns the existing resume_id.
+    """
+
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        resume_parser: Optional[ResumeParser] = None,
+        cache_size: Optional[int] = None
+    ):
+        self.db_path = db_path or os.getenv('RESUME_STORE_DB', 'resume_store.sqlite3')
+        self.resume_parser = resume_parser or ResumeParser()
+        self.cache_size = cache_size or int(os.getenv('RESUME_STORE_CACHE_SIZE', '256'))
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        # content_hash -> parsed resume, so hot resumes skip the JSON decode
+        self._documents: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.metrics = {
+            'saves': 0,
+            'deduplicated': 0,
+            'parses': 0,
+            'hits': 0,
+            'misses': 0
+        }
+
+    async def save(self, user: str, content: bytes, filename: str) -> Tuple[StoredResume, bool]:
+        """Store a resume file for the user; returns (stored, created)
+
+        The file is parsed only if no one has stored the same content before.
+        """
+        self.metrics['saves'] += 1
+        content_hash = hashlib.sha256(content).hexdigest()
+
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT resume_id, filename, created_at FROM resumes WHERE user_id = ? AND content_hash = ?",
+                (user, content_hash)
+            ).fetchone()
+        if row is not None:
+            self.metrics['deduplicated'] += 1
+            return StoredResume(row[0], user, row[1], content_hash, self._document(content_hash), row[2]), False
+
+        resume = self._document(content_hash)
+        if resume is None:
+            self.metrics['parses'] += 1
+            resume = await self.resume_parser.parse_resume(content, filename)
+            index = term_indexer.index_for(resume)
+            self._put_document(content_hash, resume, index)
+
+        stored = StoredResume(uuid.uuid4().hex, user, filename, content_hash, resume, time.time())
+        with self._lock:
+            conn = self._connection()
+            try:
+                conn.execute(
+                    "INSERT INTO resumes (resume_id, user_id, content_hash, filename, created_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (stored.resume_id, user, content_hash, filename, stored.created_at)
+                )
+                conn.commit()
+            except sqlite3.IntegrityError:
+                # A concurrent save of the same file won the race
+                conn.rollback()
+                row = conn.execute(
+                    "SELECT resume_id, filename, created_at FROM resumes WHERE user_id = ? AND content_hash = ?",
+                    (user, content_hash)
+                ).fetchone()
+                self.metrics['deduplicated'] += 1
+                return StoredResume(row[0], user, row[1], content_hash, resume, row[2]), False
+        return stored, True
+
+    def get(self, user: str, resume_id: str) -> Optional[StoredResume]:
+        """The user's stored resume, with its term index warmed; None if unknown or not theirs"""
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT filename, content_hash, created_at FROM resumes WHERE resume_id = ? AND user_id = ?",
+                (resume_id, user)
+            ).fetchone()
+        if row is None:
+            self.metrics['misses'] += 1
+            return None
+        self.metrics['hits'] += 1
+        filename, content_hash, created_at = row
+        return StoredResume(resume_id, user, filename, content_hash, self._document(content_hash), created_at)
+
+    def list(self, user: str) -> List[Dict[str, Any]]:
+        """The user's stored resumes, newest first (without parsed data)"""
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT resume_id, filename, created_at FROM resumes WHERE user_id = ? ORDER BY created_at DESC",
+                (user,)
+            ).fetchall()
+        return [{'resume_id': r[0], 'filename': r[1], 'created_at': r[2]} for r in rows]
+
+    def delete(self, user: str, resume_id: str) -> bool:
+        """Remove the user's resume; its document goes once nothing refers to it"""
+        with self._lock:
+            conn = self._connection()
+            try:
+                row = conn.execute(
+                    "SELECT content_hash FROM resumes WHERE resume_id = ? AND user_id = ?", (resume_id, user)
+                ).fetchone()
+                if row is None:
+                    return False
+                conn.execute("DELETE FROM resumes WHERE resume_id = ?", (resume_id,))
+                orphaned = conn.execute(
+                    "DELETE FROM documents WHERE content_hash = ? AND NOT EXISTS "
+                    "(SELECT 1 FROM resumes WHERE content_hash = ?)",
+                    (row[0], row[0])
+                ).rowcount
+                conn.commit()
+            except sqlite3.Error:
+                conn.rollback()
+                raise
+            if orphaned:
+                self._documents.pop(row[0], None)
+        return True
+
+    def _document(self, content_hash: str) -> Optional[Dict[str, Any]]:
+        """Parsed resume for a content hash, registering its stored term index with term_indexer"""
+        resume = self._documents.get(content_hash)
+        if resume is not None:
+            self._documents.move_to_end(content_hash)
+            return resume
+
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT resume, term_index FROM documents WHERE content_hash = ?", (content_hash,)
+            ).fetchone()
+        if row is None:
+            return None
+        resume = json.loads(row[0])
+        terms = json.loads(row[1])
+        term_indexer.remember(resume, ResumeTermIndex(
+            tokens=set(terms['tokens']),
+            ngrams=set(terms['ngrams']),
+            skill_ids=set(terms['skill_ids']),
+            text=terms['text']
+        ))
+        self._cache(content_hash, resume)
+        return resume
+
+    def _put_document(self, content_hash: str, resume: Dict[str, Any], index: ResumeTermIndex):
+        terms = {
+            'tokens': sorted(index.tokens),
+            'ngrams': sorted(index.ngrams),
+            'skill_ids': sorted(index.skill_ids),
+            'text': index.text
+        }
+        with self._lock:
+            conn = self._connection()
+            try:
+                conn.execute(
+                    "INSERT OR IGNORE INTO documents (content_hash, resume, term_index, created_at) VALUES (?, ?, ?, ?)",
+                    (content_hash, json.dumps(resume, default=str), json.dumps(terms), time.time())
+                )
+                conn.commit()
+            except sqlite3.Error:
+                conn.rollback()
+                raise
+        self._cache(content_hash, resume)
+
+    def _cache(self, content_hash: str, resume: Dict[str, Any]):
+        self._documents[content_hash] = resume
+        self._documents.move_to_end(content_hash)
+        while len(self._documents) > self.cache_size:
+            self._documents.popitem(last=False)
+
+    def _connection(self) -> sqlite3.Connection:
+        """Open the store lazily so importing the module stays cheap"""
+        if self._conn is None:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.executescript(
+                "CREATE TABLE IF NOT EXISTS documents ("
+                "content_hash TEXT PRIMARY KEY, resume TEXT NOT NULL, term_index TEXT NOT NULL, "
+                "created_at REAL NOT NULL);"
+                "CREATE TABLE IF NOT EXISTS resumes ("
+                "resume_id TEXT PRIMARY KEY, user_id TEXT NOT NULL, content_hash TEXT NOT NULL, "
+                "filename TEXT NOT NULL, created_at REAL NOT NULL, UNIQUE (user_id, content_hash));"
+                "CREATE INDEX IF NOT EXISTS resumes_by_hash ON resumes (content_hash);"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def stats(self) -> Dict[str, Any]:
+        counts = {'resumes': None, 'documents': None}
+        if self._conn is not None:
+            with self._lock:
+                counts['resumes'] = self._conn.execute("SELECT COUNT(*) FROM resumes").fetchone()[0]
+                counts['documents'] = self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+        return {**counts, 'cached': len(self._documents), **self.metrics}
+
+
+# Shared store behind /api/resumes and every endpoint that takes a resume_id
+resume_store = ResumeStore()
@@ -0,0 +1,334 @@
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+from collections import OrderedDict
+import hashlib
+import logging
+import os
+import re
+import sys
+import threading
+import numpy as np
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer, ENGLISH_STOP_WORDS
+from sklearn.decomposition import TruncatedSVD
+from sklearn.cluster import MiniBatchKMeans
+import joblib
+from services.term_index import term_indexer, tokenize, sequence_terms
+from services.keyword_extractor import KeywordExtractor
+
+logger = logging.getLogger(__name__)
+
+# Hashed feature space: word unigrams/bigrams plus canonical skill ids
+HASH_FEATURES = 2 ** 18
+
+# Times a skill or category feature is counted against a word, without a fitted model
+CONCEPT_WEIGHT = 3
+
+
+class SemanticEncoder:
+    """Local text embeddings: hashed n-grams reduced to a small dense vector
+
+    With a fitted model (TF-IDF + truncated SVD, i.e. LSA) the dimensions
+    capture co-occurrence learned from a corpus. Without one, the hashed
+    features are joined by concept features from the skill taxonomy: every
+    spelling of a skill ("amazon web services", "aws") maps to one skill id,
+    and skills of one category (REST, GraphQL and APIs; MySQL and Postgres)
+    share that category, so "REST services" still lands near "API
+    development". They are hashed straight into the output dimensions (a
+    random projection that keeps every feature), so no training data is
+    needed, but synonyms outside the taxonomy need a fitted model. Either
+    way it runs on CPU with no network access.
+    """
+
+    def __init__(self, dims: Optional[int] = None, model_path: Optional[str] = None):
+        self.dims = dims or int(os.getenv('SEMANTIC_DIMS', '256'))
+        self.model_path = model_path or os.getenv('SEMANTIC_MODEL_PATH', 'semantic_model.joblib')
+        self.hasher = HashingVectorizer(
+            analyzer=self._features, n_features=HASH_FEATURES, alternate_sign=False, norm=None
+        )
+        self.fallback_hasher = HashingVectorizer(
+            analyzer=self._fallback_features, n_features=self.dims, alternate_sign=True, norm=None
+        )
+        # Canonical skill id -> its category in the skill taxonomy
+        self.skill_categories: Dict[str, str] = {}
+        for category, skills in KeywordExtractor().tech_skills.items():
+            for skill in skills:
+                self.skill_categories.setdefault(term_indexer.skill_id(skill), category)
+        self.tfidf: Optional[TfidfTransformer] = None
+        self.svd: Optional[TruncatedSVD] = None
+        self.version = "hashed-concepts"
+        self._cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._cache_size = int(os.getenv('SEMANTIC_CACHE_SIZE', '512'))
+        self._lock = threading.Lock()
+        self.load()
+
+    def _features(self, text: str) -> List[str]:
+        words = [w for w in tokenize(text) if w not in ENGLISH_STOP_WORDS and len(w) > 1]
+        features = list(words)
+        features.extend(f"{a} {b}" for a, b in zip(words, words[1:]))
+        # Different spellings of one skill share a feature ("postgres" / "postgresql")
+        for word in words:
+            skill = term_indexer.skill_aliases.get(word)
+            if skill:
+                features.append(f"skill:{skill}")
+        return features
+
+    def _concepts(self, text: str) -> List[str]:
+        """Skill ids named anywhere in the text (multi-word spellings too) and their categories"""
+        concepts = []
+        for term in sequence_terms(tokenize(text)):
+            skill = term_indexer.skill_aliases.get(term)
+            if skill:
+                concepts.append(f"skill:{skill}")
+                category = self.skill_categories.get(skill)
+                if category:
+                    concepts.append(f"category:{category}")
+        return concepts
+
+    def _fallback_features(self, text: str) -> List[str]:
+        return self._features(text) + self._concepts(text) * CONCEPT_WEIGHT
+
+    def fit(self, texts: List[str]):
+        """Fit LSA on a corpus of resume sections and job bullets, then save it"""
+        texts = [t for t in texts if t and t.strip()]
+        counts = self.hasher.transform(texts)
+        tfidf = TfidfTransformer(sublinear_tf=True).fit(counts)
+        weighted = tfidf.transform(counts)
+        dims = min(self.dims, max(1, min(weighted.shape) - 1))
+        svd = TruncatedSVD(n_components=dims, random_state=0).fit(weighted)
+        with self._lock:
+            self.tfidf, self.svd = tfidf, svd
+            self.version = f"lsa-{hashlib.sha1(svd.components_.tobytes()).hexdigest()[:8]}"
+            self._cache.clear()
+        joblib.dump({'tfidf': tfidf, 'svd': svd, 'version': self.version}, self.model_path)
+        logger.info(f"Fitted semantic model {self.version} on {len(texts)} texts")
+
+    def load(self):
+        if not os.path.exists(self.model_path):
+            return
+        try:
+            model = joblib.load(self.model_path)
+            self.tfidf, self.svd, self.version = model['tfidf'], model['svd'], model['version']
+        except Exception as e:
+            logger.warning(f"Could not load semantic model {self.model_path}: {str(e)}")
+
+    @property
+    def output_dims(self) -> int:
+        return self.svd.n_components if self.svd is not None else self.dims
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Unit-length float32 vectors, one row per text (cached per text)"""
+        missing = [t for t in dict.fromkeys(texts) if t not in self._cache]
+        if missing:
+            if self.svd is not None:
+                vectors = self.svd.transform(self.tfidf.transform(self.hasher.transform(missing)))
+            else:
+                vectors = self.fallback_hasher.transform(missing).toarray()
+            vectors = np.asarray(vectors, dtype=np.float32)
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors /= np.where(norms > 0, norms, 1.0)
+            with self._lock:
+                for text, vector in zip(missing, vectors):
+                    self._cache[text] = vector
+                    while len(self._cache) > self._cache_size:
+                        self._cache.popitem(last=False)
+
+        rows = []
+        for text in texts:
+            vector = self._cache.get(text)
+            rows.append(vector if vector is not None else self.encode([text])[0])
+        return np.vstack(rows) if rows else np.zeros((0, self.output_dims), dtype=np.float32)
+
+    def similarity(self, resume_spans: List[str], job_spans: List[str]) -> float:
+        """0-100: how well the best resume span covers each job span, averaged"""
+        resume_spans = [s for s in resume_spans if s and s.strip()]
+        job_spans = [s for s in job_spans if s and s.strip()]
+        if not resume_spans or not job_spans:
+            return 0.0
+        scores = self.encode(job_spans) @ self.encode(resume_spans).T
+        return round(float(np.clip(scores.max(axis=1), 0.0, 1.0).mean()) * 100, 2)
+
+
+class VectorStore:
+    """Compact nearest-neighbour store: int8 unit vectors, brute force or IVF
+
+    Vectors are quantized to int8 (x127), a quarter of float32. Search is a
+    chunked matrix product over everything until the store reaches
+    ivf_min_vectors; then an inverted file (k-means cells) is built and only
+    the nprobe nearest cells are scanned.
+    """
+
+    def __init__(self, dims: int, ivf_min_vectors: Optional[int] = None, nprobe: Optional[int] = None):
+        self.dims = dims
+        self.ivf_min_vectors = ivf_min_vectors or int(os.getenv('SEMANTIC_IVF_MIN_VECTORS', '20000'))
+        self.nprobe = nprobe or int(os.getenv('SEMANTIC_IVF_NPROBE', '8'))
+        self.version: Optional[str] = None
+        self._vectors = np.zeros((0, dims), dtype=np.int8)
+        self._ids: List[Optional[str]] = []
+        self._rows: Dict[str, int] = {}
+        self._centroids: Optional[np.ndarray] = None
+        self._cells: Optional[List[int]] = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    @staticmethod
+    def quantize(vectors: np.ndarray) -> np.ndarray:
+        return np.clip(np.rint(vectors * 127), -127, 127).astype(np.int8)
+
+    def add(self, item_id: str, vector: np.ndarray):
+        """Insert or replace one unit vector"""
+        with self._lock:
+            self._remove(item_id)
+            row = len(self._ids)
+            if row == len(self._vectors):
+                # Grow the buffer geometrically so adds stay amortized O(1)
+                grown = np.zeros((max(1024, row * 2), self.dims), dtype=np.int8)
+                grown[:row] = self._vectors
+                self._vectors = grown
+            self._vectors[row] = self.quantize(vector)
+            self._ids.append(item_id)
+            self._rows[item_id] = row
+            if self._centroids is not None:
+                self._cells.append(int(np.argmax(self._centroids @ vector)))
+        if self._centroids is None and len(self) >= self.ivf_min_vectors:
+            self.build_ivf()
+
+    def remove(self, item_id: str) -> bool:
+        with self._lock:
+            removed = self._remove(item_id)
+            # Compact once a quarter of the rows are tombstones
+            if len(self._ids) - len(self._rows) > max(1024, len(self._ids) // 4):
+                self._compact()
+        return removed
+
+    def _remove(self, item_id: str) -> bool:
+        row = self._rows.pop(item_id, None)
+        if row is None:
+            return False
+        self._ids[row] = None
+        return True
+
+    def _compact(self):
+        keep = [row for row, item_id in enumerate(self._ids) if item_id is not None]
+        self._vectors = self._vectors[keep]
+        self._ids = [self._ids[row] for row in keep]
+        self._rows = {item_id: row for row, item_id in enumerate(self._ids)}
+        if self._cells is not None:
+            self._cells = [self._cells[row] for row in keep]
+
+    def build_ivf(self, nlist: Optional[int] = None):
+        """Cluster the stored vectors into ~sqrt(n) cells for IVF search"""
+        with self._lock:
+            self._compact()
+            if not len(self._ids):
+                return
+            data = self._vectors[:len(self._ids)].astype(np.float32) / 127
+            nlist = nlist or max(1, int(np.sqrt(len(data))))
+            kmeans = MiniBatchKMeans(n_clusters=nlist, random_state=0, n_init=3).fit(data)
+            centroids = kmeans.cluster_centers_.astype(np.float32)
+            centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-9)
+            self._centroids = centroids
+            self._cells = kmeans.labels_.tolist()
+        logger.info(f"Built IVF index with {nlist} cells over {len(data)} vectors")
+
+    def search(self, query: np.ndarray, top_k: int = 10) -> List[Tuple[str, float]]:
+        """(item_id, cosine similarity) of the nearest stored vectors, best first"""
+        with self._lock:
+            if not self._rows:
+                return []
+            if self._centroids is not None:
+                probe = np.argsort(-(self._centroids @ query))[:self.nprobe]
+                candidates = np.flatnonzero(np.isin(np.asarray(self._cells), probe))
+            else:
+                candidates = np.arange(len(self._ids))
+
+            scores = np.empty(len(candidates), dtype=np.float32)
+            for start in range(0, len(candidates), 8192):
+                chunk = candidates[start:start + 8192]
+                scores[start:start + len(chunk)] = (self._vectors[chunk].astype(np.float32) @ query) / 127
+            order = np.argsort(-scores)
+
+            results = []
+            for position in order:
+                item_id = self._ids[candidates[position]]
+                if item_id is None:
+                    continue
+                results.append((item_id, round(float(scores[position]), 4)))
+                if len(results) >= top_k:
+                    break
+            return results
+
+    def save(self, path: str):
+        with self._lock:
+            self._compact()
+            np.savez_compressed(
+                path, vectors=self._vectors, ids=np.array(self._ids, dtype=object),
+                version=np.array(self.version or "")
+            )
+
+    def load(self, path: str) -> bool:
+        if not os.path.exists(path):
+            return False
+        data = np.load(path, allow_pickle=True)
+        with self._lock:
+            self._vectors = data['vectors']
+            self._ids = list(data['ids'])
+            self._rows = {item_id: row for row, item_id in enumerate(self._ids)}
+            self.version = str(data['version']) or None
+            self._centroids = self._cells = None
+        if len(self) >= self.ivf_min_vectors:
+            self.build_ivf()
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'vectors': len(self),
+            'bytes': int(len(self._ids) * self.dims),
+            'ivf_cells': 0 if self._centroids is None else len(self._centroids)
+        }
+
+
+def resume_spans(resume_data: Dict[str, Any]) -> List[str]:
+    """Resume sections and experience entries as separate spans"""
+    spans = [resume_data.get('summary') or '']
+    for entry in resume_data.get('experience', []) or []:
+        if isinstance(entry, dict):
+            spans.append(entry.get('description') or entry.get('raw_text') or '')
+    for section in resume_data.get('sections', []) or []:
+        if isinstance(section, dict) and section.get('type') not in ('contact', 'summary'):
+            spans.extend(part for part in re.split(r'\n\s*\n', section.get('content') or ''))
+    if resume_data.get('skills'):
+        spans.append(', '.join(resume_data['skills']))
+    spans = list(dict.fromkeys(s.strip() for s in spans if s and s.strip()))
+    return spans or [resume_data.get('raw_text') or '']
+
+
+def job_spans(job_analysis: Dict[str, Any]) -> List[str]:
+    """Requirement and responsibility bullets, else the title plus skills and keywords"""
+    requirements = job_analysis.get('requirements') or {}
+    spans = [*requirements.get('responsibilities', []), *requirements.get('qualifications', [])]
+    if not spans:
+        spans = [
+            job_analysis.get('job_title') or '',
+            ', '.join(job_analysis.get('required_skills', [])),
+            ' '.join(job_analysis.get('keywords', []))
+        ]
+    return [s for s in spans if s and s.strip()]
+
+
+# Shared encoder (loads SEMANTIC_MODEL_PATH when present)
+semantic_encoder = SemanticEncoder()
+
+
+def _read_corpus(paths: Iterable[str]) -> List[str]:
+    texts = []
+    for path in paths:
+        with open(path, encoding='utf-8', errors='ignore') as handle:
+            texts.extend(p.strip() for p in re.split(r'\n\s*\n', handle.read()) if p.strip())
+    return texts
+
+
+if __name__ == "__main__":
+    # Fit the LSA model offline: python -m services.semantic_index corpus1.txt corpus2.txt ...
+    logging.basicConfig(level=logging.INFO)
+    semantic_encoder.fit(_read_corpus(sys.argv[1:]))
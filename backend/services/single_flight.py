@@ -0,0 +1,87 @@
+from typing import Dict, Any, Awaitable, Callable, TypeVar
+import asyncio
+import hashlib
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Registry of in-flight calls so concurrent identical requests share one result
+
+    A call is cancelled once every caller waiting on it has been cancelled
+    (e.g. all their clients disconnected); until then it keeps running for
+    the callers that remain.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._waiters: Dict[str, int] = {}
+        self.metrics = {
+            'calls': 0,
+            'executions': 0,
+            'coalesced': 0,
+            'abandoned': 0
+        }
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """Hash the arguments that identify a call"""
+        payload = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """Await the in-flight call for key, starting it with fn if there is none"""
+        self.metrics['calls'] += 1
+
+        task = self._inflight.get(key)
+        if task is None:
+            self.metrics['executions'] += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+        else:
+            self.metrics['coalesced'] += 1
+
+        # Shield so one caller going away does not cancel the work others await
+        self._waiters[key] = self._waiters.get(key, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if self._waiters[key] == 1 and not task.done():
+                self.metrics['abandoned'] += 1
+                task.cancel()
+            raise
+        finally:
+            self._waiters[key] -= 1
+            if not self._waiters[key]:
+                del self._waiters[key]
+
+    def _finish(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled() and task.exception() is not None:
+            logger.debug(f"{self.name} call {key[:12]} failed: {task.exception()}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Call counts and the share of calls served by another caller's request"""
+        calls = self.metrics['calls']
+        return {
+            **self.metrics,
+            'in_flight': len(self._inflight),
+            'coalescing_ratio': round(self.metrics['coalesced'] / calls, 4) if calls else 0.0
+        }
+
+
+# Shared registries, one per kind of work
+llm_flights = SingleFlight("llm")
+analysis_flights = SingleFlight("job_analysis")
+
+
+def single_flight_stats() -> Dict[str, Any]:
+    """Stats for every shared registry"""
+    return {flight.name: flight.stats() for flight in (llm_flights, analysis_flights)}
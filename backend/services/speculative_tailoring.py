@@ -0,0 +1,179 @@
+from typing import Dict, Any, Optional
+from collections import OrderedDict
+from dataclasses import dataclass, field
+import asyncio
+import logging
+import os
+import time
+import uuid
+from services.job_analyzer import JobAnalyzer
+from services.ai_service import AIService
+from services.tailoring_jobs import TailoringJob, tailoring_jobs
+from services.llm_gateway import llm_priority, BACKGROUND
+from services.resilience import set_deadline
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CapturedJob:
+    """A job posting sent by the extension, with the work done for it ahead of time"""
+    job_id: str
+    user: str
+    posting: Dict[str, Any]
+    # received | analyzing | analyzed (no default resume) | queued | tailoring | complete | failed | cancelled
+    status: str = "received"
+    analysis: Optional[Dict[str, Any]] = None
+    assessment: Optional[Dict[str, Any]] = None
+    tailoring: Optional[TailoringJob] = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    task: Optional[asyncio.Task] = field(default=None, repr=False)
+
+    @property
+    def running(self) -> bool:
+        return self.task is not None and not self.task.done()
+
+
+class SpeculativeTailoring:
+    """Analyze and tailor captured jobs before the user asks
+
+    Job analysis (local) starts as soon as a posting is captured. When the
+    user has a default resume, heuristic scores follow and LLM tailoring is
+    started at background priority. At most max_per_user speculations run
+    per user (a new capture cancels that user's oldest) and max_concurrent
+    hold LLM work at once, so speculation cannot crowd out interactive calls.
+    """
+
+    def __init__(
+        self,
+        job_analyzer: Optional[JobAnalyzer] = None,
+        ai_service: Optional[AIService] = None,
+        max_per_user: Optional[int] = None,
+        max_concurrent: Optional[int] = None,
+        max_jobs: Optional[int] = None
+    ):
+        self.job_analyzer = job_analyzer or JobAnalyzer()
+        self.ai_service = ai_service or AIService()
+        self.max_per_user = max_per_user or int(os.getenv('SPECULATIVE_MAX_PER_USER', '2'))
+        self.max_concurrent = max_concurrent or int(os.getenv('SPECULATIVE_MAX_CONCURRENT', '2'))
+        self.max_jobs = max_jobs or int(os.getenv('SPECULATIVE_MAX_JOBS', '1000'))
+        self.deadline_seconds = float(os.getenv('SPECULATIVE_DEADLINE_SECONDS', '300'))
+
+        self._slots = asyncio.Semaphore(self.max_concurrent)
+        self._jobs: "OrderedDict[str, CapturedJob]" = OrderedDict()
+        self._default_resumes: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.metrics = {
+            'captured': 0,
+            'tailored': 0,
+            'cancelled': 0,
+            'superseded': 0,
+            'without_resume': 0
+        }
+
+    def set_default_resume(self, user: str, resume_data: Dict[str, Any]):
+        self._default_resumes[user] = resume_data
+        self._default_resumes.move_to_end(user)
+        while len(self._default_resumes) > self.max_jobs:
+            self._default_resumes.popitem(last=False)
+
+    def default_resume(self, user: str) -> Optional[Dict[str, Any]]:
+        return self._default_resumes.get(user)
+
+    def capture(self, user: str, posting: Dict[str, Any]) -> CapturedJob:
+        """Store the posting and start working on it in the background"""
+        self._evict()
+        self.metrics['captured'] += 1
+
+        # The newest capture is the one the user is about to open
+        running = [job for job in self._jobs.values() if job.user == user and job.running]
+        for job in running[:max(0, len(running) - self.max_per_user + 1)]:
+            self.metrics['superseded'] += 1
+            self._cancel(job, "superseded by a newer capture")
+
+        job = CapturedJob(job_id=uuid.uuid4().hex, user=user, posting=posting)
+        self._jobs[job.job_id] = job
+        job.task = asyncio.ensure_future(self._run(job, self.default_resume(user)))
+        return job
+
+    async def _run(self, job: CapturedJob, resume_data: Optional[Dict[str, Any]]):
+        # Not bound by the capturing request's deadline
+        set_deadline(self.deadline_seconds)
+        try:
+            job.status = "analyzing"
+            job.analysis = await self.job_analyzer.analyze_job_posting(
+                title=job.posting.get('title') or '',
+                company=job.posting.get('company') or '',
+                description=job.posting.get('description') or '',
+                location=job.posting.get('location')
+            )
+            if resume_data is None:
+                self.metrics['without_resume'] += 1
+                job.status = "analyzed"
+                return
+
+            job.assessment = self.ai_service.heuristic_assessment(resume_data, job.analysis)
+            job.status = "queued"
+            async with self._slots:
+                job.status = "tailoring"
+                with llm_priority(BACKGROUND):
+                    job.tailoring = tailoring_jobs.start(job.user, self.ai_service.stream_tailoring_suggestions(
+                        resume_data=resume_data,
+                        job_analysis=job.analysis
+                    ))
+                # Cancelling this task cancels the tailoring task it awaits
+                await job.tailoring.task
+            job.status = job.tailoring.status
+            job.error = job.tailoring.error
+            self.metrics['tailored'] += 1
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+            raise
+        except Exception as e:
+            logger.error(f"Speculative tailoring for job {job.job_id} failed: {str(e)}")
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+
+    def get(self, user: str, job_id: str) -> Optional[CapturedJob]:
+        """The user's captured job; None if unknown or not theirs"""
+        job = self._jobs.get(job_id)
+        if job is None or job.user != user:
+            return None
+        return job
+
+    def cancel(self, user: str, job_id: str) -> bool:
+        """Stop any work still running for the user's job; False if it is unknown, not theirs or already finished"""
+        job = self.get(user, job_id)
+        if job is None or not job.running:
+            return False
+        self._cancel(job, "cancelled")
+        return True
+
+    def _cancel(self, job: CapturedJob, reason: str):
+        self.metrics['cancelled'] += 1
+        job.error = reason
+        job.task.cancel()
+        # Also covers a task cancelled before it started running
+        job.status = "cancelled"
+        job.finished_at = time.time()
+
+    def _evict(self):
+        # Over capacity: drop the oldest finished jobs, never running ones
+        for job_id in list(self._jobs):
+            if len(self._jobs) < self.max_jobs:
+                break
+            if not self._jobs[job_id].running:
+                del self._jobs[job_id]
+
+    def stats(self) -> Dict[str, Any]:
+        counts: Dict[str, int] = {}
+        for job in self._jobs.values():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {**self.metrics, 'jobs': counts, 'default_resumes': len(self._default_resumes)}
+
+
+# Shared by the extension's /api/job endpoints
+speculative_tailoring = SpeculativeTailoring()
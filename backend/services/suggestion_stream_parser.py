@@ -0,0 +1,84 @@
+from typing import Dict, Any, List, Optional
+import json
+import logging
+from pydantic import ValidationError
+from models.schemas import TailoringSuggestion
+
+logger = logging.getLogger(__name__)
+
+
+class SuggestionStreamParser:
+    """Incrementally extract tailoring suggestions from a streamed JSON completion
+
+    Text is fed in chunks as it arrives. Every JSON object that closes and
+    carries a "section" field is validated as a TailoringSuggestion and
+    returned immediately, whether the model wraps the objects in an array,
+    an outer object or a ```json fence.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._scan_pos = 0
+        self._in_string = False
+        self._escaped = False
+        # Each frame: [start offset in buffer, whether a nested suggestion was emitted]
+        self._stack: List[list] = []
+        self.emitted = 0
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """Consume a chunk and return the suggestions completed by it"""
+        self._buffer += chunk
+        completed = []
+
+        i = self._scan_pos
+        while i < len(self._buffer):
+            char = self._buffer[i]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                # Strings only matter inside an object; stray quotes in prose are ignored
+                self._in_string = bool(self._stack)
+            elif char == '{':
+                self._stack.append([i, False])
+            elif char == '}' and self._stack:
+                start, has_child = self._stack.pop()
+                suggestion = None if has_child else self._parse_object(self._buffer[start:i + 1])
+                if suggestion is not None:
+                    completed.append(suggestion)
+                if (suggestion is not None or has_child) and self._stack:
+                    self._stack[-1][1] = True
+            i += 1
+
+        # Drop text that can no longer be part of an open object
+        if self._stack:
+            offset = self._stack[0][0]
+            for frame in self._stack:
+                frame[0] -= offset
+            self._buffer = self._buffer[offset:]
+            self._scan_pos = len(self._buffer)
+        else:
+            self._buffer = ""
+            self._scan_pos = 0
+
+        self.emitted += len(completed)
+        return completed
+
+    def _parse_object(self, text: str) -> Optional[Dict[str, Any]]:
+        """Validate one closed object as a suggestion, or return None"""
+        try:
+            data = json.loads(text)
+        except json.JSONDecodeError:
+            return None
+        if not isinstance(data, dict) or 'section' not in data:
+            return None
+
+        try:
+            return TailoringSuggestion(**data).model_dump()
+        except ValidationError as e:
+            logger.debug(f"Skipping malformed streamed suggestion: {str(e)}")
+            return None
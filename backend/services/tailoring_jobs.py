@@ -0,0 +1,155 @@
+from typing import Dict, Any, List, AsyncIterator, Optional
+from collections import OrderedDict
+from dataclasses import dataclass, field
+import asyncio
+import logging
+import os
+import time
+import uuid
+from services.resilience import set_deadline
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class TailoringJob:
+    """LLM enrichment running in the background after the instant response"""
+    job_id: str
+    user: str
+    status: str = "pending"  # pending | complete | failed
+    events: List[Dict[str, Any]] = field(default_factory=list)
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    task: Optional[asyncio.Task] = field(default=None, repr=False)
+    changed: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+    @property
+    def suggestions(self) -> List[Dict[str, Any]]:
+        return [e["suggestion"] for e in self.events if e["type"] == "suggestion"]
+
+    @property
+    def result(self) -> Optional[Dict[str, Any]]:
+        """Payload of the final done event, once there is one"""
+        for event in reversed(self.events):
+            if event["type"] == "done":
+                return {k: v for k, v in event.items() if k != "type"}
+        return None
+
+
+class TailoringJobStore:
+    """Runs enrichment event streams in the background and keeps their events
+    for polling or for (re)attaching an SSE stream
+
+    Jobs belong to the user who started them. At most max_pending_per_user
+    run per user; starting another cancels that user's oldest.
+    """
+
+    def __init__(
+        self,
+        max_jobs: Optional[int] = None,
+        ttl_seconds: Optional[int] = None,
+        deadline_seconds: Optional[float] = None,
+        max_pending_per_user: Optional[int] = None
+    ):
+        self.max_jobs = max_jobs or int(os.getenv('TAILORING_MAX_JOBS', '500'))
+        self.ttl_seconds = ttl_seconds or int(os.getenv('TAILORING_JOB_TTL_SECONDS', '900'))
+        self.deadline_seconds = deadline_seconds or float(os.getenv('TAILORING_JOB_DEADLINE_SECONDS', '300'))
+        self.max_pending_per_user = max_pending_per_user or int(os.getenv('TAILORING_MAX_PENDING_PER_USER', '3'))
+        self._jobs: "OrderedDict[str, TailoringJob]" = OrderedDict()
+        self.metrics = {'superseded': 0}
+
+    def start(self, user: str, events: AsyncIterator[Dict[str, Any]]) -> TailoringJob:
+        """Consume the event iterator in a background task owned by user"""
+        self._evict()
+        pending = [job for job in self._jobs.values() if job.user == user and job.status == "pending"]
+        for job in pending[:max(0, len(pending) - self.max_pending_per_user + 1)]:
+            self._supersede(job)
+        job = TailoringJob(job_id=uuid.uuid4().hex, user=user)
+        self._jobs[job.job_id] = job
+        job.task = asyncio.ensure_future(self._run(job, events))
+        return job
+
+    async def _run(self, job: TailoringJob, events: AsyncIterator[Dict[str, Any]]):
+        # Not bound by the deadline of the request that started the job
+        set_deadline(self.deadline_seconds)
+        try:
+            async for event in events:
+                self._publish(job, event)
+            job.status = "complete"
+        except asyncio.CancelledError:
+            job.status = "failed"
+            job.error = job.error or "cancelled"
+            raise
+        except Exception as e:
+            logger.error(f"Tailoring job {job.job_id} failed: {str(e)}")
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+            self._notify(job)
+
+    def _publish(self, job: TailoringJob, event: Dict[str, Any]):
+        job.events.append(event)
+        self._notify(job)
+
+    def _notify(self, job: TailoringJob):
+        # Wake current followers; later waits use a fresh event
+        job.changed.set()
+        job.changed = asyncio.Event()
+
+    def get(self, user: str, job_id: str) -> Optional[TailoringJob]:
+        """The user's job; None if unknown, expired or not theirs"""
+        job = self._jobs.get(job_id)
+        if job is not None and self._expired(job):
+            del self._jobs[job_id]
+            return None
+        if job is None or job.user != user:
+            return None
+        return job
+
+    def _supersede(self, job: TailoringJob):
+        self.metrics['superseded'] += 1
+        job.error = "superseded by a newer tailoring job"
+        job.task.cancel()
+        # Also covers a task cancelled before it started running
+        job.status = "failed"
+        job.finished_at = time.time()
+        self._notify(job)
+
+    async def follow(self, job: TailoringJob) -> AsyncIterator[Dict[str, Any]]:
+        """Replay the job's events so far, then yield new ones until it finishes"""
+        position = 0
+        while True:
+            changed = job.changed
+            while position < len(job.events):
+                yield dict(job.events[position])
+                position += 1
+            if job.status != "pending":
+                break
+            await changed.wait()
+        if job.status == "failed":
+            yield {"type": "error", "detail": job.error}
+
+    def _expired(self, job: TailoringJob) -> bool:
+        return job.finished_at is not None and time.time() - job.finished_at > self.ttl_seconds
+
+    def _evict(self):
+        for job_id in [jid for jid, job in self._jobs.items() if self._expired(job)]:
+            del self._jobs[job_id]
+        # Over capacity: drop the oldest finished jobs, never running ones
+        for job_id in list(self._jobs):
+            if len(self._jobs) < self.max_jobs:
+                break
+            if self._jobs[job_id].status != "pending":
+                del self._jobs[job_id]
+
+    def stats(self) -> Dict[str, Any]:
+        counts = {'pending': 0, 'complete': 0, 'failed': 0}
+        for job in self._jobs.values():
+            counts[job.status] += 1
+        return {**counts, **self.metrics}
+
+
+# Shared store for /api/tailor-resume/quick enrichment jobs
+tailoring_jobs = TailoringJobStore()
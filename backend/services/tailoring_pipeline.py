@@ -0,0 +1,266 @@
+from typing import Dict, Any, List, AsyncIterator, Optional
+from collections import deque
+from dataclasses import dataclass, field
+import asyncio
+import logging
+import os
+import time
+from services.resume_parser import ResumeParser
+from services.job_analyzer import JobAnalyzer
+from services.ai_service import AIService
+
+logger = logging.getLogger(__name__)
+
+# parse_resume and analyze_job do not depend on each other; suggestions needs both
+STAGES = ('parse_resume', 'analyze_job', 'suggestions')
+
+
+@dataclass
+class PipelineRun:
+    """Inputs of one tailoring request and what its stages have produced so far
+
+    A run created with resume already set (a stored resume) skips parsing.
+    """
+    resume_content: bytes
+    filename: str
+    job: Dict[str, Any]
+    resume: Optional[Dict[str, Any]] = None
+    job_analysis: Optional[Dict[str, Any]] = None
+    stage_times: Dict[str, float] = field(default_factory=dict)  # seconds per finished stage
+    started: float = field(default_factory=time.perf_counter)
+
+    @property
+    def processing_time(self) -> float:
+        return round(time.perf_counter() - self.started, 4)
+
+
+class TailoringPipeline:
+    """Run the stages of a tailoring request, overlapping the independent ones
+
+    Resume parsing (on the parser's thread pool) and job analysis run
+    concurrently; LLM suggestions start once both are done. Each finished
+    stage is reported as a "stage" event with its processing_time, so
+    callers can show progress while later stages are still running.
+
+    Batches tailor one resume to many jobs: the resume is parsed once and
+    the LLM stage of all batches shares batch_concurrency slots.
+    """
+
+    def __init__(
+        self,
+        resume_parser: Optional[ResumeParser] = None,
+        job_analyzer: Optional[JobAnalyzer] = None,
+        ai_service: Optional[AIService] = None,
+        batch_concurrency: Optional[int] = None
+    ):
+        self.resume_parser = resume_parser or ResumeParser()
+        self.job_analyzer = job_analyzer or JobAnalyzer()
+        self.ai_service = ai_service or AIService()
+        self.batch_concurrency = batch_concurrency or int(os.getenv('BATCH_LLM_CONCURRENCY', '4'))
+        self._batch_slots = asyncio.Semaphore(self.batch_concurrency)
+        self._stage_seconds = {stage: deque(maxlen=500) for stage in STAGES}
+        self.metrics = {
+            'runs': 0,
+            'failed': 0,
+            'batches': 0,
+            'batch_jobs': 0,
+            'batch_job_errors': 0
+        }
+
+    async def prepare(self, run: PipelineRun) -> AsyncIterator[Dict[str, Any]]:
+        """Parse the resume and analyze the job concurrently, filling run.resume and run.job_analysis
+
+        Yields a stage event as each of the two finishes. If either fails, the
+        other is cancelled and the error is raised.
+        """
+        self.metrics['runs'] += 1
+        tasks = {
+            asyncio.ensure_future(self._timed(run, 'analyze_job', self.job_analyzer.analyze_job_posting(
+                title=run.job.get('title') or '',
+                company=run.job.get('company') or '',
+                description=run.job.get('description') or '',
+                location=run.job.get('location')
+            ))): 'analyze_job'
+        }
+        if run.resume is None:
+            tasks[asyncio.ensure_future(self._timed(run, 'parse_resume', self.resume_parser.parse_resume(
+                run.resume_content, run.filename
+            )))] = 'parse_resume'
+        pending = set(tasks)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    result = task.result()
+                    stage = tasks[task]
+                    if stage == 'parse_resume':
+                        run.resume = result
+                    else:
+                        run.job_analysis = result
+                    yield self._stage_event(run, stage)
+        except Exception:
+            self.metrics['failed'] += 1
+            raise
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+    async def events(self, run: PipelineRun, mode: str = "single") -> AsyncIterator[Dict[str, Any]]:
+        """Stage events, then a final "result" event carrying the suggestions and stage timings"""
+        async for event in self.prepare(run):
+            yield event
+
+        try:
+            suggestions = await self._timed(run, 'suggestions', self.ai_service.generate_tailoring_suggestions(
+                resume_data=run.resume,
+                job_analysis=run.job_analysis,
+                mode=mode
+            ))
+        except Exception:
+            self.metrics['failed'] += 1
+            raise
+        yield self._stage_event(run, 'suggestions')
+        yield {
+            "type": "result",
+            **suggestions,
+            "stage_times": dict(run.stage_times),
+            "processing_time": run.processing_time
+        }
+
+    async def stream(self, run: PipelineRun) -> AsyncIterator[Dict[str, Any]]:
+        """Stage events, then suggestion events as the LLM produces them
+
+        The final "done" event also carries the stage timings.
+        """
+        async for event in self.prepare(run):
+            yield event
+
+        started = time.perf_counter()
+        async for event in self.ai_service.stream_tailoring_suggestions(
+            resume_data=run.resume,
+            job_analysis=run.job_analysis
+        ):
+            if event["type"] == "done":
+                self._record(run, 'suggestions', time.perf_counter() - started)
+                yield self._stage_event(run, 'suggestions')
+                event = {**event, "stage_times": dict(run.stage_times), "processing_time": run.processing_time}
+            yield event
+
+    async def tailor(self, run: PipelineRun, mode: str = "single") -> Dict[str, Any]:
+        """Run every stage and return the result event's payload"""
+        result = {}
+        async for event in self.events(run, mode=mode):
+            if event["type"] == "result":
+                result = {k: v for k, v in event.items() if k != "type"}
+        return result
+
+    async def batch(
+        self,
+        parsing: PipelineRun,
+        jobs: List[Dict[str, Any]],
+        mode: str = "single"
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Tailor the run's resume to many jobs, yielding each job's result as soon as it is ready
+
+        Yields a parse_resume stage event (unless the resume was already
+        parsed), then a "job" event (or "job_error" for a job that failed)
+        per job in completion order, each carrying the job's index in the
+        request, and finally a "done" summary.
+        """
+        self.metrics['batches'] += 1
+        self.metrics['batch_jobs'] += len(jobs)
+        started = time.perf_counter()
+        if parsing.resume is None:
+            parse_task = asyncio.ensure_future(self._timed(parsing, 'parse_resume', self.resume_parser.parse_resume(
+                parsing.resume_content, parsing.filename
+            )))
+        else:
+            parse_task = asyncio.ensure_future(asyncio.sleep(0, parsing.resume))
+        # Job analysis does not need the resume, so it starts alongside the parse
+        job_tasks = [
+            asyncio.ensure_future(self._batch_job(index, job, parse_task, mode))
+            for index, job in enumerate(jobs)
+        ]
+        try:
+            await parse_task
+            if 'parse_resume' in parsing.stage_times:
+                yield self._stage_event(parsing, 'parse_resume')
+
+            failed = 0
+            for next_result in asyncio.as_completed(job_tasks):
+                event = await next_result
+                if event["type"] == "job_error":
+                    failed += 1
+                yield event
+            yield {
+                "type": "done",
+                "jobs": len(jobs),
+                "failed": failed,
+                "parse_time": parsing.stage_times.get('parse_resume'),
+                "processing_time": round(time.perf_counter() - started, 4)
+            }
+        finally:
+            pending = [task for task in [parse_task, *job_tasks] if not task.done()]
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+    async def _batch_job(self, index: int, job: Dict[str, Any], parse_task: asyncio.Task, mode: str) -> Dict[str, Any]:
+        run = PipelineRun(b"", "", job)
+        try:
+            run.job_analysis = await self._timed(run, 'analyze_job', self.job_analyzer.analyze_job_posting(
+                title=job.get('title') or '',
+                company=job.get('company') or '',
+                description=job.get('description') or '',
+                location=job.get('location')
+            ))
+            # Shielded: one job being cancelled must not cancel the shared parse
+            run.resume = await asyncio.shield(parse_task)
+            async with self._batch_slots:
+                suggestions = await self._timed(run, 'suggestions', self.ai_service.generate_tailoring_suggestions(
+                    resume_data=run.resume,
+                    job_analysis=run.job_analysis,
+                    mode=mode
+                ))
+        except Exception as e:
+            logger.error(f"Batch tailoring for job {index} failed: {str(e)}")
+            self.metrics['batch_job_errors'] += 1
+            return {"type": "job_error", "index": index, "title": job.get('title'), "detail": str(e)}
+
+        return {
+            "type": "job",
+            "index": index,
+            "title": job.get('title'),
+            "company": job.get('company'),
+            "url": job.get('url'),
+            **suggestions,
+            "stage_times": dict(run.stage_times),
+            "processing_time": run.processing_time
+        }
+
+    async def _timed(self, run: PipelineRun, stage: str, work):
+        started = time.perf_counter()
+        result = await work
+        self._record(run, stage, time.perf_counter() - started)
+        return result
+
+    def _record(self, run: PipelineRun, stage: str, seconds: float):
+        run.stage_times[stage] = round(seconds, 4)
+        self._stage_seconds[stage].append(seconds)
+
+    def _stage_event(self, run: PipelineRun, stage: str) -> Dict[str, Any]:
+        return {"type": "stage", "stage": stage, "processing_time": run.stage_times[stage]}
+
+    def stats(self) -> Dict[str, Any]:
+        stages = {}
+        for stage, samples in self._stage_seconds.items():
+            ordered = sorted(samples)
+            stages[stage] = {
+                'count': len(ordered),
+                'p50_ms': round(ordered[len(ordered) // 2] * 1000, 1) if ordered else None,
+                'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 1) if ordered else None
+            }
+        return {**self.metrics, 'batch_concurrency': self.batch_concurrency, 'stages': stages}
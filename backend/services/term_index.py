@@ -0,0 +1,148 @@
+from typing import Dict, Any, Iterable, List, Optional, Set
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from functools import lru_cache
+import hashlib
+import logging
+import os
+import re
+from services.keyword_extractor import KeywordExtractor
+
+logger = logging.getLogger(__name__)
+
+# Longest phrase (in words) answered from the n-gram set; longer ones fall back to a scan
+MAX_NGRAM = 3
+
+# Words with inner . / - stay whole ("node.js", "ci/cd") so skills keep their spelling
+_TOKEN_PATTERN = re.compile(r"[a-z0-9+#]+(?:[./-][a-z0-9+#]+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens in document order"""
+    return [normalize_token(t) for t in _TOKEN_PATTERN.findall((text or "").lower())]
+
+
+@lru_cache(maxsize=65536)
+def normalize_token(token: str) -> str:
+    """Fold a plain English plural onto its singular ("apis" -> "api")"""
+    if len(token) > 3 and token.isalpha() and token.endswith('s') and not token.endswith('ss'):
+        return token[:-1]
+    return token
+
+
+def text_terms(text: str) -> List[str]:
+    """Tokens, parts of slash/hyphen compounds ("python/django") and 2..MAX_NGRAM-grams"""
+    return sequence_terms(tokenize(text))
+
+
+def sequence_terms(sequence: List[str], phrase_starts: Optional[Set[str]] = None) -> List[str]:
+    """text_terms for an already tokenized text
+
+    With phrase_starts, only n-grams beginning with one of those words are
+    built (enough when the caller looks up a fixed phrase vocabulary).
+    """
+    terms = list(sequence)
+    for token in sequence:
+        if '/' in token or '-' in token:
+            terms.extend(normalize_token(part) for part in re.split(r"[/-]", token) if part)
+    for start in range(len(sequence) - 1):
+        if phrase_starts is not None and sequence[start] not in phrase_starts:
+            continue
+        for n in range(2, min(MAX_NGRAM, len(sequence) - start) + 1):
+            terms.append(" ".join(sequence[start:start + n]))
+    return terms
+
+
+@dataclass
+class ResumeTermIndex:
+    """Hash-lookup view of a resume's text: word tokens, word n-grams, skill ids"""
+    tokens: Set[str] = field(default_factory=set)
+    ngrams: Set[str] = field(default_factory=set)
+    skill_ids: Set[str] = field(default_factory=set)
+    text: str = ""  # normalized token stream, for phrases longer than MAX_NGRAM
+
+    def contains(self, phrase: str) -> bool:
+        """Whole-word match of a keyword or phrase ("go" does not match "google")"""
+        words = tokenize(phrase)
+        if not words:
+            return False
+        if len(words) == 1:
+            return words[0] in self.tokens
+        joined = " ".join(words)
+        if len(words) <= MAX_NGRAM:
+            return joined in self.ngrams
+        return f" {joined} " in f" {self.text} "
+
+
+class TermIndexer:
+    """Builds ResumeTermIndex objects and keeps recent ones per resume text"""
+
+    def __init__(self, keyword_extractor: Optional[KeywordExtractor] = None, max_entries: Optional[int] = None):
+        keyword_extractor = keyword_extractor or KeywordExtractor()
+        self.max_entries = max_entries or int(os.getenv('TERM_INDEX_CACHE_SIZE', '256'))
+        self._cache: "OrderedDict[str, ResumeTermIndex]" = OrderedDict()
+
+        # Every known spelling of a skill -> its canonical id ("react" -> "react.js")
+        self.skill_aliases: Dict[str, str] = {}
+        for main_skill, variations in keyword_extractor.skill_variations.items():
+            self.skill_aliases[self._phrase_key(main_skill)] = main_skill.lower()
+            for variation in variations:
+                self.skill_aliases.setdefault(self._phrase_key(variation), main_skill.lower())
+        for skill in keyword_extractor.all_tech_skills:
+            self.skill_aliases.setdefault(self._phrase_key(skill), skill.lower())
+
+    @staticmethod
+    def _phrase_key(phrase: str) -> str:
+        return " ".join(tokenize(phrase))
+
+    def skill_id(self, skill: str) -> str:
+        """Canonical id of a skill name; unknown skills map to their normalized text"""
+        key = self._phrase_key(skill)
+        return self.skill_aliases.get(key, key)
+
+    def build(self, text: str, skills: Iterable[str] = ()) -> ResumeTermIndex:
+        """Index resume text once: tokens, 1..MAX_NGRAM-grams and the skills they name"""
+        index = ResumeTermIndex(text=" ".join(tokenize(text)))
+        for term in text_terms(text):
+            (index.ngrams if " " in term else index.tokens).add(term)
+
+        for term in index.tokens | index.ngrams:
+            skill = self.skill_aliases.get(term)
+            if skill:
+                index.skill_ids.add(skill)
+        index.skill_ids.update(self.skill_id(skill) for skill in skills if skill)
+        return index
+
+    def index_for(self, resume_data: Dict[str, Any]) -> ResumeTermIndex:
+        """Index of a parsed resume, built on first use and reused for repeat scoring"""
+        key = self._cache_key(resume_data)
+        index = self._cache.get(key)
+        if index is not None:
+            self._cache.move_to_end(key)
+            return index
+
+        index = self.build(resume_data.get('raw_text', '') or '', resume_data.get('skills', []) or [])
+        self.remember(resume_data, index, key)
+        return index
+
+    def remember(self, resume_data: Dict[str, Any], index: ResumeTermIndex, key: Optional[str] = None):
+        """Cache an index built earlier (e.g. loaded from the resume store) for this resume"""
+        key = key or self._cache_key(resume_data)
+        self._cache[key] = index
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+    @staticmethod
+    def _cache_key(resume_data: Dict[str, Any]) -> str:
+        text = resume_data.get('raw_text', '') or ''
+        skills = resume_data.get('skills', []) or []
+        return hashlib.sha1("\x00".join([text, *skills]).encode('utf-8')).hexdigest()
+
+    def has_skill(self, index: ResumeTermIndex, skill: str) -> bool:
+        """Skill present under any known spelling, or as a plain phrase"""
+        return self.skill_id(skill) in index.skill_ids or index.contains(skill)
+
+
+# Shared indexer: the resume parser warms it, the scorers read from it
+term_indexer = TermIndexer()
@@ -0,0 +1,205 @@
+from fastapi import Request
+from contextvars import ContextVar
+from typing import Dict, Any, List, Optional
+import atexit
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Caller identity for usage attribution (the API has no auth layer of its own)
+USER_HEADER = "X-User-Id"
+
+_endpoint: ContextVar[Optional[str]] = ContextVar("usage_endpoint", default=None)
+_user: ContextVar[Optional[str]] = ContextVar("usage_user", default=None)
+
+# USD per 1K tokens (prompt, completion); override with LLM_PRICES_JSON
+MODEL_PRICES = {
+    'gpt-4': (0.03, 0.06),
+    'gpt-4-turbo-preview': (0.01, 0.03),
+    'gpt-3.5-turbo': (0.0005, 0.0015),
+    'claude-3-sonnet-20240229': (0.003, 0.015),
+    'claude-3-haiku-20240307': (0.00025, 0.00125)
+}
+
+GROUP_COLUMNS = ('endpoint', 'user_id', 'model', 'provider', 'source')
+
+
+async def usage_context(request: Request):
+    """Request dependency: attribute this request's LLM calls to its route and user"""
+    route = request.scope.get("route")
+    path = getattr(route, "path", request.url.path)
+    _endpoint.set(f"{request.method} {path}")
+    _user.set(request.headers.get(USER_HEADER) or "anonymous")
+
+
+def current_user() -> str:
+    return _user.get() or "anonymous"
+
+
+class UsageLedger:
+    """Per-call LLM usage records: aggregated in memory, flushed to SQLite in batches"""
+
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        flush_size: Optional[int] = None,
+        flush_seconds: Optional[float] = None
+    ):
+        self.db_path = db_path or os.getenv('LLM_USAGE_DB', 'llm_usage.sqlite3')
+        self.flush_size = flush_size or int(os.getenv('LLM_USAGE_FLUSH_SIZE', '100'))
+        self.flush_seconds = flush_seconds or float(os.getenv('LLM_USAGE_FLUSH_SECONDS', '10'))
+        self.prices = dict(MODEL_PRICES)
+        if os.getenv('LLM_PRICES_JSON'):
+            self.prices.update({k: tuple(v) for k, v in json.loads(os.getenv('LLM_PRICES_JSON')).items()})
+
+        self._pending: List[tuple] = []
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        # (endpoint, model) -> running totals since start-up
+        self._totals: Dict[tuple, Dict[str, float]] = {}
+        atexit.register(self.flush)
+
+    def cost(self, model: str, prompt_tokens: int, completion_tokens: int) -> float:
+        prompt_price, completion_price = self.prices.get(model, (0.0, 0.0))
+        return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1000
+
+    def record(
+        self,
+        model: str,
+        provider: str,
+        usage: Optional[Dict[str, Any]],
+        latency_ms: float,
+        cached: bool = False,
+        source: str = "api"
+    ):
+        """Record one LLM call; cache hits cost nothing and are recorded with zero tokens"""
+        usage = usage or {}
+        prompt_tokens = 0 if cached else int(usage.get('prompt_tokens') or 0)
+        completion_tokens = 0 if cached else int(usage.get('completion_tokens') or 0)
+        cost = self.cost(model, prompt_tokens, completion_tokens)
+        endpoint = _endpoint.get() or source
+
+        with self._lock:
+            self._pending.append((
+                time.time(), endpoint, current_user(), model, provider, source,
+                prompt_tokens, completion_tokens, round(latency_ms, 1), int(cached), cost
+            ))
+            totals = self._totals.setdefault((endpoint, model), {
+                'calls': 0, 'cached_calls': 0, 'prompt_tokens': 0,
+                'completion_tokens': 0, 'latency_ms': 0.0, 'cost_usd': 0.0
+            })
+            totals['calls'] += 1
+            totals['cached_calls'] += int(cached)
+            totals['prompt_tokens'] += prompt_tokens
+            totals['completion_tokens'] += completion_tokens
+            totals['latency_ms'] += latency_ms
+            totals['cost_usd'] += cost
+            due = (
+                len(self._pending) >= self.flush_size
+                or time.monotonic() - self._last_flush >= self.flush_seconds
+            )
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Write pending records in one transaction"""
+        with self._lock:
+            batch, self._pending = self._pending, []
+            self._last_flush = time.monotonic()
+            if not batch:
+                return
+            try:
+                conn = self._connection()
+                conn.executemany(
+                    "INSERT INTO llm_usage (ts, endpoint, user_id, model, provider, source, "
+                    "prompt_tokens, completion_tokens, latency_ms, cached, cost_usd) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    batch
+                )
+                conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"Usage ledger flush failed ({len(batch)} records dropped): {str(e)}")
+
+    def query(
+        self,
+        group_by: List[str],
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        filters: Optional[Dict[str, str]] = None
+    ) -> List[Dict[str, Any]]:
+        """Aggregate stored usage grouped by any of endpoint, user_id, model, provider, source"""
+        group_by = [column for column in group_by if column in GROUP_COLUMNS]
+        conditions, params = [], []
+        if since is not None:
+            conditions.append("ts >= ?")
+            params.append(since)
+        if until is not None:
+            conditions.append("ts < ?")
+            params.append(until)
+        for column, value in (filters or {}).items():
+            if column in GROUP_COLUMNS and value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+
+        select = ", ".join(group_by + [
+            "COUNT(*) AS calls",
+            "SUM(cached) AS cached_calls",
+            "SUM(prompt_tokens) AS prompt_tokens",
+            "SUM(completion_tokens) AS completion_tokens",
+            "ROUND(AVG(latency_ms), 1) AS avg_latency_ms",
+            "ROUND(SUM(cost_usd), 6) AS cost_usd"
+        ])
+        sql = f"SELECT {select} FROM llm_usage"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        if group_by:
+            sql += " GROUP BY " + ", ".join(group_by)
+        sql += " ORDER BY cost_usd DESC"
+
+        self.flush()
+        with self._lock:
+            cursor = self._connection().execute(sql, params)
+            names = [d[0] for d in cursor.description]
+            return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+    def _connection(self) -> sqlite3.Connection:
+        """Open the ledger lazily so importing the module stays cheap"""
+        if self._conn is None:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.executescript(
+                "CREATE TABLE IF NOT EXISTS llm_usage ("
+                "ts REAL NOT NULL, endpoint TEXT, user_id TEXT, model TEXT, provider TEXT, source TEXT, "
+                "prompt_tokens INTEGER NOT NULL, completion_tokens INTEGER NOT NULL, "
+                "latency_ms REAL NOT NULL, cached INTEGER NOT NULL, cost_usd REAL NOT NULL);"
+                "CREATE INDEX IF NOT EXISTS llm_usage_ts ON llm_usage (ts);"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def stats(self) -> Dict[str, Any]:
+        """In-memory totals since start-up, per endpoint and model"""
+        with self._lock:
+            return {
+                'pending_records': len(self._pending),
+                'by_endpoint_model': [
+                    {
+                        'endpoint': endpoint,
+                        'model': model,
+                        **{k: round(v, 6) if isinstance(v, float) else v for k, v in totals.items()}
+                    }
+                    for (endpoint, model), totals in self._totals.items()
+                ]
+            }
+
+
+# Shared ledger for every LLM call site
+usage_ledger = UsageLedger()
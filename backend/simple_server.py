@@ -1,15 +1,20 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 import uvicorn
-import openai
 import os
 from dotenv import load_dotenv
+from services.llm_streaming import stream_chat_completion, sse_response
+from services.llm_providers import get_provider, get_latency_critical_provider
+from services.resilience import request_deadline
+from services.usage_ledger import usage_context
+from services.llm_gateway import llm_gateway, INTERACTIVE
+from services.model_router import model_router
 
 load_dotenv()
 
-app = FastAPI(title="Resume Tailor API", version="1.0.0")
+app = FastAPI(title="Resume Tailor API", version="1.0.0", dependencies=[Depends(request_deadline), Depends(usage_context)])
 
 # Configure CORS
 app.add_middleware(
@@ -20,8 +25,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# OpenAI setup
-openai.api_key = os.getenv("OPENAI_API_KEY")
+# LLM setup (LLM_PROVIDER selects openai, anthropic or mock)
+llm_provider = get_provider()
+
+MISSING_KEY_MESSAGE = "OpenAI API key not configured. Please add OPENAI_API_KEY to your environment variables."
 
 class JobAnalysisRequest(BaseModel):
     jobData: Dict[str, Any]
@@ -64,18 +71,22 @@ async def analyze_job(request: JobAnalysisRequest):
         Format as JSON with clear sections.
         """
         
-        if openai.api_key:
-            response = openai.ChatCompletion.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are a professional resume advisor that analyzes job postings."},
-                    {"role": "user", "content": prompt}
-                ],
+        if llm_provider.is_configured():
+            messages = [
+                {"role": "system", "content": "You are a professional resume advisor that analyzes job postings."},
+                {"role": "user", "content": prompt}
+            ]
+            response = await llm_gateway.complete(
+                llm_provider,
+                messages,
+                model=model_router.route("job_analysis", messages, llm_provider),
                 max_tokens=1000,
-                temperature=0.7
+                temperature=0.7,
+                source="simple_server",
+                task="job_analysis"
             )
             
-            analysis_result = response.choices[0].message.content
+            analysis_result = response["content"]
         else:
             # Fallback analysis without OpenAI
             analysis_result = {
@@ -97,10 +108,8 @@ async def analyze_job(request: JobAnalysisRequest):
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
-@app.post("/api/chat-llm")
-async def chat_with_llm(request: ChatMessage):
-    try:
-        prompt = f"""
+def build_chat_messages(request: ChatMessage) -> List[Dict[str, str]]:
+    prompt = f"""
         User message: {request.message}
         
         Context:
@@ -110,21 +119,32 @@ async def chat_with_llm(request: ChatMessage):
         Please provide helpful advice for tailoring the resume to match the job requirements.
         Be specific and actionable.
         """
-        
-        if openai.api_key:
-            response = openai.ChatCompletion.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are a professional resume advisor helping users tailor their resumes for specific jobs."},
-                    {"role": "user", "content": prompt}
-                ],
+    
+    return [
+        {"role": "system", "content": "You are a professional resume advisor helping users tailor their resumes for specific jobs."},
+        {"role": "user", "content": prompt}
+    ]
+
+@app.post("/api/chat-llm")
+async def chat_with_llm(request: ChatMessage):
+    try:
+        if llm_provider.is_configured():
+            chat_provider = get_latency_critical_provider()
+            messages = build_chat_messages(request)
+            response = await llm_gateway.complete(
+                chat_provider,
+                messages,
+                model=model_router.route("chat", messages, llm_provider),
                 max_tokens=800,
-                temperature=0.7
+                temperature=0.7,
+                priority=INTERACTIVE,
+                source="simple_server",
+                task="chat"
             )
             
-            ai_response = response.choices[0].message.content
+            ai_response = response["content"]
         else:
-            ai_response = "OpenAI API key not configured. Please add OPENAI_API_KEY to your environment variables."
+            ai_response = MISSING_KEY_MESSAGE
         
         return {
             "status": "success", 
@@ -135,6 +155,27 @@ async def chat_with_llm(request: ChatMessage):
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
+@app.post("/api/chat-llm/stream")
+async def stream_chat_with_llm(request: ChatMessage):
+    if llm_provider.is_configured():
+        messages = build_chat_messages(request)
+        events = stream_chat_completion(
+            llm_provider,
+            messages,
+            model=model_router.route("chat", messages, llm_provider),
+            max_tokens=800,
+            temperature=0.7,
+            priority=INTERACTIVE,
+            task="chat"
+        )
+    else:
+        async def missing_key_events():
+            yield {"type": "token", "content": MISSING_KEY_MESSAGE}
+            yield {"type": "done", "content": MISSING_KEY_MESSAGE, "usage": {}}
+        events = missing_key_events()
+    
+    return sse_response(events)
+
 @app.get("/health")
 async def health():
     return {"status": "healthy"}